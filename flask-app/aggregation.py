@@ -0,0 +1,180 @@
+import re
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+import pandas as pd
+from config import AGGREGATE_CACHE_SIZE
+
+MEASURE_FUNCS = ('sum', 'mean', 'count', 'nunique')
+# count without a column counts rows: 'count' or 'count(*)'
+ROW_COUNT = 'count'
+
+_MEASURE_PATTERN = re.compile(r'^(\w+)\((.+)\)$')
+
+# group_by: column names; measures: ((func, column or None), ...); sort: measure label or group column
+AggregateSpec = namedtuple('AggregateSpec', ['group_by', 'measures', 'top', 'sort', 'ascending'])
+
+def measure_label(func, column):
+    return ROW_COUNT if column is None else f'{func}({column})'
+
+def _parse_measure(text):
+    text = text.strip()
+    if text in (ROW_COUNT, 'count(*)'):
+        return ('count', None)
+    match = _MEASURE_PATTERN.match(text)
+    if match is None or match.group(1) not in MEASURE_FUNCS:
+        raise ValueError(f"Invalid measure '{text}': use {', '.join(f + '(column)' for f in MEASURE_FUNCS)} or count")
+    return (match.group(1), match.group(2).strip())
+
+def _split(value):
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+def parse_aggregate(args):
+    """?group_by=a,b&measures=sum(x),count&top=10&sort=sum(x)&order=desc -> AggregateSpec"""
+    measures = tuple(dict.fromkeys(_parse_measure(text) for text in _split(args.get('measures')) or [ROW_COUNT]))
+    
+    top = args.get('top')
+    if top:
+        try:
+            top = int(top)
+        except ValueError:
+            raise ValueError('top must be an integer')
+        if top <= 0:
+            raise ValueError('top must be > 0')
+    
+    order = (args.get('order') or 'desc').lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be 'asc' or 'desc'")
+    
+    return AggregateSpec(
+        group_by=tuple(dict.fromkeys(_split(args.get('group_by')))),
+        measures=measures,
+        top=top or None,
+        sort=args.get('sort') or None,
+        ascending=order == 'asc'
+    )
+
+def empty_result(spec):
+    """Aggregate result when the sheet is not loaded"""
+    return {
+        'data': [],
+        'group_by': list(spec.group_by),
+        'measures': [measure_label(func, column) for func, column in spec.measures],
+        'total_groups': 0,
+        'matched_rows': 0
+    }
+
+def _sort_key(series):
+    """Order categoricals by value (like SortCache), not by category order"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(series.cat.categories.dtype)
+    return series
+
+class Aggregator:
+    """Group-by aggregates over one frame, cached per (spec, filters).
+    
+    A service and its frame belong to one dataset version, so cached results never go stale.
+    """
+    
+    def __init__(self, df, max_entries=AGGREGATE_CACHE_SIZE):
+        self.df = df
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        # Text columns used in sum/mean, converted once with to_numeric(errors='coerce')
+        self._numeric = {}
+        self._lock = threading.Lock()
+    
+    def _numeric_column(self, column):
+        series = self.df[column]
+        if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            return series
+        converted = self._numeric.get(column)
+        if converted is None:
+            converted = pd.to_numeric(series.astype(object), errors='coerce')
+            with self._lock:
+                self._numeric[column] = converted
+        return converted
+    
+    def _check_columns(self, spec):
+        labels = [measure_label(func, column) for func, column in spec.measures]
+        columns = list(spec.group_by) + [column for _, column in spec.measures if column is not None]
+        for column in columns:
+            if column not in self.df.columns:
+                raise ValueError(f'Unknown column: {column}')
+        if set(labels) & set(spec.group_by):
+            raise ValueError('Measure labels must differ from group_by columns')
+        if spec.sort and spec.sort not in labels and spec.sort not in spec.group_by:
+            raise ValueError(f'Unknown sort key: {spec.sort}')
+        return labels
+    
+    def _compute(self, spec, labels, mask):
+        rows = None if mask is None else np.flatnonzero(mask)
+        take = (lambda series: series) if rows is None else (lambda series: series.iloc[rows])
+        
+        # One frame holding only the matched rows of the columns the spec touches,
+        # numeric where summed/averaged
+        data = {}
+        sources = []
+        for i, column in enumerate(spec.group_by):
+            data[f'g{i}'] = take(self.df[column])
+        for i, (func, column) in enumerate(spec.measures):
+            if column is None:
+                sources.append(None)
+                continue
+            source = f'm{i}'
+            data[source] = take(self._numeric_column(column) if func in ('sum', 'mean') else self.df[column])
+            sources.append(source)
+        frame = pd.DataFrame(data)
+        matched = len(self.df) if rows is None else len(rows)
+        
+        if not spec.group_by:
+            # Totals over all matched rows: a single group
+            values = {
+                label: [matched if source is None else getattr(frame[source], func)()]
+                for label, (func, _), source in zip(labels, spec.measures, sources)
+            }
+            result = pd.DataFrame(values)
+        else:
+            keys = [f'g{i}' for i in range(len(spec.group_by))]
+            grouped = frame.groupby(keys, observed=True, dropna=False, sort=False)
+            result = grouped.agg(**{
+                label: (keys[0] if source is None else source, 'size' if source is None else func)
+                for label, (func, _), source in zip(labels, spec.measures, sources)
+            }).reset_index()
+            result = result.rename(columns={key: column for key, column in zip(keys, spec.group_by)})
+        
+        total_groups = len(result)
+        sort = spec.sort or labels[0]
+        try:
+            result = result.sort_values(sort, ascending=spec.ascending, kind='stable', na_position='last', key=_sort_key)
+        except TypeError:
+            # Mixed numbers/text group values: string ordering
+            result = result.sort_values(sort, ascending=spec.ascending, kind='stable', key=lambda s: s.astype(str))
+        if spec.top:
+            result = result.head(spec.top)
+        
+        return {
+            'data': result.reset_index(drop=True),
+            'group_by': list(spec.group_by),
+            'measures': labels,
+            'total_groups': total_groups,
+            'matched_rows': matched
+        }
+    
+    def run(self, spec, filters_key=None, mask_fn=None):
+        """Aggregate rows matching mask_fn() (all rows if None); filters_key identifies the filters"""
+        labels = self._check_columns(spec)
+        key = (spec, filters_key)
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                return dict(result)
+        
+        result = self._compute(spec, labels, mask_fn() if mask_fn is not None else None)
+        
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return dict(result)
@@ -1,29 +1,40 @@
 import pandas as pd
-from utils import calculate_metrics
+from utils import calculate_metrics_frame
+
+def _top_counts(series, mask=None, n=10):
+    """Most frequent values of the masked rows (categories absent from them are left out)"""
+    counts = (series if mask is None else series[mask]).value_counts()
+    return counts[counts > 0].head(n).to_dict()
 
 class Analytics:
     """Handles analytics calculations"""
     
     @staticmethod
-    def get_doanhso_analytics(df):
-        """Get analytics for Doanh số sheet"""
+    def get_doanhso_analytics(df, mask=None):
+        """Get analytics for Doanh số sheet (rows where mask is True, if given)"""
         try:
-            df = df.copy()
+            # Enriched frames from DoanhsoService already carry the metrics
+            if 'Phân loại' not in df.columns:
+                metrics = calculate_metrics_frame(df)
+                df = df.assign(**{'Phân loại': metrics['Class'], 'TB Doanh số': metrics['TB']})
+            if mask is not None:
+                df = df[mask]
             
-            metrics = df.apply(calculate_metrics, axis=1, result_type='expand')
-            df['Phân loại'] = metrics['Class']
-            df['TB Doanh số'] = metrics['TB']
+            # One group-by pass for count / current / avg of every class
+            measures = {'count': ('TB Doanh số', 'size'), 'avg': ('TB Doanh số', 'mean')}
+            if 'T' in df.columns:
+                measures['current'] = ('T', 'sum')
+            by_class = df.groupby('Phân loại', observed=True).agg(**measures)
             
             forecast_data = []
             for cls in ['VIP', 'High', 'Medium', 'Low']:
-                subset = df[df['Phân loại'] == cls]
-                if len(subset) > 0:
-                    t_sum = float(subset['T'].sum()) if 'T' in df.columns else 0
+                if cls in by_class.index:
+                    row = by_class.loc[cls]
                     forecast_data.append({
                         'class': cls,
-                        'count': len(subset),
-                        'current': t_sum,
-                        'avg': float(subset['TB Doanh số'].mean())
+                        'count': int(row['count']),
+                        'current': float(row['current']) if 'current' in row else 0,
+                        'avg': float(row['avg'])
                     })
             
             top10_df = df.nlargest(10, 'TB Doanh số')[['CustCode', 'TB Doanh số', 'Phân loại']]
@@ -38,27 +49,25 @@ class Analytics:
             return {'forecast': [], 'top10': []}
     
     @staticmethod
-    def get_dskh_analytics(df):
-        """Get analytics for DSKH sheet"""
+    def get_dskh_analytics(df, mask=None):
+        """Get analytics for DSKH sheet (rows where mask is True, if given)"""
         try:
-            df = df.copy()
-            
             channel_counts = {}
             for col in df.columns:
                 if 'channel' in col.lower() or 'kênh' in col.lower():
-                    channel_counts = df[col].value_counts().head(10).to_dict()
+                    channel_counts = _top_counts(df[col], mask)
                     break
             
             district_counts = {}
             for col in df.columns:
                 if 'quận' in col.lower() or 'huyện' in col.lower() or 'district' in col.lower():
-                    district_counts = df[col].value_counts().head(10).to_dict()
+                    district_counts = _top_counts(df[col], mask)
                     break
             
             return {
                 'channel': channel_counts,
                 'district': district_counts,
-                'total': len(df)
+                'total': len(df) if mask is None else int(mask.sum())
             }
         except Exception as e:
             print(f"Error in DSKH analytics: {e}")
@@ -1,13 +1,17 @@
 from flask import Flask
 from flask_cors import CORS
-from routes import api
+from routes import api, registry
+from instrumentation import init_app
 from config import API_DEBUG, API_HOST, API_PORT
 
 def create_app():
     """Factory function to create Flask app"""
     app = Flask(__name__)
     CORS(app)
+    init_app(app)
     app.register_blueprint(api)
+    # Warm restart: serve the datasets published before the last shutdown from their snapshots
+    registry.restore()
     return app
 
 if __name__ == '__main__':
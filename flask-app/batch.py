@@ -0,0 +1,227 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from config import BATCH_MAX_QUERIES, BATCH_WORKERS
+from utils import parse_pagination, filter_params, exact_match
+from serializers import dumps, object_json, result_json, frame_json
+from aggregation import parse_aggregate, empty_result
+from loader import SHEET_KEYS
+from instrumentation import stage, current_endpoint, endpoint_label
+
+QUERY_TYPES = ('data', 'filter', 'filters', 'analytics', 'aggregate')
+# Sheets with an /api/analytics/<sheet> route
+ANALYTICS_SHEETS = ('doanhso', 'dskh', 'chitiet')
+# Sub-queries whose filter args select rows through the service's shared filter mask
+MASKED_TYPES = ('filter', 'analytics', 'aggregate')
+
+# What /api/data/<sheet> returns while the sheet is not loaded
+EMPTY_DATA = {
+    'doanhso': {'data': [], 'stats': {}},
+    'dskh': {'data': [], 'columns': [], 'filters': {}},
+    'tuyen': {'data': [], 'columns': [], 'filters': {}, 'total_rows': 0},
+    'chitiet': {'data': [], 'columns': [], 'filters': {}, 'total_rows': 0, 'grouped_columns': {}},
+}
+
+# params: the query args the matching GET route would get, as {name: str}
+Query = namedtuple('Query', ['id', 'type', 'sheet', 'params'])
+
+executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+
+class QueryError(Exception):
+    """A sub-query that can't be run, answered with an HTTP status like its GET route would"""
+    
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+# ============ Parsing ============
+def _params(raw):
+    """JSON params -> query-arg strings (numbers and booleans as the URL would carry them)"""
+    if raw is None:
+        return {}
+    if not isinstance(raw, dict):
+        raise QueryError('params must be an object')
+    params = {}
+    for key, value in raw.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        elif not isinstance(value, (str, int, float)):
+            raise QueryError(f'params.{key} must be a string or number')
+        params[key] = str(value)
+    return params
+
+def query_id(raw, position):
+    """A sub-query's "id", defaulting to its position in the batch"""
+    return raw.get('id', position) if isinstance(raw, dict) else position
+
+def parse_query(raw, position):
+    """{"id", "type", "sheet", "params"} -> Query; the id defaults to the query's position"""
+    if not isinstance(raw, dict):
+        raise QueryError('Each query must be an object')
+    query_type = raw.get('type')
+    sheet = raw.get('sheet')
+    if query_type not in QUERY_TYPES:
+        raise QueryError(f"Unknown query type: {query_type} (use {', '.join(QUERY_TYPES)})")
+    if sheet not in SHEET_KEYS.values():
+        raise QueryError(f'Unknown sheet: {sheet}', 404)
+    if query_type == 'analytics' and sheet not in ANALYTICS_SHEETS:
+        raise QueryError(f'No analytics for sheet: {sheet}', 404)
+    return Query(query_id(raw, position), query_type, sheet, _params(raw.get('params')))
+
+def parse_batch(body):
+    """Request body -> raw query list; ValueError if the batch itself is malformed"""
+    queries = body.get('queries') if isinstance(body, dict) else None
+    if not isinstance(queries, list) or not queries:
+        raise ValueError('Body must be a JSON object with a non-empty "queries" list')
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise ValueError(f'At most {BATCH_MAX_QUERIES} queries per batch')
+    return queries
+
+# ============ Sub-queries ============
+def _rows(result):
+    return len(result['data']) if result.get('data') is not None else 0
+
+def _data(service, query):
+    if service is None:
+        return result_json(EMPTY_DATA[query.sheet]), 0
+    result = service.get_data(page=parse_pagination(query.params))
+    return result_json(result), _rows(result)
+
+def _filter(service, query):
+    page = parse_pagination(query.params)
+    if service is None:
+        return frame_json([]), 0
+    exact = exact_match(query.params)
+    if query.sheet == 'doanhso':
+        custcode, classification = service.filter_args(filter_params(query.params))
+        result = service.filter(custcode, classification, page=page, exact=exact)
+    else:
+        result = service.filter(filter_params(query.params), page=page, exact=exact)
+    # Unpaged filters return the bare row list, like /api/filter/<sheet>
+    body = frame_json(result['data']) if page is None else result_json(result)
+    return body, _rows(result)
+
+def _filter_options(service, query):
+    options = {}
+    if service is not None:
+        options = service.filter_options(filter_params(query.params), exact_match(query.params))
+    return dumps({'sheet': query.sheet, 'options': options}), 0
+
+def _analytics(service, query):
+    if service is None:
+        return dumps({}), 0
+    return dumps(service.get_analytics(filter_params(query.params), exact_match(query.params))), 0
+
+def _aggregate(service, query):
+    spec = parse_aggregate(query.params)
+    if service is None:
+        return result_json(empty_result(spec)), 0
+    result = service.aggregate(spec, filter_params(query.params), exact_match(query.params))
+    return result_json(result), _rows(result)
+
+_HANDLERS = {
+    'data': _data,
+    'filter': _filter,
+    'filters': _filter_options,
+    'analytics': _analytics,
+    'aggregate': _aggregate,
+}
+
+def _run_query(dataset, query):
+    """One sub-query -> (status, body bytes, rows); errors stay local to the sub-query"""
+    try:
+        service = dataset.service(query.sheet) if dataset is not None else None
+        body, rows = _HANDLERS[query.type](service, query)
+        return 200, body, rows
+    except QueryError as e:
+        return e.status, dumps({'error': str(e)}), 0
+    except ValueError as e:
+        return 400, dumps({'error': str(e)}), 0
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        return 500, dumps({'error': str(e)}), 0
+
+# ============ Shared filter masks ============
+def _mask_task(service, query):
+    """(key, compute) for the filter mask a sub-query will use, None if it selects all rows"""
+    filters = filter_params(query.params)
+    exact = exact_match(query.params)
+    if query.sheet == 'doanhso':
+        custcode, classification = service.filter_args(filters)
+        if not custcode and not classification:
+            return None
+        return ((query.sheet, custcode, classification, exact),
+                lambda: service.filter_mask(custcode, classification, exact))
+    active = service.active_filters(filters)
+    if not active:
+        return None
+    return (query.sheet, active, exact), lambda: service.filter_mask(dict(active), exact)
+
+def _warm(compute):
+    try:
+        compute()
+    except Exception:
+        # The sub-queries using this mask hit the same error and report it
+        pass
+
+def _labelled(endpoint, fn, *args):
+    """Run fn in a pool thread, its stage timings labelled with the calling request's endpoint"""
+    with endpoint_label(endpoint):
+        return fn(*args)
+
+def shared_masks(dataset, queries):
+    """Distinct filter masks the sub-queries need: one compute() each, keyed by service + filters"""
+    tasks = {}
+    if dataset is None:
+        return tasks
+    for query in queries:
+        service = dataset.service(query.sheet) if isinstance(query, Query) else None
+        if service is None or query.type not in MASKED_TYPES:
+            continue
+        try:
+            task = _mask_task(service, query)
+        except Exception:
+            continue
+        if task is not None:
+            tasks.setdefault(*task)
+    return tasks
+
+# ============ Batch ============
+def run_batch(dataset, raw_queries):
+    """Run sub-queries against one dataset snapshot -> (results JSON array bytes, rows)
+    
+    Filter masks shared by several sub-queries are computed first (once each, in parallel)
+    and land in the services' mask caches; then every sub-query runs in parallel.
+    """
+    queries = []
+    for position, raw in enumerate(raw_queries):
+        try:
+            queries.append(parse_query(raw, position))
+        except QueryError as e:
+            queries.append(e)
+    
+    # Pool threads have no request context: pass the endpoint along for their stage metrics
+    endpoint = current_endpoint()
+    with stage('filter'):
+        list(executor.map(lambda compute: _labelled(endpoint, _warm, compute), shared_masks(dataset, queries).values()))
+    
+    with stage('compute'):
+        futures = [
+            executor.submit(_labelled, endpoint, _run_query, dataset, query) if isinstance(query, Query) else None
+            for query in queries
+        ]
+        items = []
+        total_rows = 0
+        for position, (query, future) in enumerate(zip(queries, futures)):
+            if future is None:
+                status, body, rows = query.status, dumps({'error': str(query)}), 0
+            else:
+                status, body, rows = future.result()
+            total_rows += rows
+            items.append(object_json({
+                'id': dumps(query_id(raw_queries[position], position)),
+                'status': dumps(status),
+                'body': body
+            }))
+    return b'[' + b','.join(items) + b']', total_rows
@@ -0,0 +1,71 @@
+"""Compare two benchmark result files and flag regressions.
+
+Usage (from flask-app/):
+    python benchmarks/compare_results.py benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+import argparse
+import json
+import sys
+
+# Metrics compared per operation; timings below the noise floor are skipped
+METRICS = ['median_ms', 'first_ms', 'peak_bytes']
+NOISE_FLOOR_MS = 0.5
+
+def _load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _operations(report):
+    """(size, group, operation) -> stats for every timed operation"""
+    ops = {}
+    for size, result in report['sizes'].items():
+        for name, stats in result['ingest'].items():
+            if isinstance(stats, dict) and 'first_ms' in stats:
+                ops[(size, 'ingest', name)] = stats
+        for service, operations in result['services'].items():
+            for name, stats in operations.items():
+                if isinstance(stats, dict):
+                    ops[(size, service, name)] = stats
+    return ops
+
+def compare(old, new, threshold):
+    """Rows of (size, group, op, metric, old, new, ratio, regressed)"""
+    rows = []
+    old_ops, new_ops = _operations(old), _operations(new)
+    for key in sorted(old_ops.keys() & new_ops.keys()):
+        for metric in METRICS:
+            before, after = old_ops[key].get(metric), new_ops[key].get(metric)
+            if before is None or after is None:
+                continue
+            if metric.endswith('_ms') and max(before, after) < NOISE_FLOOR_MS:
+                continue
+            if before:
+                ratio = after / before
+            else:
+                ratio = 1.0 if not after else float('inf')
+            rows.append((*key, metric, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative slowdown reported as a regression')
+    parser.add_argument('--all', action='store_true', help='print every metric, not only changes beyond the threshold')
+    args = parser.parse_args()
+    
+    old, new = _load(args.old), _load(args.new)
+    print(f"old: {old['environment']['commit']}  new: {new['environment']['commit']}")
+    rows = compare(old, new, args.threshold)
+    regressions = 0
+    for size, group, op, metric, before, after, ratio, regressed in rows:
+        regressions += regressed
+        if not args.all and abs(ratio - 1) <= args.threshold:
+            continue
+        mark = '✗' if regressed else '✓'
+        print(f"{mark} {size:>8} {group:<8} {op:<22} {metric:<10} {before:>14,.1f} → {after:>14,.1f}  x{ratio:.2f}")
+    print(f"{regressions} regression(s) over {args.threshold:.0%} in {len(rows)} metrics")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
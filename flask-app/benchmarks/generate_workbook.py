@@ -0,0 +1,366 @@
+"""Synthetic Hoạch định tuyến workbook with the same four sheet layouts as the template.
+
+Usage (from flask-app/):
+    python benchmarks/generate_workbook.py --rows 100000
+    python benchmarks/generate_workbook.py --rows 1000 --out uploads/synthetic.xlsx
+
+Cells hold values, not formulas: the readers only see cached values, so the
+template's formula columns are written pre-evaluated. Sheets are streamed as raw
+SpreadsheetML (inline strings) because openpyxl needs ~40 min for 1M rows.
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+import zipfile
+from xml.sax.saxutils import escape
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from config import SHEET_DOANHSO, SHEET_DSKH, SHEET_TUYEN, SHEET_CHITIETTUYEN
+
+# Template: ~170 customers per route
+CUSTOMERS_PER_ROUTE = 170
+MAX_ROWS = 1_000_000
+
+UNIT_CODE = 'S95002'
+UNIT_NAME = 'CÔNG TY TNHH DƯỢC PHẨM GIA NGUYỄN BẠC LIÊU'
+SUPERVISOR = 'Trần Văn Khanh'
+PROVINCE = 'Tỉnh Cà Mau'
+
+DAYS = ['T2', 'T3', 'T4', 'T5', 'T6', 'T7', 'CN']
+WEEKS = ['W1', 'W2', 'W3', 'W4']
+DAY_NAMES = ['Thứ 2', 'Thứ 3', 'Thứ 4', 'Thứ 5', 'Thứ 6', 'Thứ 7', 'Chủ nhật']
+
+FIRST_NAMES = ['Hữu', 'Kiều Trang', 'Thảo', 'Ngọc Bích', 'Diễm My', 'Yến Nhi', 'Thu Tuấn', 'Thiên Trang', 'Liên Thư', 'Phi Vủ']
+SHOP_TYPES = ['Quầy thuốc', 'Nhà thuốc', 'Tạp Hoá', 'Tạp Hóa']
+WARDS = ['Xã Phong Thạnh', 'Xã Hòa Bình', 'Phường Bạc Liêu', 'Xã Vĩnh Phước', 'Xã Ninh Thạnh Lợi', 'Xã Tân Phong', 'Xã Long Thạnh', 'Phường Giá Rai']
+STREETS = ['QL1A', 'Giá Rai', 'Lê Lợi', 'Ấp Công Điền', 'Chợ Xã Thoàng', 'Chợ chủ chí']
+CHANNELS = ['OTC - Hiệu thuốc', 'GT - Tạp hóa ngoài chợ', 'GT - Kênh sỉ lẻ tạp hóa', 'GT - Tạp hóa trong chợ']
+CLASSES = ['', 'GT - Nhóm 2 - Hộ kinh doanh thuế khoán', 'GT - Nhóm 4 - Tiêu dùng', 'OTC - Nhóm 2 - Hộ kinh doanh thuế khoán']
+FREQUENCIES = ['F2', 'F4', 'F8']
+
+# ============ Sheet layouts (header rows as in the template) ============
+DOANHSO_HEADER = ['CustCode', 'T-3', 'T-2', 'T-1', 'T', 'TB Doanh số']
+
+DSKH_HEADER = [
+    'STT', 'Mã đơn vị', 'Tên đơn vị', 'Mã khách hàng', 'Tên khách hàng', 'Trạng thái', 'Số điện thoại',
+    'Số điện thoại bàn', 'Mã số thuế', 'Là khách hàng vãng lai', 'Ngày mở khách hàng\n(dd/mm/yyyy)',
+    'Ngày đóng khách hàng\n(dd/mm/yyyy)', 'Chủ cửa hàng', 'Ngày sinh', 'Địa chỉ liên hệ', 'Số CMND/CCCD',
+    'Ngày cấp', 'Nơi cấp', 'Áp dụng hạn mức nợ', 'Mức nợ', 'Mức nợ cho phép vượt', 'Hạn nợ',
+    'Phương thức thanh toán', 'Số tài khoản', 'Tên ngân hàng', 'Chủ tài khoản', 'Mã khách hàng tham chiếu',
+    'Địa chỉ', 'Số nhà', 'Tên đường', 'Mã phường/Xã', 'Tên phường xã', 'Mã quận/huyện', 'Tên Quận/huyện',
+    'Mã tỉnh', 'Tên tỉnh', 'Lat', 'Lng', 'Địa chỉ theo tọa độ', 'Bán Điểm', 'PHÂN LOẠI KHÁCH HÀNG',
+    'KÊNH (bắt buộc nhập)', 'Miền Bắc - Phân loại khách hàng', 'Gắn kết hoa linh', 'Nhóm Siêu thị/Chuỗi',
+    'Nhận Hàng Mẫu', 'Hồng Mã', 'Mở  Mới', 'Nhóm NGỌC CHÂU', 'Mã nhân viên phụ trách', 'Tên nhân viên phụ trách',
+    'Thời gian tạo khách hàng\ndd/mm/yyyy hh:mm', 'Mã người tạo', 'Tên người tạo', 'Doanh số trung bình',
+    'Tần suất gợi ý', 'Kênh khách hàng', None,
+]
+DSKH_TITLES = {0: 'Dữ liệu download từ DMS', 54: 'Mapping'}
+
+TUYEN_HEADER = [
+    'STT', 'Mã đơn vị', 'Tên đơn vị', 'Mã tuyến', 'Tên tuyến', 'Trạng thái', 'Có thiết lập lịch đi tuyến?',
+    'Ngày bắt đầu\ndd/mm/yyyy', 'Mã Nhân viên', 'Tên nhân viên', 'Từ ngày giao tuyến\ndd/mm/yyyy',
+    'Đến ngày giao tuyến\ndd/mm/yyyy', 'Trạng thái nhân viên gán tuyến', 'Đưa vào hoạch định tuyến',
+    'Giám sát', 'Note', 'Số Calls', 'Call Min', 'Call Max',
+] + DAYS[:6] * 4
+TUYEN_TITLES = {0: 'Dữ liệu download từ DMS', 13: 'Mapping', 16: 'Thực trạng hiện tại',
+                19: 'Tuần 1', 25: 'Tuần 2', 31: 'Tuần 3', 37: 'Tuần 4'}
+
+# Chi tiết tuyến: (level 1 title, level 2 sub-columns or None) -> two header rows, the
+# title written once over its group like the template's merged cells
+CHITIET_GROUPS = [
+    ('STT', None), ('Mã Đơn vị', None), ('Tên Đơn vị', None), ('Mã tuyến', None), ('Tên tuyến', None),
+    ('Mã khách hàng', None), ('Tên khách hàng', None), ('Địa chỉ', None), ('Trạng thái tham gia', None),
+    ('Từ ngày tham gia\ndd/mm/yyyy', None), ('Đến ngày tham gia\ndd/mm/yyyy', None),
+    ('LỘ TRÌNH DMS (GS sửa trực tiếp ở đây)', DAYS),
+    ('TẦN SUẤT DMS', WEEKS),
+    ('TẦN SUẤT GỢI Ý (GS sửa ở đây)', WEEKS + ['Mã Nhân viên', 'Tên Nhân viên']),
+    ('Tần suất gợi ý', None), ('Kênh khách hàng', None), ('Doanh số TB', None), ('Tần suất hiện tại DMS', None),
+    ('Tần suất GSBH chia lại', None), ('Kiểm tra đúng tần suất', None),
+    ('Kiểm tra đúng tần suất giữa GSBH chia và Gợi ý', None), ('Số call gợi ý', None), ('Số call GS chia', None),
+    ('Doanh số TB/tuần', None), ('Quận/Huyện', None), ('Phường/Xã', None), ('Huyện-Xã', None),
+    ('Tuyến_X', DAYS), ('Tần suất_X', WEEKS), ('Doanh số_X', DAYS), ('Check F2_X', DAYS),
+    ('running No F2_X', DAYS), ('Số lượng F2_X', DAYS), ('running Total', None), ('total F2', [None, 'GSBH']),
+    ('Tổng số Calls', None), ('Số X', None), ('Số X:', DAY_NAMES + ['X1', 'X2']),
+    ('Thứ áp dụng', None), ('Tuần áp dụng', None),
+]
+CHITIET_TITLES = {0: 'Dữ liệu download từ DMS', 26: 'Mapping', 48: 'dựa vào số CH tối thiểu ngày'}
+
+def _header_rows(groups):
+    """Two header rows from (title, sub-columns) groups"""
+    top, sub = [], []
+    for title, children in groups:
+        if children is None:
+            top.append(title)
+            sub.append(None)
+        else:
+            top.extend([title] + [None] * (len(children) - 1))
+            sub.extend(children)
+    return top, sub
+
+def _title_row(titles, width):
+    return [titles.get(i) for i in range(width)]
+
+# ============ Column generators ============
+def _pick(rng, choices, size):
+    return np.asarray(choices, dtype=object)[rng.integers(0, len(choices), size)]
+
+def _codes(prefix, ids, width):
+    return np.array([f'{prefix}{i:0{width}d}' for i in ids], dtype=object)
+
+def _flags(mask):
+    return np.where(mask, 'x', '')
+
+class _Population:
+    """Customers, routes and staff shared by all sheets so cross-sheet keys line up"""
+    
+    def __init__(self, rows, seed):
+        rng = np.random.default_rng(seed)
+        self.rng = rng
+        self.rows = rows
+        self.routes = max(4, -(-rows // CUSTOMERS_PER_ROUTE))
+        
+        ids = np.arange(rows)
+        self.cust_code = _codes('C95', ids, 8)
+        self.cust_name = np.array([
+            f'{SHOP_TYPES[i % len(SHOP_TYPES)]} {FIRST_NAMES[(i // 4) % len(FIRST_NAMES)]} {i}'
+            for i in range(rows)
+        ], dtype=object)
+        self.ward = _pick(rng, WARDS, rows)
+        street = _pick(rng, STREETS, rows)
+        self.address = np.array([f'Ấp {i % 50}, {s}, {w}, {PROVINCE}' for i, s, w in zip(ids, street, self.ward)], dtype=object)
+        self.street = street
+        self.channel = _pick(rng, CHANNELS, rows)
+        self.channel_short = np.array([c.split(' - ')[0] for c in self.channel], dtype=object)
+        self.frequency = _pick(rng, FREQUENCIES, rows)
+        
+        # Monthly sales: log-normal, a few percent never bought
+        base = rng.lognormal(14, 1.2, rows)
+        base[rng.random(rows) < 0.05] = 0
+        months = np.round(base[:, None] * rng.uniform(0.7, 1.3, (rows, 4)), -1)
+        self.sales = months.astype(np.int64)
+        self.sales_avg = self.sales.mean(axis=1)
+        
+        self.route = rng.integers(0, self.routes, rows)
+        route_ids = np.arange(self.routes)
+        self.route_code = _codes('R95', route_ids + 101, 5)
+        self.route_name = np.array([f'Tuyến {i + 1:02d}' for i in route_ids], dtype=object)
+        self.staff_code = _codes('HL', route_ids + 500, 5)
+        self.staff_name = np.array([
+            f'{FIRST_NAMES[i % len(FIRST_NAMES)]} {i + 1}' for i in route_ids
+        ], dtype=object)
+        
+        # Visit days: one day per customer, plus a second day for F8
+        days = np.zeros((rows, len(DAYS)), dtype=bool)
+        days[ids, rng.integers(0, 6, rows)] = True
+        second = self.frequency == 'F8'
+        days[ids[second], rng.integers(0, 6, second.sum())] = True
+        self.days = days
+        self.weeks_dms = np.ones((rows, len(WEEKS)), dtype=bool)
+        weeks = np.ones((rows, len(WEEKS)), dtype=bool)
+        f2 = self.frequency == 'F2'
+        odd = rng.random(rows) < 0.5
+        weeks[f2 & odd, 1::2] = False
+        weeks[f2 & ~odd, 0::2] = False
+        self.weeks = weeks
+
+def _doanhso_rows(pop):
+    t = pop.sales[:, 3].astype(float)
+    cols = [pop.cust_code, *pop.sales[:, :3].T, t, pop.sales_avg]
+    yield DOANHSO_HEADER
+    yield from zip(*_plain(cols))
+
+def _dskh_rows(pop):
+    rng, n = pop.rng, pop.rows
+    const = itertools.repeat
+    phone = rng.integers(300_000_000, 999_999_999, n)
+    open_date = np.array([f'{d:02d}/{m:02d}/2024' for d, m in zip(rng.integers(1, 29, n), rng.integers(1, 13, n))], dtype=object)
+    staff = pop.route
+    cols = [
+        np.arange(1, n + 1), const(UNIT_CODE), const(UNIT_NAME), pop.cust_code, pop.cust_name, const('Hoạt động'),
+        phone, phone, const(''), const(''), open_date, const(''), _pick(rng, FIRST_NAMES, n), const(''), const(''),
+        rng.integers(10**10, 10**11, n).astype(float), const(''), const(''), const(''), const(''), const(''),
+        const(''), _pick(rng, ['Tiền mặt', 'Chuyển khoản', ''], n), const(''), const(''), const(''), const(''),
+        pop.address, const('Ấp'), pop.street, rng.integers(31800, 32000, n).astype(float), pop.ward,
+        const('96_H'), const(PROVINCE), const(96.0), const(PROVINCE),
+        rng.uniform(9.0, 9.4, n), rng.uniform(105.2, 105.8, n), pop.address, const(''),
+        _pick(rng, CLASSES, n), pop.channel, const(''), _pick(rng, ['', 'Chưa tham gia GKHL', 'Trưng Bày', 'Tích Lũy'], n),
+        const(''), const(''), const(''), const(''), const(''), pop.staff_code[staff], pop.staff_name[staff],
+        np.char.add(open_date.astype(str), ' 08:30').astype(object), const('ADMIN'), const('Admin'),
+        pop.sales_avg, pop.frequency, pop.channel_short,
+        np.array([f'{PROVINCE}-{w}' for w in pop.ward], dtype=object),
+    ]
+    yield _title_row(DSKH_TITLES, len(DSKH_HEADER))
+    yield DSKH_HEADER
+    yield from zip(*_plain(cols))
+
+def _tuyen_rows(pop):
+    rng, n = pop.rng, pop.routes
+    const = itertools.repeat
+    per_day = rng.integers(10, 50, (n, 24))
+    cols = [
+        np.arange(1, n + 1), const(UNIT_CODE), const(UNIT_NAME), pop.route_code, pop.route_name, const('Hoạt động'),
+        const('x'), const('01/01/2024'), pop.staff_code, pop.staff_name, const('03/11/2025'), const(''),
+        const('Hoạt động'), const(1), const(SUPERVISOR), const(None),
+        per_day.sum(axis=1), per_day.min(axis=1), per_day.max(axis=1), *per_day.T,
+    ]
+    yield _title_row(TUYEN_TITLES, len(TUYEN_HEADER))
+    yield TUYEN_HEADER
+    yield from zip(*_plain(cols))
+
+def _chitiet_rows(pop):
+    n = pop.rows
+    const = itertools.repeat
+    route = pop.route
+    days = pop.days.astype(np.int64)
+    visits = days.sum(axis=1)
+    weeks = pop.weeks.sum(axis=1)
+    current = np.char.add('F', (visits * 4).astype(str)).astype(object)
+    split = np.char.add('F', (visits * weeks).astype(str)).astype(object)
+    calls = np.array([int(f[1:]) for f in pop.frequency], dtype=float)
+    weekly = pop.sales_avg / 4
+    f2 = (pop.frequency == 'F2')[:, None] & pop.days
+    running = np.cumsum(f2, axis=0)
+    first_day = np.array([DAY_NAMES[i] for i in pop.days.argmax(axis=1)], dtype=object)
+    cols = [
+        np.arange(1, n + 1), const(UNIT_CODE), const(UNIT_NAME), pop.route_code[route], pop.route_name[route],
+        pop.cust_code, pop.cust_name, pop.address, const('Hoạt động'), const('03/11/2025'), const(''),
+        *_flags(pop.days).T, *_flags(pop.weeks_dms).T, *_flags(pop.weeks).T,
+        pop.staff_code[route], pop.staff_name[route], pop.frequency, pop.channel_short, pop.sales_avg,
+        current, split, current == pop.frequency, split == pop.frequency, calls, weeks * visits, weekly,
+        const(PROVINCE), pop.ward, np.array([f'{PROVINCE}-{w}' for w in pop.ward], dtype=object),
+        *(days * np.arange(1, 8)).T, *pop.weeks.astype(np.int64).T, *(days * weekly[:, None]).T,
+        *f2.astype(np.int64).T, *running.T, *np.broadcast_to(running[-1], running.shape).T,
+        (days * running).sum(axis=1), (f2 * running).sum(axis=1), const(SUPERVISOR), weeks * visits, visits,
+        *np.cumsum(days, axis=1).T, first_day, const(''), first_day,
+        np.array([f'{f} - Tất cả các tuần' for f in pop.frequency], dtype=object),
+    ]
+    top, sub = _header_rows(CHITIET_GROUPS)
+    yield []
+    yield _title_row(CHITIET_TITLES, len(top))
+    yield top
+    yield sub
+    yield from zip(*_plain(cols))
+
+SHEET_WRITERS = [
+    (SHEET_DOANHSO, _doanhso_rows),
+    (SHEET_DSKH, _dskh_rows),
+    (SHEET_TUYEN, _tuyen_rows),
+    (SHEET_CHITIETTUYEN, _chitiet_rows),
+]
+
+# ============ Minimal streaming .xlsx writer ============
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{sheets}</Types>'
+)
+SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>{sheets}</sheets></workbook>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{sheets}</Relationships>'
+)
+SHEET_REL = (
+    '<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{n}.xml"/>'
+)
+SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_TAIL = '</sheetData></worksheet>'
+
+def _plain(cols):
+    """numpy columns -> lists of plain Python values (much faster to format than numpy scalars)"""
+    return [col.tolist() if isinstance(col, np.ndarray) else col for col in cols]
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def _cell_xml(ref, value):
+    if value is None or value == '':
+        return ''
+    if isinstance(value, str):
+        return f'<c r="{ref}" t="inlineStr"><is><t>{escape(value)}</t></is></c>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    return f'<c r="{ref}"><v>{value!r}</v></c>'
+
+def _write_sheet(out, rows):
+    out.write(SHEET_HEAD.encode())
+    letters = []
+    for number, row in enumerate(rows, start=1):
+        if len(letters) < len(row):
+            letters = [_column_letter(i) for i in range(len(row))]
+        cells = ''.join([_cell_xml(f'{letter}{number}', value) for letter, value in zip(letters, row)])
+        out.write(f'<row r="{number}">{cells}</row>'.encode())
+    out.write(SHEET_TAIL.encode())
+
+def generate_workbook(path, rows, seed=0):
+    """Write a synthetic workbook with `rows` customers -> path"""
+    if not 1 <= rows <= MAX_ROWS:
+        raise ValueError(f'rows must be between 1 and {MAX_ROWS}')
+    
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    
+    pop = _Population(rows, seed)
+    numbers = range(1, len(SHEET_WRITERS) + 1)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        zf.writestr('[Content_Types].xml', CONTENT_TYPES.format(sheets=''.join(SHEET_CONTENT_TYPE.format(n=n) for n in numbers)))
+        zf.writestr('_rels/.rels', ROOT_RELS)
+        zf.writestr('xl/workbook.xml', WORKBOOK.format(sheets=''.join(
+            f'<sheet name="{escape(sheet)}" sheetId="{n}" r:id="rId{n}"/>' for n, (sheet, _) in zip(numbers, SHEET_WRITERS)
+        )))
+        zf.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS.format(sheets=''.join(SHEET_REL.format(n=n) for n in numbers)))
+        for n, (sheet, writer) in zip(numbers, SHEET_WRITERS):
+            with zf.open(f'xl/worksheets/sheet{n}.xml', 'w', force_zip64=True) as out:
+                _write_sheet(out, writer(pop))
+    return path
+
+def default_path(rows, seed=0):
+    return os.path.join(APP_DIR, 'data', 'benchmarks', f'synthetic_{rows}_s{seed}.xlsx')
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Hoạch định tuyến workbook')
+    parser.add_argument('--rows', type=int, default=10_000, help=f'customers per sheet (1..{MAX_ROWS})')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='output .xlsx (default: data/benchmarks/synthetic_<rows>_s<seed>.xlsx)')
+    args = parser.parse_args()
+    
+    path = args.out or default_path(args.rows, args.seed)
+    start = time.perf_counter()
+    generate_workbook(path, args.rows, args.seed)
+    size = os.path.getsize(path) / 1024 / 1024
+    print(f"✓ {path}: {args.rows} rows, {size:.1f} MB in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
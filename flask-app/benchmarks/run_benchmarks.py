@@ -0,0 +1,294 @@
+"""Micro-benchmarks for ingestion and every service, written as JSON per commit.
+
+Usage (from flask-app/):
+    python benchmarks/run_benchmarks.py --rows 1000 10000 100000
+    python benchmarks/run_benchmarks.py --workbook uploads/Hoach_inh_tuyen__template__11.2025.xlsx
+    python benchmarks/compare_results.py benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Each operation is timed `--repeat` times (first call reported separately: it fills
+the sort/mask caches) and run once more under tracemalloc for its peak memory.
+`--workers N` also restores the snapshot in N concurrent processes, like N gunicorn
+workers, and records each one's RSS and PSS (its share of the mapped snapshot pages).
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+# config paths (data/, uploads/) are relative to the app folder
+os.chdir(APP_DIR)
+
+import numpy as np
+import pandas as pd
+import loader
+import snapshot_cache
+import index_store
+from serializers import result_json, columnar_json, iter_ndjson, result_to_arrow, pa
+from generate_workbook import generate_workbook, default_path
+
+RESULTS_FOLDER = os.path.join(APP_DIR, 'benchmarks', 'results')
+
+# Per service: (filter args for substring match, filter args for exact match, sort column)
+SERVICE_CASES = {
+    'doanhso': ({'custcode': 'C9500', 'classification': 'VIP'}, {'classification': 'High'}, 'TB Doanh số'),
+    'dskh': ({'Tên phường xã': 'Xã', 'Kênh khách hàng': 'GT'}, {'KÊNH (bắt buộc nhập)': 'OTC - Hiệu thuốc'}, 'Doanh số trung bình'),
+    'tuyen': ({'Tên tuyến': 'Tuyến 0'}, {'Trạng thái': 'Hoạt động'}, 'Số Calls'),
+    'chitiet': ({'KenhPhanPhoi': 'GT', 'TanSuatGoiYValue': 'F2'}, {'TanSuatGoiYValue': 'F4'}, 'DoanhSoTB'),
+}
+
+PAGE = {'offset': 0, 'limit': 100, 'sort': None, 'ascending': False}
+
+@contextlib.contextmanager
+def _quiet(enabled):
+    """Services log every call; keep benchmark output readable"""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def _time(fn, repeat):
+    """first call + stats over `repeat` further calls, in milliseconds"""
+    start = time.perf_counter()
+    result = fn()
+    first = (time.perf_counter() - start) * 1000
+    
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    stats = {'first_ms': round(first, 3)}
+    if samples:
+        stats.update({
+            'min_ms': round(min(samples), 3),
+            'median_ms': round(statistics.median(samples), 3),
+            'mean_ms': round(statistics.fmean(samples), 3),
+        })
+    return result, stats
+
+def _peak(fn):
+    """Peak bytes allocated by one call (Python + numpy allocations)"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def measure(fn, repeat, memory=True):
+    result, stats = _time(fn, repeat)
+    if memory:
+        stats['peak_bytes'] = _peak(fn)
+    return result, stats
+
+def _filter_call(key, service, args, exact, page=None):
+    if key == 'doanhso':
+        return lambda: service.filter(args.get('custcode', ''), args.get('classification', ''), page=page, exact=exact)
+    return lambda: service.filter(args, page=page, exact=exact)
+
+def _serializers():
+    serializers = {
+        'json': result_json,
+        'columnar': columnar_json,
+        'ndjson': lambda result: b''.join(iter_ndjson(result)),
+    }
+    if pa is not None:
+        serializers['arrow'] = result_to_arrow
+    return serializers
+
+def bench_ingest(path, repeat, memory=True):
+    """Parse, build services, snapshot save/load, restore: the upload and warm-restart paths"""
+    ingest = {}
+    digest, ingest['hash'] = measure(lambda: snapshot_cache.file_hash(path), repeat, memory=False)
+    # Parsing is slow and its peak is dominated by the reader: one timed run + one traced run
+    frames, ingest['parse'] = measure(lambda: loader.parse_workbook(path), 0, memory)
+    services, ingest['build_services'] = measure(lambda: loader.build_services(frames), repeat, memory)
+    _, ingest['snapshot_save'] = measure(lambda: snapshot_cache.save(digest, frames), 0, memory=False)
+    _, ingest['snapshot_load'] = measure(lambda: snapshot_cache.load(digest), repeat, memory)
+    _, ingest['index_save'] = measure(lambda: index_store.save(digest, services), 0, memory=False)
+    # Warm restart: snapshot frames + persisted indexes -> services, as DatasetRegistry does
+    _, ingest['restore'] = measure(
+        lambda: loader.build_services(snapshot_cache.load(digest), index_store.load(digest)), repeat, memory
+    )
+    ingest['rows'] = {key: len(df) for key, df in frames.items()}
+    return services, ingest
+
+def bench_service(key, service, repeat, memory=True):
+    substring, exact, sort_column = SERVICE_CASES[key]
+    page = dict(PAGE, sort=sort_column)
+    results = {'memory_bytes': service.memory_usage()['bytes']}
+    
+    data, results['get_data'] = measure(lambda: service.get_data(), repeat, memory)
+    _, results['get_data_page'] = measure(lambda: service.get_data(page), repeat, memory)
+    _, results['filter'] = measure(_filter_call(key, service, substring, False), repeat, memory)
+    _, results['filter_exact'] = measure(_filter_call(key, service, exact, True), repeat, memory)
+    _, results['filter_page'] = measure(_filter_call(key, service, substring, False, page), repeat, memory)
+    _, results['filter_options'] = measure(lambda: service.filter_options(), repeat, memory)
+    _, results['get_analytics'] = measure(lambda: service.get_analytics(), repeat, memory)
+    
+    for name, serialize in _serializers().items():
+        payload, results[f'serialize_{name}'] = measure(lambda: serialize(data), repeat, memory)
+        results[f'serialize_{name}']['bytes'] = len(payload)
+    return results
+
+def _smaps_rollup():
+    """RSS/PSS/shared/private bytes of this process (Linux), {} elsewhere"""
+    fields = {'Rss': 'rss', 'Pss': 'pss', 'Shared_Clean': 'shared_clean', 'Private_Clean': 'private_clean',
+              'Private_Dirty': 'private_dirty'}
+    try:
+        with open('/proc/self/smaps_rollup', encoding='ascii') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    usage = {}
+    for line in lines:
+        name, _, value = line.partition(':')
+        if name in fields:
+            usage[f'{fields[name]}_bytes'] = int(value.split()[0]) * 1024
+    return usage
+
+def _restore_worker(digest, results, done):
+    """One serving process: restore the dataset from the snapshot, report memory, stay alive"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        services = loader.build_services(snapshot_cache.load(digest), index_store.load(digest))
+    usage = _smaps_rollup()
+    usage['max_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    results.put(usage)
+    # Keep the mapping alive until every worker has measured, so PSS splits the shared pages
+    done.wait()
+    del services
+
+def bench_workers(digest, workers):
+    """Memory of `workers` processes holding the same restored dataset at once"""
+    context = multiprocessing.get_context('spawn')
+    results, done = context.Queue(), context.Event()
+    processes = [context.Process(target=_restore_worker, args=(digest, results, done)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        usage = [results.get(timeout=600) for _ in processes]
+    finally:
+        done.set()
+        for process in processes:
+            process.join()
+    summary = {'workers': workers, 'per_worker': usage}
+    for field in usage[0]:
+        summary[f'mean_{field}'] = round(statistics.fmean(u[field] for u in usage))
+    return summary
+
+def run_size(path, repeat, quiet, memory=True, workers=0):
+    print(f"→ {os.path.basename(path)}")
+    with _quiet(quiet):
+        services, ingest = bench_ingest(path, repeat, memory)
+    print(f"  ingest: parse {ingest['parse']['first_ms'] / 1000:.2f}s, restore {ingest['restore']['first_ms']:.0f}ms, "
+          f"rows {ingest['rows']}")
+    
+    result = {
+        'workbook': os.path.relpath(path, APP_DIR),
+        'workbook_bytes': os.path.getsize(path),
+        'ingest': ingest,
+        'services': {},
+    }
+    for key, service in services.items():
+        if service is None:
+            continue
+        with _quiet(quiet):
+            result['services'][key] = bench_service(key, service, repeat, memory)
+        ops = result['services'][key]
+        print(f"  {key}: get_data {ops['get_data']['first_ms']:.1f}ms, "
+              f"filter {ops['filter']['first_ms']:.1f}ms, analytics {ops['get_analytics']['first_ms']:.1f}ms")
+    
+    if workers:
+        result['workers'] = bench_workers(snapshot_cache.file_hash(path), workers)
+        if 'mean_pss_bytes' in result['workers']:
+            print(f"  {workers} workers: RSS {result['workers']['mean_rss_bytes'] / 2**20:.1f}MiB, "
+                  f"PSS {result['workers']['mean_pss_bytes'] / 2**20:.1f}MiB per worker")
+    return result
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=APP_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'pyarrow': pa.__version__ if pa is not None else None,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'excel_engine': loader.excel_engine(),
+        'ingest_workers': loader.INGEST_WORKERS,
+    }
+
+def result_path(env):
+    name = (env['commit'] or 'nogit')[:12] + ('-dirty' if env['dirty'] else '')
+    return os.path.join(RESULTS_FOLDER, f'{name}.json')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ingestion and services on synthetic workbooks')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000], help='workbook sizes (customers)')
+    parser.add_argument('--workbook', nargs='+', help='benchmark these .xlsx files instead of generated ones')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help='timed calls per operation after the first')
+    parser.add_argument('--ingest-workers', type=int, help='override INGEST_WORKERS (1 = parse in this process)')
+    parser.add_argument('--workers', type=int, default=2, help='serving processes restoring the snapshot at once (0 = skip)')
+    parser.add_argument('--out', help='result file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc runs (much faster on large sizes)')
+    parser.add_argument('--verbose', action='store_true', help='keep service logging')
+    args = parser.parse_args()
+    
+    if args.ingest_workers:
+        loader.INGEST_WORKERS = args.ingest_workers
+    
+    if args.workbook:
+        workbooks = {os.path.basename(path): os.path.abspath(path) for path in args.workbook}
+    else:
+        workbooks = {}
+        for rows in args.rows:
+            path = default_path(rows, args.seed)
+            if not os.path.exists(path):
+                start = time.perf_counter()
+                generate_workbook(path, rows, args.seed)
+                print(f"✓ Generated {path} in {time.perf_counter() - start:.1f}s")
+            workbooks[str(rows)] = path
+    
+    env = environment()
+    report = {'environment': env, 'repeat': args.repeat, 'seed': args.seed, 'sizes': {}}
+    for name, path in workbooks.items():
+        report['sizes'][name] = run_size(
+            path, args.repeat, quiet=not args.verbose, memory=not args.no_memory, workers=args.workers
+        )
+    
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is KiB on Linux
+    report['max_rss_bytes'] = {'self': usage * 1024, 'ingest_workers': children * 1024}
+    
+    out = args.out or result_path(env)
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✓ Results written to {os.path.relpath(out)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from config import CATEGORY_MAX_RATIO, FLAG_COLUMN_MARKERS
+
+def _all_ints(values):
+    """True if every value of an object array is a Python/NumPy int (not bool)"""
+    return all(
+        isinstance(v, (int, np.integer)) and not isinstance(v, (bool, np.bool_))
+        for v in values
+    )
+
+def _is_flag(column):
+    """Chi tiết tuyến 'x'/blank flag columns (LoTrinhDMS/TanSuatDMS...), stored as 0/1"""
+    return any(marker in str(column) for marker in FLAG_COLUMN_MARKERS)
+
+def _compact_column(series):
+    """Smallest dtype that keeps every value (and its JSON form) unchanged"""
+    if pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        if _is_flag(series.name) and len(series) and series.min() >= 0 and series.max() <= 1:
+            return series.astype(np.uint8)
+        return pd.to_numeric(series, downcast='integer')
+    
+    if series.dtype != object or len(series) == 0:
+        # Floats stay float64: float32 sums would change the stats
+        return series
+    
+    uniques = pd.unique(series)
+    
+    # 0/1 flags and other all-int object columns
+    if _all_ints(uniques):
+        return _compact_column(series.astype(np.int64))
+    
+    # Repeated labels (KenhHang, nhân viên, quận/huyện...): categorical in first-seen order
+    if len(uniques) <= len(series) * CATEGORY_MAX_RATIO:
+        try:
+            return series.astype(pd.CategoricalDtype(uniques))
+        except (TypeError, ValueError):
+            return series
+    return series
+
+def _column_bytes(series):
+    """series.memory_usage(deep=True); frozen object columns are sized through a copy of
+    their pointer array (pandas' Cython object sizing rejects read-only buffers)"""
+    if series.dtype == object and not series.to_numpy(copy=False).flags.writeable:
+        series = pd.Series(series.to_numpy(copy=True))
+    return series.memory_usage(deep=True, index=False)
+
+def compact_frame(df):
+    """Post-load compaction: categoricals for low-cardinality text, downcast ints, uint8 flags"""
+    if df is None or len(df.columns) == 0:
+        return df
+    
+    columns = [df.iloc[:, i] for i in range(df.shape[1])]
+    compacted = [_compact_column(series) for series in columns]
+    # Object columns are sized once: unchanged ones keep their "before" size
+    before = [_column_bytes(series) for series in columns]
+    after = [
+        size if new is old else _column_bytes(new)
+        for old, new, size in zip(columns, compacted, before)
+    ]
+    
+    df_compacted = pd.concat(compacted, axis=1)
+    df_compacted.columns = df.columns
+    print(f"✓ Compacted {sum(before) / 1e6:.1f} MB -> {sum(after) / 1e6:.1f} MB")
+    return df_compacted
+
+def _freeze_array(values):
+    """Mark an array read-only, along with every array it is a view of
+    (a view made before its base was frozen keeps its own writeable flag)"""
+    while isinstance(values, np.ndarray):
+        values.flags.writeable = False
+        values = values.base
+
+def freeze_frame(df):
+    """Make the arrays behind a loaded frame read-only.
+    
+    Services hand out views of these frames instead of copies, so any in-place
+    write (df.loc[...] = x, values[...] = x) must fail loudly rather than leak
+    into the shared data.
+    """
+    if df is None:
+        return df
+    # items() goes through pandas' column cache, so Series already handed out are frozen too
+    for _, series in df.items():
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.array.codes
+        elif isinstance(series.dtype, np.dtype):
+            values = series.to_numpy(copy=False)
+        else:
+            continue
+        _freeze_array(values)
+    return df
+
+def memory_report(df):
+    """Bytes per column and total for a frame"""
+    if df is None:
+        return {'rows': 0, 'bytes': 0, 'columns': {}}
+    
+    usage = [_column_bytes(df.iloc[:, i]) for i in range(df.shape[1])]
+    return {
+        'rows': len(df),
+        'bytes': int(sum(usage)),
+        'columns': {
+            str(col): {'dtype': str(dtype), 'bytes': int(nbytes)}
+            for col, dtype, nbytes in zip(df.columns, df.dtypes, usage)
+        }
+    }
@@ -28,4 +28,70 @@ CLASSIFICATION_THRESHOLDS = {
     'High': 2000000,
     'Medium': 500000,
     'Low': 0
-}
\ No newline at end of file
+}
+# Pagination config
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 5000
+
+# Streaming config (rows per NDJSON chunk)
+STREAM_CHUNK_SIZE = 1000
+
+# Parse cache: snapshots of parsed sheets keyed by workbook content hash
+SNAPSHOT_FOLDER = os.path.join(DATA_FOLDER, 'snapshots')
+SNAPSHOT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+SNAPSHOT_MAX_AGE_DAYS = 30
+
+# Ingestion config
+# EXCEL_ENGINE: 'auto' uses python-calamine when installed, else openpyxl
+EXCEL_ENGINE = 'auto'
+# Sheets parsed concurrently in a process pool (<= 1 parses serially)
+INGEST_WORKERS = 4
+
+# Upload jobs (background ingestion)
+UPLOAD_JOB_WORKERS = 1
+MAX_JOB_HISTORY = 50
+
+# Sort permutations (one int64 per row) kept per service, by (column, order) (LRU)
+SORT_CACHE_SIZE = 16
+
+# Exact-match filter bitmaps kept per service (LRU)
+MASK_CACHE_SIZE = 256
+# Row masks of whole filter sets, shared by /filter, /filters, /aggregate and /analytics (LRU)
+FILTER_MASK_CACHE_SIZE = 64
+
+# Compaction: text columns with distinct/rows ratio below this become categorical
+CATEGORY_MAX_RATIO = 0.5
+# Chi tiết tuyến 'x'/blank flag columns (by name); only these are stored as uint8 0/1
+FLAG_COLUMN_MARKERS = ['LoTrinhDMS', 'TanSuatDMS', 'TanSuatGoiY_Mapping']
+
+# Group-by results kept per service (LRU), i.e. per dataset version
+AGGREGATE_CACHE_SIZE = 128
+
+# POST /api/batch: sub-queries per request, and threads running them (shared by all batches)
+BATCH_MAX_QUERIES = 50
+BATCH_WORKERS = 4
+
+# Serialized GET responses kept per dataset version (LRU, bounded by count and size)
+RESPONSE_CACHE_SIZE = 128
+RESPONSE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Dataset registry: one workbook per dataset id (e.g. per region)
+DEFAULT_DATASET = 'default'
+# In-memory budget across datasets; least recently used ones are evicted to their snapshot
+DATASET_MEMORY_BUDGET = 1024 * 1024 * 1024
+
+# Published datasets: one pointer file per dataset id, shared by all worker processes
+DATASET_FOLDER = os.path.join(DATA_FOLDER, 'datasets')
+# How often (seconds) a worker checks a dataset's pointer for uploads made by other workers
+DATASET_SYNC_INTERVAL = 0.5
+# On startup, the most recently published datasets attached in the background (0 = only on first use)
+DATASET_RESTORE_COUNT = 4
+
+# Instrumentation: per-endpoint latency histograms at /api/metrics (Prometheus text format)
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_BYTES_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024, 100 * 1024 * 1024)
+# Opt-in sampling profiler: stacks of requests slower than the threshold are dumped to PROFILE_FOLDER
+PROFILE_SLOW_REQUESTS = False
+PROFILE_THRESHOLD_SECONDS = 1.0
+PROFILE_INTERVAL_SECONDS = 0.005
+PROFILE_FOLDER = os.path.join(DATA_FOLDER, 'profiles')
@@ -0,0 +1,294 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import namedtuple
+from types import MappingProxyType
+from config import DATASET_MEMORY_BUDGET, DATASET_FOLDER, DATASET_SYNC_INTERVAL, DATASET_RESTORE_COUNT
+from loader import parse_workbook, build_services, loaded_sheets
+import snapshot_cache
+import index_store
+
+DATASET_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# What a registry needs to know about an evicted dataset to reload it
+DatasetInfo = namedtuple('DatasetInfo', ['id', 'digest', 'version', 'file', 'sheets'])
+
+os.makedirs(DATASET_FOLDER, exist_ok=True)
+
+def valid_dataset_id(dataset_id):
+    return bool(dataset_id) and DATASET_ID_PATTERN.match(dataset_id) is not None
+
+# ============ Pointer files (cross-worker publication) ============
+def _pointer_path(dataset_id):
+    return os.path.join(DATASET_FOLDER, f'{dataset_id}.json')
+
+def write_pointer(info):
+    """Atomically publish which snapshot a dataset id points at -> pointer mtime"""
+    path = _pointer_path(info.id)
+    tmp_path = f'{path}.tmp-{uuid.uuid4().hex}'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'id': info.id,
+            'digest': info.digest,
+            'file': info.file,
+            'sheets': list(info.sheets),
+            'published': time.time()
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return os.stat(path).st_mtime_ns
+
+def read_pointer(dataset_id):
+    """(DatasetInfo, mtime) of a published dataset, or (None, None)"""
+    path = _pointer_path(dataset_id)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    info = DatasetInfo(dataset_id, data['digest'], data['digest'][:16], data['file'], tuple(data['sheets']))
+    return info, mtime
+
+def published_ids():
+    try:
+        names = os.listdir(DATASET_FOLDER)
+    except OSError:
+        return []
+    ids = [name[:-len('.json')] for name in names if name.endswith('.json')]
+    return [dataset_id for dataset_id in ids if valid_dataset_id(dataset_id)]
+
+def published_digests():
+    """Snapshots some published dataset points at (kept by snapshot eviction)"""
+    digests = set()
+    for dataset_id in published_ids():
+        info, _ = read_pointer(dataset_id)
+        if info is not None:
+            digests.add(info.digest)
+    return digests
+
+class Dataset:
+    """Immutable snapshot of one loaded workbook: its services plus what is needed to reload it.
+    
+    Built completely before it is published, never modified afterwards, so a reader
+    holding a reference always sees one consistent workbook.
+    """
+    __slots__ = ('id', 'digest', 'version', 'file', 'services', 'sheets', 'bytes')
+    
+    def __init__(self, dataset_id, digest, filepath, services, sheets):
+        values = {
+            'id': dataset_id,
+            'digest': digest,
+            'version': digest[:16],
+            'file': filepath,
+            'services': MappingProxyType(dict(services)),
+            'sheets': tuple(sheets),
+            'bytes': sum(svc.memory_usage()['bytes'] for svc in services.values() if svc is not None),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError('Dataset snapshots are immutable')
+    
+    def __delattr__(self, name):
+        raise AttributeError('Dataset snapshots are immutable')
+    
+    def service(self, key):
+        return self.services.get(key)
+    
+    def info(self):
+        return DatasetInfo(self.id, self.digest, self.version, self.file, self.sheets)
+
+class DatasetRegistry:
+    """Datasets keyed by id; LRU eviction to on-disk snapshots over a memory budget.
+    
+    Reads never take the lock: publishing a dataset is a single dict assignment,
+    so get() returns either the old snapshot or the new one, never a mix.
+    
+    With several worker processes, every put() also writes a pointer file. Other
+    workers notice it within sync_interval, attach the new snapshot from disk in the
+    background and swap it in; until then they keep serving the old one.
+    """
+    
+    def __init__(self, max_bytes=DATASET_MEMORY_BUDGET, sync_interval=DATASET_SYNC_INTERVAL):
+        self.max_bytes = max_bytes
+        self.sync_interval = sync_interval
+        self._loaded = {}
+        # id -> DatasetInfo for every known dataset, loaded or not
+        self._known = {}
+        self._last_access = {}
+        # Serializes writers (publish/reload/evict) only
+        self._lock = threading.Lock()
+        self._reload_locks = {}
+        # Pointer file mtimes already applied, and when each id was last checked
+        self._pointer_mtime = {}
+        self._checked = {}
+    
+    def put(self, dataset):
+        """Publish a fully built dataset (replaces any previous one with the same id)"""
+        with self._lock:
+            try:
+                self._pointer_mtime[dataset.id] = write_pointer(dataset.info())
+            except OSError as e:
+                print(f"✗ Could not publish dataset '{dataset.id}' to other workers: {e}")
+            self._last_access[dataset.id] = time.time()
+            self._loaded[dataset.id] = dataset
+            self._known[dataset.id] = dataset.info()
+            self._evict(keep=dataset.id)
+    
+    def get(self, dataset_id):
+        """Loaded dataset, reloading it from its snapshot if evicted; None if unknown"""
+        self._sync(dataset_id)
+        dataset = self._loaded.get(dataset_id)
+        if dataset is not None:
+            self._last_access[dataset_id] = time.time()
+            return dataset
+        if dataset_id not in self._known:
+            return None
+        return self._attach(dataset_id)
+    
+    def version(self, dataset_id):
+        """Version of a known dataset without loading it ('empty' if unknown)"""
+        self._sync(dataset_id)
+        known = self._known.get(dataset_id)
+        return known.version if known is not None else 'empty'
+    
+    def loaded_any(self):
+        self._sync_all()
+        return bool(self._known)
+    
+    def restore(self, count=DATASET_RESTORE_COUNT):
+        """Warm restart: adopt every published dataset, then attach the most recent ones from
+        their snapshots in a background thread.
+        
+        Requests don't wait for it: a dataset not attached yet is reloaded on first use
+        (get() and this thread share the per-dataset reload lock, so it is loaded once).
+        """
+        self._sync_all()
+        if count <= 0 or not self._known:
+            return None
+        # Oldest first, so the most recently published ones are the last LRU eviction victims
+        recent = sorted(list(self._known), key=lambda dataset_id: self._pointer_mtime.get(dataset_id, 0))[-count:]
+        thread = threading.Thread(target=self._restore, args=(recent,), name='dataset-restore', daemon=True)
+        thread.start()
+        return thread
+    
+    def _restore(self, dataset_ids):
+        start = time.perf_counter()
+        restored = [dataset_id for dataset_id in dataset_ids if self.get(dataset_id) is not None]
+        print(f"✓ Restored {len(restored)} dataset(s) {restored} in {time.perf_counter() - start:.2f}s")
+    
+    def list(self):
+        self._sync_all()
+        loaded = dict(self._loaded)
+        return [
+            {
+                'id': dataset_id,
+                'version': known.version,
+                'sheets': list(known.sheets),
+                'loaded': dataset_id in loaded,
+                'bytes': loaded[dataset_id].bytes if dataset_id in loaded else 0,
+                'last_access': self._last_access.get(dataset_id) if dataset_id in loaded else None,
+            }
+            for dataset_id, known in dict(self._known).items()
+        ]
+    
+    def _sync(self, dataset_id):
+        """Adopt an upload published by another worker (checked at most every sync_interval)"""
+        now = time.monotonic()
+        if now - self._checked.get(dataset_id, 0) < self.sync_interval:
+            return
+        self._checked[dataset_id] = now
+        
+        info, mtime = read_pointer(dataset_id)
+        if info is None or mtime == self._pointer_mtime.get(dataset_id):
+            return
+        with self._lock:
+            if mtime == self._pointer_mtime.get(dataset_id):
+                return
+            self._pointer_mtime[dataset_id] = mtime
+            known = self._known.get(dataset_id)
+            if known is not None and known.digest == info.digest:
+                return
+            self._known[dataset_id] = info
+            loaded = dataset_id in self._loaded
+        print(f"✓ Dataset '{dataset_id}' now at {info.version} (published by another worker)")
+        if loaded:
+            # Readers keep the old snapshot until the new one is attached, then it is swapped in
+            threading.Thread(
+                target=self._attach, args=(dataset_id,), name=f'dataset-sync-{dataset_id}', daemon=True
+            ).start()
+    
+    def _sync_all(self):
+        for dataset_id in published_ids():
+            self._sync(dataset_id)
+    
+    def _attach(self, dataset_id):
+        """Load the dataset's known snapshot (evicted, or newer than the loaded one) and publish it"""
+        with self._lock:
+            reload_lock = self._reload_locks.setdefault(dataset_id, threading.Lock())
+        
+        # One thread reloads; concurrent requests for the same dataset wait for it
+        with reload_lock:
+            current = self._loaded.get(dataset_id)
+            known = self._known.get(dataset_id)
+            if known is None or (current is not None and current.digest == known.digest):
+                return current
+            
+            dataset = self._reload(known)
+            with self._lock:
+                if self._known.get(dataset_id) is not known:
+                    # Re-uploaded while we were reloading; the new one wins
+                    return self._loaded.get(dataset_id)
+                if dataset is None:
+                    # Unloadable: keep serving the copy we have, if any
+                    current = self._loaded.get(dataset_id)
+                    if current is None:
+                        self._known.pop(dataset_id, None)
+                    else:
+                        self._known[dataset_id] = current.info()
+                    return current
+                self._last_access[dataset_id] = time.time()
+                self._loaded[dataset_id] = dataset
+                self._known[dataset_id] = dataset.info()
+                self._evict(keep=dataset_id)
+            return dataset
+    
+    def _evict(self, keep):
+        """Drop least recently used datasets from memory until under budget (caller holds lock)"""
+        total = sum(dataset.bytes for dataset in self._loaded.values())
+        by_age = sorted(self._loaded, key=lambda dataset_id: self._last_access.get(dataset_id, 0))
+        for dataset_id in by_age:
+            if total <= self.max_bytes:
+                break
+            if dataset_id == keep:
+                continue
+            dataset = self._loaded.pop(dataset_id)
+            total -= dataset.bytes
+            print(f"✓ Evicted dataset '{dataset_id}' ({dataset.bytes / 1024 / 1024:.1f} MB)")
+    
+    @staticmethod
+    def _reload(known):
+        """Rebuild services from the snapshot (and its persisted indexes), falling back to re-parsing the workbook"""
+        start = time.perf_counter()
+        frames = snapshot_cache.load(known.digest)
+        try:
+            # Snapshot evicted: re-parse, but only if the upload on disk is still the same workbook
+            if frames is None and snapshot_cache.file_hash(known.file) == known.digest:
+                frames = parse_workbook(known.file)
+                snapshot_cache.save(known.digest, frames, keep=published_digests())
+        except OSError as e:
+            print(f"✗ Reload error for dataset '{known.id}': {e}")
+        if frames is None:
+            return None
+        
+        indexes = index_store.load(known.digest)
+        services = build_services(frames, indexes)
+        if indexes is None:
+            index_store.save(known.digest, services)
+        dataset = Dataset(known.id, known.digest, known.file, services, loaded_sheets(frames))
+        print(f"✓ Reloaded dataset '{known.id}' in {time.perf_counter() - start:.2f}s")
+        return dataset
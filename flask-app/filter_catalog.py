@@ -0,0 +1,45 @@
+import numpy as np
+
+class FilterCatalog:
+    """Filter dropdown options with value counts, computed once per loaded dataset"""
+    
+    def __init__(self, options, mask_cache):
+        # options: {column: [option strings]} in the order the sheet shows them
+        self.options = options
+        self.mask_cache = mask_cache
+        self._full = self._with_counts({column: None for column in options})
+    
+    def _with_counts(self, masks):
+        """Options per column with counts under that column's mask (None = all rows)"""
+        catalog = {}
+        for column, values in self.options.items():
+            mask = masks[column]
+            codes, lookup = self.mask_cache.column_codes(column)
+            counts = np.bincount(codes if mask is None else codes[mask], minlength=len(lookup))
+            
+            entries = []
+            for value in values:
+                code = lookup.get(value.strip())
+                count = int(counts[code]) if code is not None else 0
+                if mask is None or count > 0:
+                    entries.append({'value': value, 'count': count})
+            catalog[column] = entries
+        return catalog
+    
+    def get(self, active_filters=None, mask_fn=None):
+        """Options with counts; cascading when filters are active.
+
+        Each column's options are restricted by every active filter except its own,
+        so a dropdown never collapses to the value already picked in it.
+        """
+        if not active_filters:
+            return self._full
+        
+        shared = {}
+        masks = {}
+        for column in self.options:
+            key = column if column in active_filters else None
+            if key not in shared:
+                shared[key] = mask_fn({k: v for k, v in active_filters.items() if k != key})
+            masks[column] = shared[key]
+        return self._with_counts(masks)
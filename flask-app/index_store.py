@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import uuid
+import numpy as np
+from search_index import ColumnIndex
+import snapshot_cache
+
+# Bump when the persisted layout (or how indexes are built) changes; older index folders are rebuilt
+INDEX_FORMAT = 1
+INDEX_FOLDER = 'indexes'
+MANIFEST = 'manifest.json'
+
+def _index_dir(digest):
+    return os.path.join(snapshot_cache.snapshot_dir(digest), INDEX_FOLDER)
+
+# ============ Writing ============
+def _write_arrays(folder, prefix, arrays):
+    """Save arrays as .npy files (uncompressed, so they can be memory-mapped) -> {name: filename}"""
+    files = {}
+    for name, values in arrays.items():
+        filename = f'{prefix}-{name}.npy'
+        np.save(os.path.join(folder, filename), np.ascontiguousarray(values), allow_pickle=False)
+        files[name] = filename
+    return files
+
+def _sheet_state(folder, key, service):
+    """Write the search indexes and filter codes one service has built -> its JSON state"""
+    state = {'codes': {}, 'search': {}}
+    if getattr(service, 'mask_cache', None) is not None:
+        for i, (column, (codes, lookup)) in enumerate(service.mask_cache.built_codes().items()):
+            state['codes'][column] = {
+                'values': list(lookup),
+                # Smallest unsigned dtype holding every code (most filter columns have < 256 values)
+                'arrays': _write_arrays(folder, f'{key}-codes{i}', {
+                    'codes': codes.astype(np.min_scalar_type(max(len(lookup) - 1, 0)))
+                })
+            }
+    if getattr(service, 'search_index', None) is not None:
+        for i, (column, index) in enumerate(service.search_index.built().items()):
+            arrays, meta = index.state()
+            state['search'][column] = dict(meta, arrays=_write_arrays(folder, f'{key}-search{i}', arrays))
+    return state
+
+def save(digest, services):
+    """Persist the indexes built for a dataset's services next to its snapshot (once per digest)"""
+    folder = _index_dir(digest)
+    if os.path.exists(folder) or not os.path.isdir(os.path.dirname(folder)):
+        return
+    
+    tmp_folder = f"{folder}.tmp-{uuid.uuid4().hex}"
+    try:
+        os.makedirs(tmp_folder)
+        manifest = {'format': INDEX_FORMAT, 'sheets': {}}
+        for key, service in services.items():
+            if service is None:
+                continue
+            filename = f'{key}.json'
+            with open(os.path.join(tmp_folder, filename), 'w', encoding='utf-8') as f:
+                json.dump(_sheet_state(tmp_folder, key, service), f, ensure_ascii=False)
+            manifest['sheets'][key] = filename
+        with open(os.path.join(tmp_folder, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        
+        # Publish atomically; another worker may have saved the same indexes
+        if os.path.exists(folder):
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+        else:
+            os.rename(tmp_folder, folder)
+        print(f"✓ Indexes saved {digest[:12]}")
+    except Exception as e:
+        print(f"✗ Index save error: {e}")
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+
+# ============ Reading ============
+class SheetIndexes:
+    """Persisted indexes of one sheet; a column is read on first use, its arrays memory-mapped"""
+    
+    def __init__(self, folder, state):
+        self.folder = folder
+        self.state = state
+    
+    def _arrays(self, files):
+        return {
+            name: np.load(os.path.join(self.folder, filename), mmap_mode='r', allow_pickle=False)
+            for name, filename in files.items()
+        }
+    
+    def codes(self, column):
+        """(codes, {value: code}) for MaskCache.column_codes, None if not persisted"""
+        entry = self.state['codes'].get(column)
+        if entry is None:
+            return None
+        try:
+            codes = self._arrays(entry['arrays'])['codes']
+        except (OSError, ValueError) as e:
+            print(f"✗ Persisted codes for '{column}' unreadable, rebuilding: {e}")
+            return None
+        return codes, {value: code for code, value in enumerate(entry['values'])}
+    
+    def search(self, column):
+        """ColumnIndex for SearchIndex.column, None if not persisted"""
+        entry = self.state['search'].get(column)
+        if entry is None:
+            return None
+        try:
+            return ColumnIndex.from_state(self._arrays(entry['arrays']), entry)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"✗ Persisted index for '{column}' unreadable, rebuilding: {e}")
+            return None
+
+class IndexStore:
+    """Indexes persisted with one snapshot; a sheet's state is read when its service is built"""
+    
+    def __init__(self, folder, sheets):
+        self.folder = folder
+        self.sheets = sheets
+    
+    def sheet(self, key):
+        """SheetIndexes for a sheet key, None if nothing was persisted for it"""
+        filename = self.sheets.get(key)
+        if filename is None:
+            return None
+        try:
+            with open(os.path.join(self.folder, filename), encoding='utf-8') as f:
+                return SheetIndexes(self.folder, json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"✗ Persisted indexes for {key} unreadable, rebuilding: {e}")
+            return None
+
+def load(digest):
+    """IndexStore for a snapshot, None if its indexes were never saved (or have an old format)"""
+    folder = _index_dir(digest)
+    try:
+        with open(os.path.join(folder, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except OSError:
+        return None
+    except ValueError:
+        manifest = {}
+    if manifest.get('format') != INDEX_FORMAT:
+        # Dropped so the next save() writes the current format
+        shutil.rmtree(folder, ignore_errors=True)
+        return None
+    return IndexStore(folder, manifest['sheets'])
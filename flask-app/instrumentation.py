@@ -0,0 +1,315 @@
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_request_context, request
+from config import (
+    METRICS_LATENCY_BUCKETS, METRICS_BYTES_BUCKETS, PROFILE_SLOW_REQUESTS,
+    PROFILE_THRESHOLD_SECONDS, PROFILE_INTERVAL_SECONDS, PROFILE_FOLDER
+)
+
+# Stage timings outside a request (upload jobs, benchmarks) are labelled with this endpoint
+BACKGROUND = 'background'
+
+# ============ Metric types ============
+class Histogram:
+    """Cumulative-bucket histogram per label set (Prometheus semantics)"""
+    
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._counts = {}
+        self._sums = defaultdict(float)
+    
+    def observe(self, label_values, value):
+        counts = self._counts.get(label_values)
+        if counts is None:
+            counts = self._counts[label_values] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[label_values] += value
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_values, counts in sorted(self._counts.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {_number(self._sums[label_values])}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+class CounterMetric:
+    """Monotonic counter per label set"""
+    
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = defaultdict(float)
+    
+    def inc(self, label_values, amount=1):
+        self._values[label_values] += amount
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{{{_labels(self.labels, label_values)}}} {_number(value)}')
+        return lines
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+def render_sample(name, help_text, kind, value):
+    """Prometheus text for one unlabelled value measured outside Metrics (e.g. a cache size)"""
+    return f'# HELP {name} {help_text}\n# TYPE {name} {kind}\n{name} {_number(value)}\n'
+
+class Metrics:
+    """Request and stage metrics of this process, rendered in Prometheus text format"""
+    
+    def __init__(self, latency_buckets=METRICS_LATENCY_BUCKETS, bytes_buckets=METRICS_BYTES_BUCKETS):
+        self._lock = threading.Lock()
+        self.request_seconds = Histogram(
+            'smartbi_request_duration_seconds', 'Request latency by endpoint',
+            ('endpoint', 'method', 'status'), latency_buckets)
+        self.stage_seconds = Histogram(
+            'smartbi_stage_duration_seconds', 'Time spent per processing stage (parse, clean, compute, filter, serialize)',
+            ('endpoint', 'stage'), latency_buckets)
+        self.response_bytes = Histogram(
+            'smartbi_response_bytes', 'Response payload size by endpoint',
+            ('endpoint',), bytes_buckets)
+        self.response_rows = CounterMetric(
+            'smartbi_response_rows_total', 'Data rows returned by endpoint', ('endpoint',))
+        self.profiles = CounterMetric(
+            'smartbi_slow_request_profiles_total', 'Slow requests whose profile was dumped', ('endpoint',))
+    
+    def observe_request(self, endpoint, method, status, seconds, size, rows):
+        with self._lock:
+            self.request_seconds.observe((endpoint, method, str(status)), seconds)
+            if size is not None:
+                self.response_bytes.observe((endpoint,), size)
+            if rows:
+                self.response_rows.inc((endpoint,), rows)
+    
+    def observe_stage(self, endpoint, stage, seconds):
+        with self._lock:
+            self.stage_seconds.observe((endpoint, stage), seconds)
+    
+    def observe_profile(self, endpoint):
+        with self._lock:
+            self.profiles.inc((endpoint,))
+    
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (self.request_seconds, self.stage_seconds, self.response_bytes,
+                           self.response_rows, self.profiles):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+# ============ Stage timing ============
+class RequestTimings:
+    """Stages and row count of the request being handled"""
+    
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.stages = defaultdict(float)
+        self.rows = 0
+
+# Endpoint a worker thread is doing work for (see endpoint_label)
+_thread_endpoint = threading.local()
+
+def _current():
+    """Timings of the request being handled, None in background threads"""
+    return g.get('request_timings') if has_request_context() else None
+
+def current_endpoint():
+    """Endpoint label for stage timings: the request's, a worker thread's label, or BACKGROUND"""
+    timings = _current()
+    if timings is not None:
+        return timings.endpoint
+    return getattr(_thread_endpoint, 'name', None) or BACKGROUND
+
+@contextmanager
+def endpoint_label(endpoint):
+    """Label stage timings in this thread with a request's endpoint (e.g. a batch sub-query
+    running in a pool thread, outside the request context)"""
+    previous = getattr(_thread_endpoint, 'name', None)
+    _thread_endpoint.name = endpoint
+    try:
+        yield
+    finally:
+        _thread_endpoint.name = previous
+
+def record_stage(name, seconds):
+    """Add a timing measured elsewhere (e.g. in an ingest worker process)"""
+    timings = _current()
+    if timings is not None:
+        timings.stages[name] += seconds
+    metrics.observe_stage(current_endpoint(), name, seconds)
+
+@contextmanager
+def stage(name):
+    """Time a processing stage: `with stage('filter'): ...`. Stages may nest."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+def timed(name):
+    """Decorator form of stage(): `@timed('compute')`"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def timed_iter(iterable, name):
+    """Yield from iterable, counting the time spent producing items as a stage (streamed bodies)"""
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            record_stage(name, time.perf_counter() - start)
+            return
+        record_stage(name, time.perf_counter() - start)
+        yield item
+
+def record_rows(count):
+    timings = _current()
+    if timings is not None:
+        timings.rows += count
+
+# ============ Sampling profiler ============
+class SamplingProfiler:
+    """Samples the stacks of threads serving requests; dumps the slow ones.
+    
+    One background thread wakes every interval and records the current stack of each
+    registered request thread, so overhead does not grow with the code being run.
+    Dumps are collapsed stacks ("frame;frame;frame count"), the flamegraph input format.
+    """
+    
+    def __init__(self, threshold=PROFILE_THRESHOLD_SECONDS, interval=PROFILE_INTERVAL_SECONDS, folder=PROFILE_FOLDER):
+        self.threshold = threshold
+        self.interval = interval
+        self.folder = folder
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def _ensure_started(self):
+        if self._thread is None:
+            os.makedirs(self.folder, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+    
+    def begin(self):
+        with self._lock:
+            self._ensure_started()
+            self._active[threading.get_ident()] = Counter()
+    
+    def end(self, endpoint, seconds):
+        """Stop sampling this thread -> dump path if the request was slow, else None"""
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if not samples or seconds < self.threshold:
+            return None
+        
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', endpoint)
+        path = os.path.join(self.folder, f'{time.strftime("%Y%m%d-%H%M%S")}-{name}-{int(seconds * 1000)}ms.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+profiler = SamplingProfiler() if PROFILE_SLOW_REQUESTS else None
+
+# ============ Flask middleware ============
+def _server_timing(timings):
+    parts = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in timings.stages.items()]
+    parts.append(f'total;dur={(time.perf_counter() - timings.start) * 1000:.1f}')
+    return ', '.join(parts)
+
+def _finish(timings, method, status, size):
+    seconds = time.perf_counter() - timings.start
+    metrics.observe_request(timings.endpoint, method, status, seconds, size, timings.rows)
+    if profiler is not None:
+        path = profiler.end(timings.endpoint, seconds)
+        if path is not None:
+            metrics.observe_profile(timings.endpoint)
+            print(f"✓ Slow request {timings.endpoint} ({seconds:.2f}s): profile at {path}")
+
+def _streamed(body, timings, method, status):
+    """Pass a streamed body through, recording the request once it has been sent"""
+    size = 0
+    try:
+        for chunk in body:
+            size += len(chunk)
+            yield chunk
+    finally:
+        _finish(timings, method, status, size)
+
+def _before_request():
+    g.request_timings = RequestTimings(request.endpoint or 'unmatched')
+    if profiler is not None:
+        profiler.begin()
+
+def _after_request(response):
+    timings = g.get('request_timings')
+    if timings is None:
+        return response
+    response.headers['Server-Timing'] = _server_timing(timings)
+    
+    if response.is_streamed and response.content_length is None:
+        # Streamed bodies are serialized while being sent: time them to the last chunk
+        response.response = _streamed(response.response, timings, request.method, response.status_code)
+    else:
+        _finish(timings, request.method, response.status_code, response.content_length)
+    return response
+
+def init_app(app):
+    """Register the timing middleware on the app (covers every blueprint)"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,100 @@
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import UPLOAD_JOB_WORKERS, MAX_JOB_HISTORY
+
+# Jobs never dropped from the history
+ACTIVE_STATUSES = ('queued', 'running')
+
+class Job:
+    """State of one background upload/ingestion job"""
+    
+    def __init__(self, filename):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = 'queued'
+        self.stage = None
+        self.sheets = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self.done_event = threading.Event()
+    
+    def set_stage(self, stage):
+        with self._lock:
+            self.stage = stage
+    
+    def sheet_progress(self, sheet, status, rows=None, seconds=None):
+        """Progress callback for parse_workbook"""
+        with self._lock:
+            entry = self.sheets.setdefault(sheet, {})
+            entry['status'] = status
+            if rows is not None:
+                entry['rows'] = rows
+            if seconds is not None:
+                entry['seconds'] = round(seconds, 3)
+    
+    def to_dict(self):
+        with self._lock:
+            elapsed_end = self.finished_at or time.time()
+            return {
+                'job_id': self.id,
+                'filename': self.filename,
+                'status': self.status,
+                'stage': self.stage,
+                'sheets': {name: dict(info) for name, info in self.sheets.items()},
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'elapsed': round(elapsed_end - self.started_at, 3) if self.started_at else None
+            }
+
+class JobManager:
+    """Runs ingestion jobs in a background executor and keeps recent job states"""
+    
+    def __init__(self, max_workers=UPLOAD_JOB_WORKERS, max_history=MAX_JOB_HISTORY):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upload')
+        self.max_history = max_history
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def submit(self, filename, fn, *args):
+        """Queue fn(job, *args); its return value becomes job.result"""
+        job = Job(filename)
+        with self._lock:
+            self.jobs[job.id] = job
+            # Oldest finished jobs go first; queued/running ones stay visible until they finish
+            excess = len(self.jobs) - self.max_history
+            if excess > 0:
+                finished = [job_id for job_id, old in self.jobs.items() if old.status not in ACTIVE_STATUSES]
+                for job_id in finished[:excess]:
+                    del self.jobs[job_id]
+        self.executor.submit(self._run, job, fn, args)
+        return job
+    
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+    
+    def _run(self, job, fn, args):
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = fn(job, *args)
+            job.status = 'done'
+        except Exception as e:
+            print(f"✗ Job {job.id} failed: {e}")
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = 'error'
+        finally:
+            job.finished_at = time.time()
+            job.done_event.set()
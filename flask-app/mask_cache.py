@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config import MASK_CACHE_SIZE, FILTER_MASK_CACHE_SIZE
+
+class MaskCache:
+    """LRU cache of packed bitmaps per (column, value) for exact-match filters,
+    and of the combined row mask per filter set.
+    
+    indexes: persisted column codes of this frame (index_store.SheetIndexes), used instead of factorizing.
+    """
+    
+    def __init__(self, df, max_entries=MASK_CACHE_SIZE, max_filter_sets=FILTER_MASK_CACHE_SIZE, indexes=None):
+        self.df = df
+        self.indexes = indexes
+        self.max_entries = max_entries
+        self.max_filter_sets = max_filter_sets
+        self._bitmaps = OrderedDict()
+        self._filter_sets = OrderedDict()
+        self._columns = {}
+        self._lock = threading.Lock()
+    
+    def column_codes(self, column):
+        """Factorized stripped string values of a column (matches dropdown values)"""
+        entry = self._columns.get(column)
+        if entry is None:
+            entry = self.indexes.codes(column) if self.indexes is not None else None
+            if entry is None or len(entry[0]) != len(self.df):
+                codes, uniques = pd.factorize(self.df[column].astype(str).str.strip())
+                entry = (codes, {value: code for code, value in enumerate(uniques)})
+            with self._lock:
+                self._columns[column] = entry
+        return entry
+    
+    def built_codes(self):
+        """{column: (codes, {value: code})} of the columns factorized so far"""
+        with self._lock:
+            return dict(self._columns)
+    
+    def bitmap(self, column, value):
+        """Packed bitmap of rows where str(cell).strip() == value"""
+        key = (column, str(value).strip())
+        with self._lock:
+            bits = self._bitmaps.get(key)
+            if bits is not None:
+                self._bitmaps.move_to_end(key)
+                return bits
+        
+        codes, lookup = self.column_codes(column)
+        code = lookup.get(key[1])
+        if code is None:
+            bits = np.zeros((len(codes) + 7) // 8, dtype=np.uint8)
+        else:
+            bits = np.packbits(codes == code)
+        
+        with self._lock:
+            self._bitmaps[key] = bits
+            while len(self._bitmaps) > self.max_entries:
+                self._bitmaps.popitem(last=False)
+        return bits
+    
+    def match_all(self, filters):
+        """AND of exact-match bitmaps for (column, value) pairs -> boolean row mask"""
+        combined = None
+        for column, value in filters:
+            bits = self.bitmap(column, value)
+            combined = bits.copy() if combined is None else np.bitwise_and(combined, bits, out=combined)
+        
+        if combined is None:
+            return np.ones(len(self.df), dtype=bool)
+        return np.unpackbits(combined, count=len(self.df)).astype(bool)
+    
+    def filter_mask(self, key, compute):
+        """Row mask of one filter set: compute() runs once per key, the result is kept packed"""
+        with self._lock:
+            bits = self._filter_sets.get(key)
+            if bits is not None:
+                self._filter_sets.move_to_end(key)
+        if bits is not None:
+            return np.unpackbits(bits, count=len(self.df)).astype(bool)
+        
+        mask = compute()
+        with self._lock:
+            self._filter_sets[key] = np.packbits(mask)
+            while len(self._filter_sets) > self.max_filter_sets:
+                self._filter_sets.popitem(last=False)
+        return mask
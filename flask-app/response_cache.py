@@ -0,0 +1,52 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_BYTES
+
+def make_etag(version, path, args, fmt):
+    """ETag from dataset version + path + normalized query args + response format"""
+    # Same semantics as args.get(): first value per key, order-independent
+    normalized = '&'.join(f'{key}={args.get(key)}' for key in sorted(args))
+    raw = f'{version}|{path}|{normalized}|{fmt}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """LRU cache of serialized response bodies keyed by ETag"""
+    
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """(body, mimetype) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key, body, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (body, mimetype)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+    
+    def stats(self):
+        """Size and hit counts, for /api/metrics"""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
@@ -1,294 +1,548 @@
 # File: routes.py - ALL ROUTES MERGED
 import os
-import pandas as pd
-from flask import Blueprint, request, jsonify, send_file
+import uuid
+from functools import wraps
+from flask import Blueprint, Response, g, request, make_response, send_file, stream_with_context
 from werkzeug.utils import secure_filename
-from config import UPLOAD_FOLDER, SHEET_DOANHSO, SHEET_DSKH, SHEET_TUYEN, SHEET_CHITIETTUYEN
-from utils import validate_file
-from services.doanhso_service import DoanhsoService
-from services.dskh_service import DSKHService
-from services.tuyen_service import TuyenService
-from services.chitiet_tuyen_service import ChitietTuyenService
+from config import UPLOAD_FOLDER, DEFAULT_DATASET
+from utils import validate_file, parse_pagination, filter_params, exact_match, paged_response
+from serializers import (
+    MIME_JSON, json_response, dumps, object_json, result_json, frame_json, columnar_json, iter_ndjson,
+    result_to_arrow, pa
+)
+from aggregation import parse_aggregate, empty_result
+from batch import parse_batch, run_batch
+from loader import SHEET_KEYS, parse_workbook, build_services, loaded_sheets
+from jobs import JobManager
+from datasets import Dataset, DatasetRegistry, valid_dataset_id, published_digests
+from response_cache import ResponseCache, make_etag
+from instrumentation import metrics, stage, timed_iter, record_rows, render_sample
+import snapshot_cache
+import index_store
 
 api = Blueprint('api', __name__, url_prefix='/api')
 
-# Global service instances
-doanhso_service = None
-dskh_service = None
-tuyen_service = None
-chitiet_service = None
-current_file = None
+# Loaded workbooks by dataset id; legacy routes without a dataset id use DEFAULT_DATASET
+registry = DatasetRegistry()
+
+job_manager = JobManager()
+response_cache = ResponseCache()
+
+# ============ Dataset resolution ============
+@api.url_value_preprocessor
+def _pull_dataset_id(endpoint, values):
+    """/api/<dataset_id>/... routes: take dataset_id out of the view args"""
+    g.dataset_id = (values or {}).pop('dataset_id', DEFAULT_DATASET)
+
+@api.before_request
+def _check_dataset():
+    dataset_id = g.get('dataset_id', DEFAULT_DATASET)
+    if not valid_dataset_id(dataset_id):
+        return json_response({'error': f'Invalid dataset id: {dataset_id}'}), 400
+    # Named datasets must exist, except when uploading one
+    if (dataset_id != DEFAULT_DATASET and request.endpoint != 'api.upload_file'
+            and registry.version(dataset_id) == 'empty'):
+        return json_response({'error': f'Dataset not found: {dataset_id}'}), 404
+
+def _dataset():
+    """Dataset snapshot for the current request (reloaded if it was evicted), or None.
+    
+    Taken once per request: an upload publishing a new snapshot mid-request
+    doesn't change what this request sees.
+    """
+    if 'dataset' not in g:
+        g.dataset = registry.get(g.dataset_id)
+    return g.dataset
+
+def _service(key):
+    dataset = _dataset()
+    return dataset.service(key) if dataset is not None else None
+
+# ============ Response helpers ============
+MIME_NDJSON = 'application/x-ndjson'
+MIME_COLUMNAR = 'application/vnd.smartbi.columnar+json'
+MIME_ARROW = 'application/vnd.apache.arrow.stream'
+
+def _response_format():
+    """Negotiate row format from ?stream=1 or the Accept header"""
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        return MIME_NDJSON
+    return request.accept_mimetypes.best_match(
+        [MIME_JSON, MIME_NDJSON, MIME_COLUMNAR, MIME_ARROW]
+    ) or MIME_JSON
+
+def _rows_response(result, legacy_list=False):
+    """Serialize a service result whose 'data' holds the rows"""
+    fmt = _response_format()
+    record_rows(len(result['data']) if result.get('data') is not None else 0)
+    if fmt == MIME_NDJSON:
+        return Response(stream_with_context(timed_iter(iter_ndjson(result), 'serialize')), mimetype=MIME_NDJSON)
+    if fmt == MIME_ARROW and pa is None:
+        return json_response({'error': 'Arrow format requires pyarrow'}), 406
+    
+    with stage('serialize'):
+        if fmt == MIME_COLUMNAR:
+            return json_response(columnar_json(result), mimetype=MIME_COLUMNAR), 200
+        if fmt == MIME_ARROW:
+            return Response(result_to_arrow(result), mimetype=MIME_ARROW), 200
+        if legacy_list:
+            # Unpaged filter routes return the bare row list
+            return json_response(frame_json(result['data'])), 200
+        return json_response(result_json(result)), 200
+
+def cached_get(view):
+    """ETag + If-None-Match (304) + cached body for read-only GET routes"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        fmt = _response_format()
+        etag = make_etag(registry.version(g.dataset_id), request.path, request.args, fmt)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            cached = response_cache.get(etag)
+            if cached is not None:
+                body, mimetype = cached
+                response = Response(body, mimetype=mimetype)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # Tag with the snapshot actually served (an upload may have landed meanwhile)
+                served = g.get('dataset')
+                etag = make_etag(served.version if served is not None else 'empty',
+                                 request.path, request.args, fmt)
+                if not response.is_streamed:
+                    response_cache.put(etag, response.get_data(), response.mimetype)
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept')
+        return response
+    return wrapper
 
 # ============ Health Check ============
 @api.route('/health', methods=['GET'])
 def health():
-    return jsonify({
+    return json_response({
         'status': 'ok',
-        'loaded': any([doanhso_service, dskh_service, tuyen_service, chitiet_service])
+        'loaded': registry.loaded_any()
+    }), 200
+
+@api.route('/datasets', methods=['GET'])
+def list_datasets():
+    """Known datasets, whether each is in memory, and the memory budget"""
+    datasets = registry.list()
+    return json_response({
+        'datasets': datasets,
+        'loaded_bytes': sum(d['bytes'] for d in datasets),
+        'budget_bytes': registry.max_bytes
+    }), 200
+
+# ============ Metrics ============
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Latency histograms, stage timings, rows and payload bytes per endpoint,
+    plus response cache size and hits (Prometheus text)"""
+    cache = response_cache.stats()
+    body = metrics.render() + ''.join([
+        render_sample('smartbi_response_cache_entries', 'Serialized GET responses cached', 'gauge', cache['entries']),
+        render_sample('smartbi_response_cache_bytes', 'Bytes of cached response bodies', 'gauge', cache['bytes']),
+        render_sample('smartbi_response_cache_hits_total', 'GET responses served from the response cache', 'counter', cache['hits']),
+        render_sample('smartbi_response_cache_misses_total', 'GET responses not found in the response cache', 'counter', cache['misses']),
+    ])
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# ============ Filter options ============
+@api.route('/filters/<sheet>', methods=['GET'])
+@api.route('/<dataset_id>/filters/<sheet>', methods=['GET'])
+@cached_get
+def get_filter_options(sheet):
+    """Filter dropdown options with counts; query args act as cascading filters"""
+    if sheet not in SHEET_KEYS.values():
+        return json_response({'error': f'Unknown sheet: {sheet}'}), 404
+    try:
+        service = _service(sheet)
+        options = {}
+        if service is not None:
+            options = service.filter_options(filter_params(request.args), exact_match(request.args))
+        return json_response({'sheet': sheet, 'options': options}), 200
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        return json_response({'error': str(e)}), 500
+
+# ============ Aggregation ============
+@api.route('/aggregate/<sheet>', methods=['GET'])
+@api.route('/<dataset_id>/aggregate/<sheet>', methods=['GET'])
+@cached_get
+def aggregate(sheet):
+    """Group-by measures: ?group_by=a,b&measures=sum(x),count&top=10 plus the /filter query args"""
+    if sheet not in SHEET_KEYS.values():
+        return json_response({'error': f'Unknown sheet: {sheet}'}), 404
+    try:
+        spec = parse_aggregate(request.args)
+        service = _service(sheet)
+        if service is None:
+            return _rows_response(empty_result(spec))
+        result = service.aggregate(spec, filter_params(request.args), exact_match(request.args))
+        return _rows_response(result)
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        return json_response({'error': str(e)}), 500
+
+# ============ Batch ============
+@api.route('/batch', methods=['POST'])
+@api.route('/<dataset_id>/batch', methods=['POST'])
+def batch():
+    """Several data/filter/filters/analytics/aggregate queries answered from one dataset version.
+    
+    Body: {"queries": [{"id": ..., "type": "filter", "sheet": "dskh", "params": {...query args}}]}
+    Each result carries the status and body its GET route would return.
+    """
+    try:
+        queries = parse_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
+    try:
+        dataset = _dataset()
+        results, rows = run_batch(dataset, queries)
+        record_rows(rows)
+        return json_response(object_json({
+            'dataset': dumps(g.dataset_id),
+            'version': dumps(dataset.version if dataset is not None else 'empty'),
+            'results': results
+        })), 200
+    except Exception as e:
+        print(f"✗ Error: {e}")
+        return json_response({'error': str(e)}), 500
+
+# ============ Memory ============
+@api.route('/memory', methods=['GET'])
+@api.route('/<dataset_id>/memory', methods=['GET'])
+def memory():
+    """Bytes held per loaded sheet and per column"""
+    dataset = _dataset()
+    services = dataset.services if dataset is not None else {}
+    sheets = {key: svc.memory_usage() for key, svc in services.items() if svc is not None}
+    return json_response({
+        'total_bytes': sum(info['bytes'] for info in sheets.values()),
+        'sheets': sheets
     }), 200
 
 # ============ Upload ============
+def store_upload(filepath, digest):
+    """Move a just-saved upload to its content-addressed name -> stored path.
+    
+    Re-uploads of the same workbook share one file instead of piling up copies.
+    """
+    stored = os.path.join(os.path.dirname(filepath), f'{digest}.xlsx')
+    if os.path.exists(stored):
+        os.remove(filepath)
+    else:
+        os.replace(filepath, stored)
+    return stored
+
+def _ingest(job, filepath, dataset_id):
+    """Background job: parse (or load snapshot), build services, then swap them in"""
+    # Re-uploads of the same workbook skip the Excel parse
+    job.set_stage('hashing')
+    digest = snapshot_cache.file_hash(filepath)
+    filepath = store_upload(filepath, digest)
+    frames = snapshot_cache.load(digest)
+    indexes = None
+    if frames is None:
+        job.set_stage('parsing')
+        frames = parse_workbook(filepath, progress=job.sheet_progress)
+        snapshot_cache.save(digest, frames, keep=published_digests())
+    else:
+        indexes = index_store.load(digest)
+        for sheet in loaded_sheets(frames):
+            job.sheet_progress(sheet, 'cached', len(frames[SHEET_KEYS[sheet]]))
+    
+    # Build everything off to the side; readers keep using the old dataset meanwhile
+    job.set_stage('building')
+    sheets_loaded = loaded_sheets(frames)
+    services = build_services(frames, indexes)
+    registry.put(Dataset(dataset_id, digest, filepath, services, sheets_loaded))
+    # Persist the indexes just built, so a restart (or another worker) memory-maps them
+    if indexes is None:
+        index_store.save(digest, services)
+    job.set_stage('done')
+    
+    return {
+        'success': True,
+        'dataset': dataset_id,
+        'sheets': sheets_loaded,
+        'message': f'Upload thành công {len(sheets_loaded)} sheet(s)'
+    }
+
 @api.route('/upload', methods=['POST'])
+@api.route('/<dataset_id>/upload', methods=['POST'])
 def upload_file():
-    global doanhso_service, dskh_service, tuyen_service, chitiet_service, current_file
-    
     if 'file' not in request.files:
-        return jsonify({'error': 'No file'}), 400
+        return json_response({'error': 'No file'}), 400
     
     file = request.files['file']
     if not validate_file(file.filename):
-        return jsonify({'error': 'Only .xlsx files'}), 400
+        return json_response({'error': 'Only .xlsx files'}), 400
     
     try:
         filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        folder = UPLOAD_FOLDER
+        if g.dataset_id != DEFAULT_DATASET:
+            # Each dataset's workbooks in their own folder
+            folder = os.path.join(UPLOAD_FOLDER, g.dataset_id)
+            os.makedirs(folder, exist_ok=True)
+        # Unique until the job renames it to its content digest: a same-named upload
+        # must not overwrite a file a job is still parsing
+        filepath = os.path.join(folder, f"{uuid.uuid4().hex}_{filename}")
         file.save(filepath)
         
-        excel = pd.ExcelFile(filepath)
-        sheets = excel.sheet_names
-        print(f"✓ Excel sheets: {sheets}")
-        
-        sheets_loaded = []
+        job = job_manager.submit(filename, _ingest, filepath, g.dataset_id)
         
-        # Load Doanh số
-        if SHEET_DOANHSO in sheets:
-            try:
-                df_doanhso = pd.read_excel(filepath, sheet_name=SHEET_DOANHSO).fillna(0)
-                doanhso_service = DoanhsoService(df_doanhso)
-                sheets_loaded.append(SHEET_DOANHSO)
-                print(f"✓ {SHEET_DOANHSO}: {len(df_doanhso)} rows")
-            except Exception as e:
-                print(f"✗ Error loading {SHEET_DOANHSO}: {e}")
-                doanhso_service = None
+        # ?wait=1 keeps the old synchronous behaviour (scripts, tests)
+        if request.args.get('wait', '').lower() in ('1', 'true'):
+            job.done_event.wait()
+            if job.status == 'error':
+                return json_response({'error': job.error, 'job_id': job.id}), 500
+            return json_response(dict(job.result, job_id=job.id)), 200
         
-        # Load DSKH
-        if SHEET_DSKH in sheets:
-            try:
-                df_dskh = pd.read_excel(filepath, sheet_name=SHEET_DSKH, header=1).fillna('')
-                dskh_service = DSKHService(df_dskh)
-                sheets_loaded.append(SHEET_DSKH)
-                print(f"✓ {SHEET_DSKH}: {len(df_dskh)} rows")
-            except Exception as e:
-                print(f"✗ Error loading {SHEET_DSKH}: {e}")
-                dskh_service = None
-        
-        # Load Tuyến
-        if SHEET_TUYEN in sheets:
-            try:
-                df_tuyen = pd.read_excel(filepath, sheet_name=SHEET_TUYEN, header=1).fillna('')
-                tuyen_service = TuyenService(df_tuyen)
-                sheets_loaded.append(SHEET_TUYEN)
-                print(f"✓ {SHEET_TUYEN}: {len(df_tuyen)} rows")
-            except Exception as e:
-                print(f"✗ Error loading {SHEET_TUYEN}: {e}")
-                tuyen_service = None
-        
-        # Load Chi tiết tuyến
-        if SHEET_CHITIETTUYEN in sheets:
-            try:
-                df_chitiet = pd.read_excel(
-                    filepath, 
-                    sheet_name=SHEET_CHITIETTUYEN,
-                    header=[2, 3],
-                    skiprows=0
-                ).fillna('')
-                
-                # Flatten columns nếu MultiIndex
-                if isinstance(df_chitiet.columns, pd.MultiIndex):
-                    df_chitiet.columns = [
-                        ' '.join(col).strip() 
-                        for col in df_chitiet.columns.values
-                    ]
-                
-                print(f"✓ Shape after read: {df_chitiet.shape}")
-                print(f"✓ Columns: {df_chitiet.columns[:20].tolist()}")
-                
-                chitiet_service = ChitietTuyenService(df_chitiet)
-                sheets_loaded.append(SHEET_CHITIETTUYEN)
-                print(f"✓ {SHEET_CHITIETTUYEN}: {len(df_chitiet)} rows")
-            except Exception as e:
-                print(f"✗ Error loading {SHEET_CHITIETTUYEN}: {e}")
-                import traceback
-                traceback.print_exc()
-                chitiet_service = None
-        
-        current_file = filepath
-        
-        return jsonify({
+        return json_response({
             'success': True,
-            'sheets': sheets_loaded,
-            'message': f'Upload thành công {len(sheets_loaded)} sheet(s)'
-        }), 200
+            'job_id': job.id,
+            'status_url': f'/api/jobs/{job.id}',
+            'message': 'Đang xử lý file...'
+        }), 202
     
     except Exception as e:
         print(f"✗ Upload error: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return json_response({'error': 'Job not found'}), 404
+    return json_response(job.to_dict()), 200
 
 # ============ Download ============
 @api.route('/download', methods=['GET'])
+@api.route('/<dataset_id>/download', methods=['GET'])
 def download():
-    global current_file
+    dataset = _dataset()
+    current_file = dataset.file if dataset is not None else None
     if not current_file or not os.path.exists(current_file):
-        return jsonify({'error': 'No file'}), 400
+        return json_response({'error': 'No file'}), 400
     try:
         return send_file(current_file, as_attachment=True, download_name='export.xlsx')
     except Exception as e:
         print(f"✗ Download error: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 # ============ Doanh số Routes ============
 @api.route('/data/doanhso', methods=['GET'])
+@api.route('/<dataset_id>/data/doanhso', methods=['GET'])
+@cached_get
 def get_doanhso_data():
     try:
+        doanhso_service = _service('doanhso')
         if doanhso_service is None:
-            return jsonify({'data': [], 'stats': {}}), 200
-        result = doanhso_service.get_data()
-        return jsonify(result), 200
+            return _rows_response({'data': [], 'stats': {}})
+        result = doanhso_service.get_data(page=parse_pagination(request.args))
+        return _rows_response(result)
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
     except Exception as e:
         print(f"✗ Error: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @api.route('/filter/doanhso', methods=['GET'])
+@api.route('/<dataset_id>/filter/doanhso', methods=['GET'])
+@cached_get
 def filter_doanhso():
     try:
+        doanhso_service = _service('doanhso')
         if doanhso_service is None:
-            return jsonify([]), 200
+            return _rows_response(paged_response([], 0), legacy_list=True)
+        page = parse_pagination(request.args)
         custcode = request.args.get('custcode', '')
         classification = request.args.get('classification', '')
-        result = doanhso_service.filter(custcode, classification)
-        return jsonify(result), 200
+        result = doanhso_service.filter(custcode, classification, page=page, exact=exact_match(request.args))
+        return _rows_response(result, legacy_list=page is None)
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
     except Exception as e:
         print(f"✗ Error: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @api.route('/analytics/doanhso', methods=['GET'])
+@api.route('/<dataset_id>/analytics/doanhso', methods=['GET'])
+@cached_get
 def get_doanhso_analytics():
     try:
+        doanhso_service = _service('doanhso')
         if doanhso_service is None:
-            return jsonify({}), 200
-        result = doanhso_service.get_analytics()
-        return jsonify(result), 200
+            return json_response({}), 200
+        result = doanhso_service.get_analytics(filter_params(request.args), exact_match(request.args))
+        return json_response(result), 200
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
     except Exception as e:
         print(f"✗ Error: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 # ============ DSKH Routes ============
 @api.route('/data/dskh', methods=['GET'])
+@api.route('/<dataset_id>/data/dskh', methods=['GET'])
+@cached_get
 def get_dskh_data():
     try:
+        dskh_service = _service('dskh')
         if dskh_service is None:
-            return jsonify({'data': [], 'columns': [], 'filters': {}}), 200
-        result = dskh_service.get_data()
-        return jsonify(result), 200
+            return _rows_response({'data': [], 'columns': [], 'filters': {}})
+        result = dskh_service.get_data(page=parse_pagination(request.args))
+        return _rows_response(result)
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
     except Exception as e:
         print(f"✗ Error: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @api.route('/filter/dskh', methods=['GET'])
+@api.route('/<dataset_id>/filter/dskh', methods=['GET'])
+@cached_get
 def filter_dskh():
     try:
+        dskh_service = _service('dskh')
         if dskh_service is None:
-            return jsonify([]), 200
-        filters_dict = {}
-        for key in request.args:
-            filters_dict[key] = request.args.get(key)
-        result = dskh_service.filter(filters_dict)
-        return jsonify(result), 200
+            return _rows_response(paged_response([], 0), legacy_list=True)
+        page = parse_pagination(request.args)
+        result = dskh_service.filter(filter_params(request.args), page=page, exact=exact_match(request.args))
+        return _rows_response(result, legacy_list=page is None)
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
     except Exception as e:
         print(f"✗ Error: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @api.route('/analytics/dskh', methods=['GET'])
+@api.route('/<dataset_id>/analytics/dskh', methods=['GET'])
+@cached_get
 def get_dskh_analytics():
     try:
+        dskh_service = _service('dskh')
         if dskh_service is None:
-            return jsonify({}), 200
-        result = dskh_service.get_analytics()
-        return jsonify(result), 200
+            return json_response({}), 200
+        result = dskh_service.get_analytics(filter_params(request.args), exact_match(request.args))
+        return json_response(result), 200
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
     except Exception as e:
         print(f"✗ Error: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 # ============ Tuyến Routes ============
 @api.route('/data/tuyen', methods=['GET'])
+@api.route('/<dataset_id>/data/tuyen', methods=['GET'])
+@cached_get
 def get_tuyen_data():
     try:
+        tuyen_service = _service('tuyen')
         if tuyen_service is None:
-            return jsonify({'data': [], 'columns': [], 'filters': {}, 'total_rows': 0}), 200
-        result = tuyen_service.get_data()
-        return jsonify(result), 200
+            return _rows_response({'data': [], 'columns': [], 'filters': {}, 'total_rows': 0})
+        result = tuyen_service.get_data(page=parse_pagination(request.args))
+        return _rows_response(result)
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
     except Exception as e:
         print(f"✗ Error: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @api.route('/filter/tuyen', methods=['GET'])
+@api.route('/<dataset_id>/filter/tuyen', methods=['GET'])
+@cached_get
 def filter_tuyen():
     try:
+        tuyen_service = _service('tuyen')
         if tuyen_service is None:
-            return jsonify([]), 200
-        filters_dict = {}
-        for key in request.args:
-            filters_dict[key] = request.args.get(key)
-        result = tuyen_service.filter(filters_dict)
-        return jsonify(result), 200
+            return _rows_response(paged_response([], 0), legacy_list=True)
+        page = parse_pagination(request.args)
+        result = tuyen_service.filter(filter_params(request.args), page=page, exact=exact_match(request.args))
+        return _rows_response(result, legacy_list=page is None)
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
     except Exception as e:
         print(f"✗ Error: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 # ============ Chi tiết tuyến Routes ============
 @api.route('/data/chitiet', methods=['GET'])
+@api.route('/<dataset_id>/data/chitiet', methods=['GET'])
+@cached_get
 def get_chitiet_data():
     try:
+        chitiet_service = _service('chitiet')
         if chitiet_service is None:
-            return jsonify({
+            return _rows_response({
                 'data': [], 
                 'columns': [], 
                 'filters': {}, 
                 'total_rows': 0,
                 'grouped_columns': {}
-            }), 200
-        result = chitiet_service.get_data()
-        return jsonify(result), 200
+            })
+        result = chitiet_service.get_data(page=parse_pagination(request.args))
+        return _rows_response(result)
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
     except Exception as e:
         print(f"✗ Error: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @api.route('/filter/chitiet', methods=['GET'])
+@api.route('/<dataset_id>/filter/chitiet', methods=['GET'])
+@cached_get
 def filter_chitiet():
     try:
+        chitiet_service = _service('chitiet')
         if chitiet_service is None:
-            return jsonify([]), 200
-        filters_dict = {}
-        for key in request.args:
-            filters_dict[key] = request.args.get(key)
-        result = chitiet_service.filter(filters_dict)
-        return jsonify(result), 200
+            return _rows_response(paged_response([], 0), legacy_list=True)
+        page = parse_pagination(request.args)
+        result = chitiet_service.filter(filter_params(request.args), page=page, exact=exact_match(request.args))
+        return _rows_response(result, legacy_list=page is None)
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
     except Exception as e:
         print(f"✗ Error: {e}")
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 @api.route('/analytics/chitiet', methods=['GET'])
+@api.route('/<dataset_id>/analytics/chitiet', methods=['GET'])
+@cached_get
 def get_chitiet_analytics():
     try:
+        chitiet_service = _service('chitiet')
         if chitiet_service is None:
-            return jsonify({}), 200
-        result = chitiet_service.get_analytics()
-        return jsonify(result), 200
+            return json_response({}), 200
+        result = chitiet_service.get_analytics(filter_params(request.args), exact_match(request.args))
+        return json_response(result), 200
+    except ValueError as e:
+        return json_response({'error': str(e)}), 400
     except Exception as e:
         print(f"✗ Error: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}), 500
 
 # ============ Error Handlers ============
 @api.errorhandler(404)
 def not_found(e):
-    return jsonify({'error': 'Endpoint not found'}), 404
+    return json_response({'error': 'Endpoint not found'}), 404
 
 @api.errorhandler(500)
 def server_error(e):
-    return jsonify({'error': 'Server error'}), 500
\ No newline at end of file
+    return json_response({'error': 'Server error'}), 500
\ No newline at end of file
@@ -0,0 +1,147 @@
+import re
+import threading
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+# Characters that make a str.contains pattern behave differently from a plain substring
+_REGEX_CHARS = set('.^$*+?{}[]\\|()')
+
+class ColumnIndex:
+    """Distinct lowercased values of one column, trigram postings and row postings"""
+    
+    # Array attributes, persisted with the snapshot (see index_store)
+    ARRAYS = ('order', 'offsets', 'gram_offsets', 'gram_codes')
+    
+    def __init__(self, series):
+        # Same strings the old filter scanned: astype(str), then lower()
+        codes, uniques = pd.factorize(series.astype(str).str.lower())
+        self.values = list(uniques)
+        
+        # Rows grouped by value code (CSR layout): rows of code c = order[offsets[c]:offsets[c+1]]
+        self.order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes, minlength=len(self.values))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        
+        trigrams = {}
+        for code, value in enumerate(self.values):
+            for gram in {value[i:i + 3] for i in range(len(value) - 2)}:
+                trigrams.setdefault(gram, []).append(code)
+        
+        # Value codes per trigram, same layout: codes of gram g = gram_codes[gram_offsets[s]:gram_offsets[s+1]], s = grams[g]
+        self.grams = {gram: slot for slot, gram in enumerate(trigrams)}
+        lengths = np.fromiter(map(len, trigrams.values()), dtype=np.int64, count=len(trigrams))
+        self.gram_offsets = np.concatenate(([0], np.cumsum(lengths)))
+        self.gram_codes = np.fromiter(chain.from_iterable(trigrams.values()), dtype=np.int64,
+                                      count=int(self.gram_offsets[-1]))
+    
+    def state(self):
+        """(arrays, meta) to persist this index; from_state() rebuilds it"""
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        return arrays, {'values': self.values, 'grams': list(self.grams)}
+    
+    @classmethod
+    def from_state(cls, arrays, meta):
+        """Index from persisted state; arrays may be memory-mapped (read-only)"""
+        index = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(index, name, arrays[name])
+        index.values = meta['values']
+        index.grams = {gram: slot for slot, gram in enumerate(meta['grams'])}
+        return index
+    
+    def rows_indexed(self):
+        """Rows of the column this index was built from"""
+        return int(self.offsets[-1])
+    
+    def _candidates(self, needle):
+        """Value codes that may contain needle (all codes if needle < 3 chars)"""
+        if len(needle) < 3:
+            return range(len(self.values))
+        
+        postings = []
+        for gram in {needle[i:i + 3] for i in range(len(needle) - 2)}:
+            slot = self.grams.get(gram)
+            if slot is None:
+                return []
+            postings.append(self.gram_codes[self.gram_offsets[slot]:self.gram_offsets[slot + 1]])
+        postings.sort(key=len)
+        candidates = set(postings[0].tolist())
+        for codes in postings[1:]:
+            candidates.intersection_update(codes.tolist())
+            if not candidates:
+                break
+        return candidates
+    
+    def matching_codes(self, pattern, lower_pattern=True):
+        """Codes of distinct values matching a case-insensitive str.contains pattern.
+        
+        Patterns that are not valid regexes (e.g. a lone '(') match as plain substrings.
+        """
+        if _REGEX_CHARS.intersection(pattern):
+            try:
+                regex = re.compile(pattern.lower() if lower_pattern else pattern, re.IGNORECASE)
+            except re.error:
+                regex = None
+            if regex is not None:
+                # Regex patterns keep str.contains semantics, evaluated per distinct value
+                return [code for code, value in enumerate(self.values) if regex.search(value)]
+        
+        needle = pattern.lower()
+        return [code for code in self._candidates(needle) if needle in self.values[code]]
+    
+    def rows(self, codes):
+        """Sorted row positions holding any of the given value codes"""
+        if len(codes) == 0:
+            return np.empty(0, dtype=np.intp)
+        parts = [self.order[self.offsets[c]:self.offsets[c + 1]] for c in codes]
+        return np.sort(np.concatenate(parts))
+
+class SearchIndex:
+    """Per-column substring index for a frame, built lazily per column and cached.
+    
+    indexes: persisted indexes of this frame (index_store.SheetIndexes), used instead of building.
+    """
+    
+    def __init__(self, df, columns=(), indexes=None):
+        self.df = df
+        self.indexes = indexes
+        self._columns = {}
+        self._lock = threading.Lock()
+        for column in columns:
+            if column in df.columns:
+                self.column(column)
+    
+    def column(self, column):
+        index = self._columns.get(column)
+        if index is None:
+            index = self.indexes.search(column) if self.indexes is not None else None
+            if index is None or index.rows_indexed() != len(self.df):
+                index = ColumnIndex(self.df[column])
+            with self._lock:
+                self._columns[column] = index
+        return index
+    
+    def built(self):
+        """{column: ColumnIndex} of the columns indexed so far"""
+        with self._lock:
+            return dict(self._columns)
+    
+    def contains(self, column, value, lower_pattern=True):
+        """Row positions where str(cell) contains value (case-insensitive)"""
+        index = self.column(column)
+        return index.rows(index.matching_codes(str(value), lower_pattern))
+    
+    def mask(self, rows):
+        """Boolean mask from row positions (None = all rows)"""
+        if rows is None:
+            return np.ones(len(self.df), dtype=bool)
+        mask = np.zeros(len(self.df), dtype=bool)
+        mask[rows] = True
+        return mask
+
+def intersect_rows(rows, matched):
+    """AND two sorted row-position sets (None = no filter yet)"""
+    if rows is None:
+        return matched
+    return np.intersect1d(rows, matched, assume_unique=True)
@@ -0,0 +1,227 @@
+import json
+from datetime import date
+from decimal import Decimal
+from functools import partial
+from itertools import repeat
+import numpy as np
+import pandas as pd
+from flask import Response
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+from config import STREAM_CHUNK_SIZE
+
+MIME_JSON = 'application/json'
+
+# ============ Encoding ============
+def _default(value):
+    """Values the encoder doesn't know natively (NumPy scalars, pandas NA, dates, Decimal)"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, date):
+        # datetime, date and pd.Timestamp as jsonify writes them ("Tue, 01 Jan 2019 00:00:00 GMT")
+        return http_date(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+# Same document as flask.jsonify (sorted keys, compact separators, trailing newline),
+# but UTF-8 text is written as-is instead of \u escapes and NaN is written as null.
+# Dates go through _default (orjson would write them as ISO 8601).
+if orjson is not None:
+    _OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME)
+    _encode = partial(orjson.dumps, default=_default, option=_OPTIONS)
+
+def _finite(obj):
+    """Copy of a payload with NaN/Infinity floats as None, like orjson writes them"""
+    if isinstance(obj, (float, np.floating)):
+        return obj if np.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+def dumps(obj):
+    """Encode any API payload -> JSON bytes"""
+    if orjson is not None:
+        return _encode(obj)
+    # The stdlib encoder writes NaN/Infinity, which is not JSON: null them, and fail on any left
+    return json.dumps(
+        _finite(obj), default=lambda value: _finite(_default(value)),
+        sort_keys=True, ensure_ascii=False, separators=(',', ':'), allow_nan=False
+    ).encode('utf-8')
+
+def json_response(payload, mimetype=MIME_JSON):
+    """Response for an object, or for bytes already encoded by this module"""
+    body = payload if isinstance(payload, bytes) else dumps(payload)
+    return Response(body + b'\n', mimetype=mimetype)
+
+# ============ DataFrames ============
+def df_to_dict(df):
+    """Convert DataFrame to dict with filled NaN"""
+    # object first: where() can't put None into categorical or float columns
+    df = df.astype(object).where(pd.notna(df), None)
+    return df.to_dict('records')
+
+def rows_to_list(data):
+    """Rows of a service result (DataFrame, list or None) as list of dicts"""
+    if data is None:
+        return []
+    if isinstance(data, pd.DataFrame):
+        return df_to_dict(data)
+    return data
+
+def _numeric_values(series):
+    """NumPy array orjson can encode directly, or None for other columns"""
+    dtype = series.dtype
+    if not isinstance(dtype, np.dtype) or dtype.kind not in 'biuf':
+        return None
+    values = series.to_numpy()
+    # float32 would be written with float32 precision; tolist() (and so jsonify) widens it
+    if dtype.kind == 'f' and dtype != np.float64:
+        values = values.astype(np.float64)
+    return values
+
+def _column_json(series):
+    """JSON text of every value of a column, computed per column (NaN -> null)"""
+    values = _numeric_values(series)
+    if values is not None:
+        # Numbers never contain ',' so the encoded array splits into its items
+        return orjson.dumps(values, option=_OPTIONS)[1:-1].split(b',')
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Each label is encoded once; code -1 (missing) picks the trailing null
+        labels = [dumps(label) for label in series.cat.categories.tolist()]
+        labels.append(b'null')
+        return np.array(labels, dtype=object)[series.cat.codes.to_numpy()].tolist()
+    if series.dtype.kind == 'M':
+        # Same for each distinct datetime; NaT gets code -1 and so the trailing null
+        codes, uniques = pd.factorize(series)
+        labels = [dumps(value) for value in uniques]
+        labels.append(b'null')
+        return np.array(labels, dtype=object)[codes].tolist()
+    return list(map(_encode, series.tolist()))
+
+def _iter_row_json(df):
+    """Yield each row of a non-empty DataFrame as a JSON object (keys sorted like jsonify)"""
+    names = sorted((str(col), i) for i, col in enumerate(df.columns))
+    parts = []
+    for position, (name, i) in enumerate(names):
+        parts.append(repeat((b'{' if position == 0 else b',') + dumps(name) + b':'))
+        parts.append(_column_json(df.iloc[:, i]))
+    parts.append(repeat(b'}'))
+    return map(b''.join, zip(*parts))
+
+def frame_json(data):
+    """Rows of a service result as a JSON array of objects -> bytes"""
+    if isinstance(data, pd.DataFrame) and orjson is not None:
+        if len(data) == 0 or len(data.columns) == 0:
+            return dumps([{}] * len(data))
+        return b'[' + b','.join(_iter_row_json(data)) + b']'
+    return dumps(rows_to_list(data))
+
+def object_json(encoded):
+    """JSON object from values already encoded as bytes ({key: bytes}), keys sorted -> bytes"""
+    return b'{' + b','.join(dumps(key) + b':' + encoded[key] for key in sorted(encoded)) + b'}'
+
+def result_json(result):
+    """Service result with its 'data' rows encoded as objects -> bytes"""
+    return object_json({
+        key: frame_json(value) if key == 'data' else dumps(value) for key, value in result.items()
+    })
+
+# ============ Columnar ============
+def df_to_columns(df):
+    """Convert DataFrame to column arrays ([[...col0...], [...col1...]]) with NaN as None"""
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        missing = series.isna()
+        if missing.any():
+            series = series.astype(object).where(~missing, None)
+        columns.append(series.tolist())
+    return columns
+
+def _result_frame(result):
+    data = result.get('data')
+    if not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame(rows_to_list(data))
+    return data
+
+def columnar_result(result):
+    """Service result with 'data' as column arrays plus 'columns' names"""
+    data = _result_frame(result)
+    return dict(result, columns=[str(c) for c in data.columns], data=df_to_columns(data))
+
+def columnar_json(result):
+    """columnar_result() encoded straight from the column arrays -> bytes"""
+    if orjson is None:
+        return dumps(columnar_result(result))
+    data = _result_frame(result)
+    columns = []
+    for i in range(len(data.columns)):
+        series = data.iloc[:, i]
+        values = _numeric_values(series)
+        if values is not None:
+            columns.append(orjson.dumps(values, option=_OPTIONS))
+        else:
+            columns.append(b'[' + b','.join(_column_json(series)) + b']')
+    
+    encoded = {key: dumps(value) for key, value in result.items() if key != 'data'}
+    encoded['columns'] = dumps([str(c) for c in data.columns])
+    encoded['data'] = b'[' + b','.join(columns) + b']'
+    return object_json(encoded)
+
+# ============ Streaming / Arrow ============
+def iter_ndjson(result, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield NDJSON: one metadata line (result without 'data'), then one line per row"""
+    meta = {key: value for key, value in result.items() if key != 'data'}
+    yield dumps(meta) + b'\n'
+    
+    data = result.get('data')
+    if not isinstance(data, pd.DataFrame) or orjson is None:
+        for row in rows_to_list(data):
+            yield dumps(row) + b'\n'
+        return
+    if len(data.columns) == 0:
+        yield b'{}\n' * len(data)
+        return
+    
+    # Only one chunk of rows is encoded at a time
+    for start in range(0, len(data), chunk_size):
+        chunk = data.iloc[start:start + chunk_size]
+        yield b'\n'.join(_iter_row_json(chunk)) + b'\n'
+
+def _arrow_column(series):
+    """Arrow array for one column; mixed-type object columns are sent as text"""
+    try:
+        return pa.array(series, from_pandas=True)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        return pa.array(
+            [None if pd.isna(v) else str(v) for v in series], type=pa.string()
+        )
+
+def result_to_arrow(result):
+    """Serialize a service result as an Arrow IPC stream (metadata in schema)"""
+    data = _result_frame(result)
+    
+    meta = {key: value for key, value in result.items() if key != 'data'}
+    arrays = [_arrow_column(data[col]) for col in data.columns]
+    table = pa.Table.from_arrays(arrays, names=[str(c) for c in data.columns])
+    table = table.replace_schema_metadata({'smartbi': dumps(meta)})
+    
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -1,147 +1,173 @@
+from collections import namedtuple
+import numpy as np
 import pandas as pd
-from utils import df_to_dict
+from search_index import SearchIndex, intersect_rows
+from mask_cache import MaskCache
+from filter_catalog import FilterCatalog
+from aggregation import Aggregator, empty_result
+from compaction import freeze_frame, memory_report
+from utils import paginate, paged_response, SortCache
+from config import FLAG_COLUMN_MARKERS
+from instrumentation import timed
+
+# Header rules for the flattened two-row Chi tiết tuyến header, tried in order; first match wins.
+# any_of: one of these substrings must be present; all_of / none_of: extra conditions.
+# target: fixed name, or an ordered {marker: name} resolved with endswith/contains (no hit -> unmapped).
+# once: only while the target is still unassigned, otherwise later rules are tried.
+HeaderRule = namedtuple('HeaderRule', ['any_of', 'target', 'all_of', 'none_of', 'match', 'once'])
+HeaderRule.__new__.__defaults__ = ((), (), 'contains', False)
+
+def _markers(template, keys):
+    return {key: template.format(key.upper()) for key in keys}
+
+HEADER_RULES = [
+    # ===== Base columns =====
+    HeaderRule(('stt',), 'STT'),
+    HeaderRule(('mã khách hàng',), 'MaKhachHang'),
+    HeaderRule(('tên khách hàng',), 'TenKhachHang'),
+    HeaderRule(('địa chỉ',), 'DiaChi'),
+    # ===== Lộ trình DMS (T2-T7) - NO CN =====
+    HeaderRule(('lộ trình dms',), _markers('{}_LoTrinhDMS', ['t2', 't3', 't4', 't5', 't6', 't7']), match='endswith'),
+    # ===== Tần suất DMS (W1-W4) =====
+    HeaderRule(('tần suất dms',), _markers('{}_TanSuatDMS', ['w1', 'w2', 'w3', 'w4']), none_of=('goi y',)),
+    # ===== Tần suất gợi ý (W1-W4) - CHUYỂN VÀO MAPPING =====
+    HeaderRule(('tần suất gợi ý', 'tan suat goi y'), _markers('{}_TanSuatGoiY_Mapping', ['w1', 'w2', 'w3', 'w4']), all_of=('w',)),
+    # ===== Mã / Tên nhân viên (trong group Tần suất gợi ý) =====
+    HeaderRule(('mã nhân viên',), 'MaNhanVienGoiY'),
+    HeaderRule(('tên nhân viên',), 'TenNhanVienGoiY'),
+    # ===== Tần suất gợi ý VALUE (trong group Tần suất gợi ý) =====
+    HeaderRule(('tần suất gợi ý', 'tan suat goi y'), 'TanSuatGoiYValue', none_of=('w',), once=True),
+    # ===== Các cột Mapping =====
+    HeaderRule(('kênh hàng',), 'KenhHang'),
+    HeaderRule(('doanh số tb',), 'DoanhSoTB', once=True),
+    HeaderRule(('tần suất hiện tại',), 'TanSuatHienTai'),
+    HeaderRule(('tần suất gsbh', 'tần suất chia lại'), 'TanSuatGSBHChiaLai'),
+    HeaderRule(('tần suất',), 'TanSuatKhachHang', all_of=('khách hàng',)),
+    HeaderRule(('kênh',), 'KenhPhanPhoi'),
+    HeaderRule(('tần suất gợi ý',), 'TanSuatGoiY', once=True),
+]
+
+def _match_header(col_lower, cols_seen):
+    """Canonical name for one lower-cased header, or None"""
+    for rule in HEADER_RULES:
+        if not any(needle in col_lower for needle in rule.any_of):
+            continue
+        if not all(needle in col_lower for needle in rule.all_of):
+            continue
+        if any(needle in col_lower for needle in rule.none_of):
+            continue
+        if rule.once and rule.target in cols_seen:
+            continue
+        if isinstance(rule.target, str):
+            return rule.target
+        for marker, name in rule.target.items():
+            hit = col_lower.endswith(marker) if rule.match == 'endswith' else marker in col_lower
+            if hit:
+                return name
+        return None
+    return None
+
+def _distinct_flags(series, *predicates):
+    """Evaluate str(value).strip() predicates once per distinct value, broadcast to rows.
+    
+    Returns one boolean row array per predicate; NaN/None rows are treated as ''.
+    Cells repeat heavily ('x', '', names), so this avoids a Python call per cell.
+    """
+    codes, uniques = pd.factorize(series)
+    texts = [str(value).strip() for value in uniques] + ['']  # last slot: code -1 (NaN)
+    return [np.array([predicate(text) for text in texts], dtype=bool)[codes] for predicate in predicates]
+
+def _non_blank_rows(df):
+    """Rows with at least one cell that is not NaN and not blank after str().strip()"""
+    keep = np.zeros(len(df), dtype=bool)
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        if series.dtype == object:
+            keep |= _distinct_flags(series, lambda text: text != '')[0]
+        else:
+            keep |= series.notna().to_numpy()
+    return keep
+
+def _flag_to_int(series):
+    """'x' (any case/spacing) -> 1, NaN/blank -> 0, anything else unchanged"""
+    if len(series) == 0:
+        return series
+    is_x, is_blank = _distinct_flags(series, lambda text: text.lower() == 'x', lambda text: text == '')
+    if (is_x | is_blank).all():
+        # Pure flag column (the usual case): no object round-trip needed
+        return pd.Series(is_x.astype(np.int64), index=series.index)
+    values = np.where(is_x, 1, np.where(is_blank, 0, series.to_numpy(dtype=object)))
+    return pd.Series(values, index=series.index).infer_objects()
 
 class ChitietTuyenService:
     """Handle all Chi tiết tuyến operations"""
     
+    # Columns the frontend filters on; their search index is built at load time
+    FILTER_COLUMNS = ['MaKhachHang', 'TenKhachHang', 'TenNhanVienGoiY', 'KenhHang', 'KenhPhanPhoi']
+    
     def __init__(self, df):
         self.df = df
         self.processed_df = None
+        self.sort_cache = None
+        self.search_index = None
+        self.mask_cache = None
+        self.filters = {}
+        self.filter_catalog = None
+        self.aggregator = None
+        self.memory = memory_report(None)
         print(f"ChitietTuyenService initialized with {len(df) if df is not None else 0} rows")
         if df is not None:
             print(f"Raw shape: {df.shape}")
-            self._process_headers()
+            self._load(process_headers(df))
+            # Raw frame is not needed once processed
+            self.df = None
     
-    def _process_headers(self):
-        """Xử lý headers phức tạp từ Excel"""
-        if self.df is None or len(self.df) == 0:
-            print("Error: DataFrame is empty")
+    @classmethod
+    def from_processed(cls, processed_df, indexes=None):
+        """Build service from an already header-processed frame (e.g. snapshot)"""
+        service = cls(None)
+        service._load(processed_df, indexes)
+        return service
+    
+    def _load(self, processed_df, indexes=None):
+        """Sort cache, search index, filter bitmaps and options over the processed frame"""
+        if processed_df is None:
             return
-        
-        df = self.df.copy()
-        print(f"Starting _process_headers...")
-        
+        self.memory = memory_report(processed_df)
+        self.processed_df = freeze_frame(processed_df)
+        self.sort_cache = SortCache(processed_df)
+        self.search_index = SearchIndex(processed_df, self.FILTER_COLUMNS, indexes=indexes)
+        self.mask_cache = MaskCache(processed_df, indexes=indexes)
+        self.aggregator = Aggregator(processed_df)
+        self._build_filters()
+    
+    @staticmethod
+    def map_headers(columns):
+        """Flattened Excel headers -> {header: canonical name}, first rule match wins"""
         column_map = {}
         cols_seen = set()
-        
-        for col_str in df.columns:
-            col_lower = str(col_str).lower()
-            target_name = None
-            
-            # ===== Base columns =====
-            if 'stt' in col_lower and target_name is None:
-                target_name = 'STT'
-            elif 'mã khách hàng' in col_lower and target_name is None:
-                target_name = 'MaKhachHang'
-            elif 'tên khách hàng' in col_lower and target_name is None:
-                target_name = 'TenKhachHang'
-            elif 'địa chỉ' in col_lower and target_name is None:
-                target_name = 'DiaChi'
-            
-            # ===== Lộ trình DMS (T2-T7) - NO CN =====
-            elif 'lộ trình dms' in col_lower and target_name is None:
-                if col_lower.endswith('t2'):
-                    target_name = 'T2_LoTrinhDMS'
-                elif col_lower.endswith('t3'):
-                    target_name = 'T3_LoTrinhDMS'
-                elif col_lower.endswith('t4'):
-                    target_name = 'T4_LoTrinhDMS'
-                elif col_lower.endswith('t5'):
-                    target_name = 'T5_LoTrinhDMS'
-                elif col_lower.endswith('t6'):
-                    target_name = 'T6_LoTrinhDMS'
-                elif col_lower.endswith('t7'):
-                    target_name = 'T7_LoTrinhDMS'
-            
-            # ===== Tần suất DMS (W1-W4) =====
-            elif ('tần suất dms' in col_lower and 'goi y' not in col_lower) and target_name is None:
-                if 'w1' in col_lower:
-                    target_name = 'W1_TanSuatDMS'
-                elif 'w2' in col_lower:
-                    target_name = 'W2_TanSuatDMS'
-                elif 'w3' in col_lower:
-                    target_name = 'W3_TanSuatDMS'
-                elif 'w4' in col_lower:
-                    target_name = 'W4_TanSuatDMS'
-            
-            # ===== Tần suất gợi ý (W1-W4) - CHUYỂN VÀO MAPPING =====
-            elif ('tần suất gợi ý' in col_lower or 'tan suat goi y' in col_lower) and 'w' in col_lower and target_name is None:
-                if 'w1' in col_lower:
-                    target_name = 'W1_TanSuatGoiY_Mapping'
-                elif 'w2' in col_lower:
-                    target_name = 'W2_TanSuatGoiY_Mapping'
-                elif 'w3' in col_lower:
-                    target_name = 'W3_TanSuatGoiY_Mapping'
-                elif 'w4' in col_lower:
-                    target_name = 'W4_TanSuatGoiY_Mapping'
-            
-            # ===== Mã nhân viên (trong group Tần suất gợi ý) =====
-            elif 'mã nhân viên' in col_lower and target_name is None:
-                target_name = 'MaNhanVienGoiY'
-            
-            # ===== Tên nhân viên (trong group Tần suất gợi ý) =====
-            elif 'tên nhân viên' in col_lower and target_name is None:
-                target_name = 'TenNhanVienGoiY'
-            
-            # ===== Tần suất gợi ý VALUE (trong group Tần suất gợi ý) =====
-            elif ('tần suất gợi ý' in col_lower or 'tan suat goi y' in col_lower) and 'w' not in col_lower and target_name is None and 'TanSuatGoiYValue' not in cols_seen:
-                target_name = 'TanSuatGoiYValue'
-            
-            # ===== Các cột Mapping =====
-            elif 'kênh hàng' in col_lower and target_name is None:
-                target_name = 'KenhHang'
-            elif 'doanh số tb' in col_lower and 'DoanhSoTB' not in cols_seen:
-                target_name = 'DoanhSoTB'
-            elif 'tần suất hiện tại' in col_lower and target_name is None:
-                target_name = 'TanSuatHienTai'
-            elif ('tần suất gsbh' in col_lower or 'tần suất chia lại' in col_lower) and target_name is None:
-                target_name = 'TanSuatGSBHChiaLai'
-            elif 'tần suất' in col_lower and 'khách hàng' in col_lower and target_name is None:
-                target_name = 'TanSuatKhachHang'
-            elif 'kênh' in col_lower and target_name is None:
-                target_name = 'KenhPhanPhoi'
-            elif 'tần suất gợi ý' in col_lower and target_name is None and 'TanSuatGoiY' not in cols_seen:
-                target_name = 'TanSuatGoiY'
-            
+        for col_str in columns:
+            target_name = _match_header(str(col_str).lower(), cols_seen)
             # Map only new targets
             if target_name and target_name not in cols_seen:
                 column_map[col_str] = target_name
                 cols_seen.add(target_name)
-        
-        # Rename columns
-        df = df.rename(columns=column_map)
-        print(f"Renamed {len(column_map)} columns")
-        
-        # Keep renamed columns
-        cols_to_keep = [col for col in column_map.values() if col in df.columns]
-        df = df[cols_to_keep]
-        print(f"Kept {len(cols_to_keep)} columns: {cols_to_keep}")
-        
-        # Clean data
-        df = df.replace('-', '')
-        df = df.dropna(how='all')
-        mask = df.applymap(lambda x: str(x).strip() != '' if pd.notna(x) else False).any(axis=1)
-        df = df[mask]
-        print(f"After cleaning: {len(df)} rows")
-        
-        # Convert Lo Trinh & Tan Suat: 'x' -> 1, empty/NaN -> 0
-        for col in df.columns:
-            if any(x in col for x in ['LoTrinhDMS', 'TanSuatDMS']):
-                df[col] = df[col].apply(
-                    lambda x: 1 if str(x).lower().strip() == 'x' else (0 if pd.isna(x) or str(x).strip() == '' else x)
-                )
-            # Convert W*_TanSuatGoiY_Mapping: 'x' -> 1, empty/NaN -> 0
-            elif 'TanSuatGoiY_Mapping' in col:
-                df[col] = df[col].apply(
-                    lambda x: 1 if str(x).lower().strip() == 'x' else (0 if pd.isna(x) or str(x).strip() == '' else x)
-                )
-        
-        self.processed_df = df
-        print(f"Processing complete!")
-        print(f"Final shape: {df.shape}")
-        print(f"Final columns: {list(df.columns)}")
+        return column_map
     
-    def get_data(self):
+    def _build_filters(self):
+        """Filters: Unique values for text columns (computed once per load)"""
+        df = self.processed_df
+        filters = {}
+        for col in self.FILTER_COLUMNS:
+            if col in df.columns:
+                unique = df[col].dropna().unique()
+                unique = [str(v).strip() for v in unique if str(v).strip() and str(v) != 'nan']
+                if 0 < len(unique) <= 500:
+                    filters[col] = sorted(unique)
+        self.filters = filters
+        self.filter_catalog = FilterCatalog(filters, self.mask_cache)
+    
+    def get_data(self, page=None):
         """Get Chi tiết tuyến data with grouped columns metadata"""
         if self.processed_df is None or len(self.processed_df) == 0:
             return {
@@ -152,7 +178,7 @@ class ChitietTuyenService:
                 'grouped_columns': {}
             }
         
-        df = self.processed_df.copy()
+        df = self.processed_df
         
         # Grouped metadata for frontend multi-level table - ORDERED
         grouped_columns = {
@@ -167,73 +193,112 @@ class ChitietTuyenService:
         for key in grouped_columns:
             grouped_columns[key] = [col for col in grouped_columns[key] if col in df.columns]
         
-        # Filters: Unique values for text columns
-        filters = {}
-        filter_cols = ['MaKhachHang', 'TenKhachHang', 'TenNhanVienGoiY', 'KenhHang', 'KenhPhanPhoi']
-        for col in filter_cols:
-            if col in df.columns:
-                unique = df[col].dropna().unique()
-                unique = [str(v).strip() for v in unique if str(v).strip() and str(v) != 'nan']
-                if 0 < len(unique) <= 500:
-                    filters[col] = sorted(unique)
+        filters = self.filters
         
         print(f"get_data: {len(df)} rows")
         
-        return {
-            'data': df_to_dict(df),
+        page_df, total = paginate(df, page, sort_cache=self.sort_cache)
+        result = {
+            'data': page_df,
             'columns': list(df.columns),
             'filters': filters,
             'grouped_columns': grouped_columns,
-            'total_rows': len(df)
+            'total_rows': total
         }
+        if page:
+            result.update({'offset': page['offset'], 'limit': page['limit']})
+        return result
     
-    def filter(self, filters_dict):
-        """Filter Chi tiết tuyến data"""
-        if self.processed_df is None or len(self.processed_df) == 0:
-            return []
+    def active_filters(self, filters_dict):
+        """(column, value) pairs that actually filter, in a canonical order"""
+        return tuple(sorted(
+            (key, value) for key, value in (filters_dict or {}).items()
+            if value and value != 'all' and key in self.processed_df.columns
+        ))
+    
+    def filter_mask(self, filters_dict, exact=False):
+        """Boolean row mask for the given column filters (substring or exact), computed once per filter set"""
+        active = self.active_filters(filters_dict)
+        return self.mask_cache.filter_mask((active, exact), lambda: self._compute_mask(active, exact))
+    
+    def _compute_mask(self, active, exact):
+        if exact:
+            return self.mask_cache.match_all(active)
         
-        df = self.processed_df.copy()
+        rows = None
         
-        for key, value in filters_dict.items():
-            if not value or value == 'all' or key not in df.columns:
-                continue
-            
+        for key, value in active:
             try:
-                mask = df[key].astype(str).str.lower().str.contains(
-                    str(value).lower(), case=False, na=False
-                )
-                df = df[mask]
+                rows = intersect_rows(rows, self.search_index.contains(key, value))
             except Exception as e:
                 print(f"Error filtering {key}: {e}")
         
-        return df_to_dict(df)
+        return self.search_index.mask(rows)
+    
+    @timed('filter')
+    def filter(self, filters_dict, page=None, exact=False):
+        """Filter Chi tiết tuyến data"""
+        if self.processed_df is None or len(self.processed_df) == 0:
+            return paged_response(None, 0, page)
+        
+        mask = self.filter_mask(filters_dict, exact)
+        df, total = paginate(self.processed_df, page, mask=mask, sort_cache=self.sort_cache)
+        return paged_response(df, total, page)
     
-    def get_analytics(self):
-        """Get analytics for Chi tiết tuyến"""
+    def filter_options(self, filters_dict=None, exact=False):
+        """Filter options with counts, cascading on the given filters"""
+        if self.processed_df is None or len(self.processed_df) == 0:
+            return {}
+        active = dict(self.active_filters(filters_dict))
+        return self.filter_catalog.get(active, lambda f: self.filter_mask(f, exact))
+    
+    def aggregate(self, spec, filters_dict=None, exact=False):
+        """Group-by measures over the rows matching the filters"""
+        if self.processed_df is None or len(self.processed_df) == 0:
+            return empty_result(spec)
+        active = self.active_filters(filters_dict)
+        return self.aggregator.run(spec, (active, exact), lambda: self.filter_mask(dict(active), exact) if active else None)
+    
+    def memory_usage(self):
+        """Bytes held by the loaded frame, per column (measured once at load)"""
+        return self.memory
+    
+    @timed('compute')
+    def get_analytics(self, filters_dict=None, exact=False):
+        """Get analytics for Chi tiết tuyến, over the rows matching the filters if given"""
         if self.processed_df is None or len(self.processed_df) == 0:
             return {}
         
         try:
-            df = self.processed_df.copy()
+            df = self.processed_df
+            active = self.active_filters(filters_dict)
+            rows = np.flatnonzero(self.filter_mask(dict(active), exact)) if active else None
+            
+            def column(name, numeric=False):
+                """Matched rows of one column; numeric=True coerces text like to_numeric(errors='coerce')"""
+                series = df[name] if rows is None else df[name].iloc[rows]
+                if numeric and not pd.api.types.is_numeric_dtype(series.dtype):
+                    series = pd.to_numeric(series.astype(object), errors='coerce')
+                return series
+            
             analytics = {
-                'total_rows': len(df),
+                'total_rows': len(df) if rows is None else len(rows),
                 'total_columns': len(df.columns)
             }
             
             # Total doanh số TB
             if 'DoanhSoTB' in df.columns:
-                analytics['total_doanh_so_tb'] = float(pd.to_numeric(df['DoanhSoTB'], errors='coerce').sum())
+                analytics['total_doanh_so_tb'] = float(column('DoanhSoTB', numeric=True).sum())
             
             # Average tần suất khách hàng
             if 'TanSuatKhachHang' in df.columns:
-                analytics['avg_tan_suat_khach_hang'] = float(pd.to_numeric(df['TanSuatKhachHang'], errors='coerce').mean())
+                analytics['avg_tan_suat_khach_hang'] = float(column('TanSuatKhachHang', numeric=True).mean())
             
-            # Top 10 nhân viên by Doanh số TB
+            # Top 10 nhân viên by Doanh số TB: one group-by over the matched rows
             if 'TenNhanVienGoiY' in df.columns and 'DoanhSoTB' in df.columns:
                 try:
-                    df_copy = df[['TenNhanVienGoiY', 'DoanhSoTB']].copy()
-                    df_copy['DoanhSoTB'] = pd.to_numeric(df_copy['DoanhSoTB'], errors='coerce')
-                    nhanvien_ds = df_copy.groupby('TenNhanVienGoiY')['DoanhSoTB'].sum().sort_values(ascending=False).head(10)
+                    doanh_so = column('DoanhSoTB', numeric=True)
+                    nhanvien_ds = doanh_so.groupby(column('TenNhanVienGoiY'), observed=True).sum().sort_values(ascending=False).head(10)
                     analytics['top_nhan_vien'] = [
                         {'name': k, 'doanh_so': float(v)} 
                         for k, v in nhanvien_ds.items()
@@ -244,34 +309,59 @@ class ChitietTuyenService:
             
             # Phân loại theo Kênh
             if 'KenhHang' in df.columns:
-                analytics['kenh_hang'] = df['KenhHang'].value_counts().to_dict()
-            
-            # Tổng lộ trình theo ngày (T2-T7 ONLY)
-            tan_suat_days = {}
-            for i in range(2, 8):
-                col = f'T{i}_LoTrinhDMS'
-                if col in df.columns:
-                    tan_suat_days[f'T{i}'] = int(pd.to_numeric(df[col], errors='coerce').sum())
-            analytics['tan_suat_theo_ngay'] = tan_suat_days
+                kenh_hang = column('KenhHang').value_counts()
+                analytics['kenh_hang'] = kenh_hang[kenh_hang > 0].to_dict()
             
-            # Tần suất DMS vs Tần suất Gợi ý theo tuần (W1-W4)
-            tan_suat_dms_weeks = {}
-            tan_suat_goi_y_weeks = {}
-            for i in range(1, 5):
-                dms_col = f'W{i}_TanSuatDMS'
-                goi_y_col = f'W{i}_TanSuatGoiY_Mapping'
-                
-                if dms_col in df.columns:
-                    tan_suat_dms_weeks[f'W{i}'] = int(pd.to_numeric(df[dms_col], errors='coerce').sum())
-                if goi_y_col in df.columns:
-                    tan_suat_goi_y_weeks[f'W{i}'] = int(pd.to_numeric(df[goi_y_col], errors='coerce').sum())
+            # Lộ trình theo ngày (T2-T7 ONLY) and Tần suất DMS vs Gợi ý theo tuần (W1-W4):
+            # all flag columns summed in one pass
+            days = {f'T{i}': f'T{i}_LoTrinhDMS' for i in range(2, 8)}
+            dms_weeks = {f'W{i}': f'W{i}_TanSuatDMS' for i in range(1, 5)}
+            goi_y_weeks = {f'W{i}': f'W{i}_TanSuatGoiY_Mapping' for i in range(1, 5)}
+            flag_columns = [col for group in (days, dms_weeks, goi_y_weeks) for col in group.values() if col in df.columns]
+            sums = pd.DataFrame({col: column(col, numeric=True) for col in flag_columns}).sum() if flag_columns else {}
             
-            analytics['tan_suat_dms_theo_tuan'] = tan_suat_dms_weeks
-            analytics['tan_suat_goi_y_theo_tuan'] = tan_suat_goi_y_weeks
+            analytics['tan_suat_theo_ngay'] = {key: int(sums[col]) for key, col in days.items() if col in df.columns}
+            analytics['tan_suat_dms_theo_tuan'] = {key: int(sums[col]) for key, col in dms_weeks.items() if col in df.columns}
+            analytics['tan_suat_goi_y_theo_tuan'] = {key: int(sums[col]) for key, col in goi_y_weeks.items() if col in df.columns}
             
             return analytics
         except Exception as e:
             print(f"Error calculating analytics: {e}")
             import traceback
             traceback.print_exc()
-            return {}
\ No newline at end of file
+            return {}
+
+@timed('clean')
+def process_headers(df):
+    """Xử lý headers phức tạp từ Excel: raw sheet -> processed frame (None if empty)"""
+    if df is None or len(df) == 0:
+        print("Error: DataFrame is empty")
+        return None
+    
+    print(f"Starting process_headers...")
+    column_map = ChitietTuyenService.map_headers(df.columns)
+    
+    # Rename columns
+    df = df.rename(columns=column_map)
+    print(f"Renamed {len(column_map)} columns")
+    
+    # Keep renamed columns
+    cols_to_keep = [col for col in column_map.values() if col in df.columns]
+    df = df[cols_to_keep]
+    print(f"Kept {len(cols_to_keep)} columns: {cols_to_keep}")
+    
+    # Clean data: drop rows with no non-blank cell
+    df = df.replace('-', '')
+    df = df.dropna(how='all')
+    df = df[_non_blank_rows(df)]
+    print(f"After cleaning: {len(df)} rows")
+    
+    # Convert Lo Trinh & Tan Suat & W*_TanSuatGoiY_Mapping: 'x' -> 1, empty/NaN -> 0
+    for col in df.columns:
+        if any(x in col for x in FLAG_COLUMN_MARKERS):
+            df[col] = _flag_to_int(df[col])
+    
+    print(f"Processing complete!")
+    print(f"Final shape: {df.shape}")
+    print(f"Final columns: {list(df.columns)}")
+    return df
@@ -1,66 +1,157 @@
 import pandas as pd
-from utils import calculate_metrics, df_to_dict
+from search_index import SearchIndex
+from mask_cache import MaskCache
+from filter_catalog import FilterCatalog
+from aggregation import Aggregator, empty_result
+from compaction import compact_frame, freeze_frame, memory_report
+from utils import calculate_metrics_frame, paginate, paged_response, SortCache
 from analytics import Analytics
+from instrumentation import timed
 
 class DoanhsoService:
     """Handle all Doanh số khách hàng operations"""
     
-    def __init__(self, df):
-        self.df = df
+    OUTPUT_COLUMNS = ['CustCode', 'T-3', 'T-2', 'T-1', 'T', 'TB Doanh số', 'Dự báo tháng tới', 'Phân loại']
     
-    def get_data(self):
-        """Get processed Doanh số data with stats"""
-        if self.df is None:
-            return {'data': [], 'stats': {}}
-        
-        df = self.df.copy()
-        
-        metrics = df.apply(calculate_metrics, axis=1, result_type='expand')
-        df['TB Doanh số'] = metrics['TB']
-        df['Dự báo tháng tới'] = metrics['Forecast']
-        df['Phân loại'] = metrics['Class']
-        
-        cols = ['CustCode', 'T-3', 'T-2', 'T-1', 'T', 'TB Doanh số', 'Dự báo tháng tới', 'Phân loại']
-        df = df[[col for col in cols if col in df.columns]]
+    def __init__(self, df, indexes=None):
+        self.enriched_df = None
+        self.sort_cache = None
+        self.search_index = None
+        self.mask_cache = None
+        self.filter_catalog = None
+        self.aggregator = None
+        self.stats = {}
+        self.memory = memory_report(None)
+        self.analytics = {'forecast': [], 'top10': []}
+        if df is not None:
+            self._load(enrich(df), indexes)
+    
+    @classmethod
+    def from_enriched(cls, enriched_df, indexes=None):
+        """Build service from an already enriched frame (e.g. snapshot)"""
+        service = cls(None)
+        service._load(enriched_df, indexes)
+        return service
+    
+    def _load(self, df, indexes=None):
+        """Stats, analytics and indexes over the enriched frame; requests only slice it"""
+        self.memory = memory_report(df)
+        df = freeze_frame(df)
         
-        stats = {
+        class_counts = df['Phân loại'].value_counts()
+        self.stats = {
             'total_rows': len(df),
             'total_t': float(df['T'].sum()) if 'T' in df.columns else 0,
             'total_tb': float(df['TB Doanh số'].sum()),
-            'vip': len(df[df['Phân loại'] == 'VIP']),
-            'high': len(df[df['Phân loại'] == 'High']),
-            'medium': len(df[df['Phân loại'] == 'Medium']),
-            'low': len(df[df['Phân loại'] == 'Low']),
+            'vip': int(class_counts.get('VIP', 0)),
+            'high': int(class_counts.get('High', 0)),
+            'medium': int(class_counts.get('Medium', 0)),
+            'low': int(class_counts.get('Low', 0)),
         }
-        
-        return {'data': df_to_dict(df), 'stats': stats}
+        self.analytics = Analytics.get_doanhso_analytics(df)
+        self.enriched_df = df
+        self.sort_cache = SortCache(df)
+        self.search_index = SearchIndex(df, ['CustCode'], indexes=indexes)
+        self.mask_cache = MaskCache(df, indexes=indexes)
+        classes = [cls for cls in ['VIP', 'High', 'Medium', 'Low'] if cls in set(df['Phân loại'])]
+        self.filter_catalog = FilterCatalog({'Phân loại': classes}, self.mask_cache)
+        self.aggregator = Aggregator(df)
     
-    def filter(self, custcode='', classification=''):
-        """Filter Doanh số data"""
-        if self.df is None:
-            return []
-        
-        df = self.df.copy()
+    def get_data(self, page=None):
+        """Get processed Doanh số data with stats"""
+        if self.enriched_df is None:
+            return {'data': [], 'stats': {}}
         
-        metrics = df.apply(calculate_metrics, axis=1, result_type='expand')
-        df['TB Doanh số'] = metrics['TB']
-        df['Dự báo tháng tới'] = metrics['Forecast']
-        df['Phân loại'] = metrics['Class']
+        df, total = paginate(self.enriched_df, page, sort_cache=self.sort_cache)
+        result = {'data': df, 'stats': dict(self.stats)}
+        if page:
+            result.update({'total_rows': total, 'offset': page['offset'], 'limit': page['limit']})
+        return result
+    
+    @staticmethod
+    def filter_args(filters_dict):
+        """(custcode, classification) from /filter/doanhso style query args"""
+        filters_dict = filters_dict or {}
+        classification = filters_dict.get('classification') or ''
+        return filters_dict.get('custcode') or '', '' if classification == 'all' else classification
+    
+    def filter_mask(self, custcode='', classification='', exact=False):
+        """Boolean row mask over the enriched frame, computed once per filter set"""
+        return self.mask_cache.filter_mask(
+            (custcode, classification, exact), lambda: self._compute_mask(custcode, classification, exact)
+        )
+    
+    def _compute_mask(self, custcode, classification, exact):
+        exact_filters = []
+        if classification and classification != 'all':
+            exact_filters.append(('Phân loại', classification))
+        if custcode and exact:
+            exact_filters.append(('CustCode', custcode))
         
-        if custcode:
-            df = df[df['CustCode'].astype(str).str.contains(custcode, case=False, na=False)]
+        mask = self.mask_cache.match_all(exact_filters)
         
-        if classification and classification != 'all':
-            df = df[df['Phân loại'] == classification]
+        if custcode and not exact:
+            mask &= self.search_index.mask(
+                self.search_index.contains('CustCode', custcode, lower_pattern=False)
+            )
         
-        cols = ['CustCode', 'T-3', 'T-2', 'T-1', 'T', 'TB Doanh số', 'Dự báo tháng tới', 'Phân loại']
-        df = df[[col for col in cols if col in df.columns]]
+        return mask
+    
+    @timed('filter')
+    def filter(self, custcode='', classification='', page=None, exact=False):
+        """Filter Doanh số data"""
+        if self.enriched_df is None:
+            return paged_response(None, 0, page)
         
-        return df_to_dict(df)
+        mask = self.filter_mask(custcode, classification, exact)
+        df, total = paginate(self.enriched_df, page, mask=mask, sort_cache=self.sort_cache)
+        return paged_response(df, total, page)
+    
+    def filter_options(self, filters_dict=None, exact=False):
+        """Filter options with counts; custcode/classification cascade like /filter/doanhso"""
+        if self.enriched_df is None:
+            return {}
+        filters_dict = filters_dict or {}
+        active = {}
+        if filters_dict.get('custcode'):
+            active['CustCode'] = filters_dict['custcode']
+        if filters_dict.get('classification') and filters_dict['classification'] != 'all':
+            active['Phân loại'] = filters_dict['classification']
+        return self.filter_catalog.get(active, lambda f: self.filter_mask(
+            f.get('CustCode', ''), f.get('Phân loại', ''), exact
+        ))
+    
+    def aggregate(self, spec, filters_dict=None, exact=False):
+        """Group-by measures over the rows matching custcode/classification"""
+        if self.enriched_df is None:
+            return empty_result(spec)
+        custcode, classification = self.filter_args(filters_dict)
+        return self.aggregator.run(spec, (custcode, classification, exact),
+                                   lambda: self.filter_mask(custcode, classification, exact) if custcode or classification else None)
     
-    def get_analytics(self):
-        """Get analytics for Doanh số"""
-        if self.df is None:
+    def memory_usage(self):
+        """Bytes held by the loaded frame, per column (measured once at load)"""
+        return self.memory
+    
+    @timed('compute')
+    def get_analytics(self, filters_dict=None, exact=False):
+        """Get analytics for Doanh số, over the rows matching custcode/classification if given"""
+        if self.enriched_df is None:
             return {'forecast': [], 'top10': []}
         
-        return Analytics.get_doanhso_analytics(self.df)
\ No newline at end of file
+        custcode, classification = self.filter_args(filters_dict)
+        if not custcode and not classification:
+            return self.analytics
+        return Analytics.get_doanhso_analytics(
+            self.enriched_df, self.filter_mask(custcode, classification, exact)
+        )
+
+def enrich(df):
+    """Raw Doanh số sheet -> compacted output frame with TB, Dự báo, Phân loại computed once"""
+    metrics = calculate_metrics_frame(df)
+    df = df.assign(**{
+        'TB Doanh số': metrics['TB'],
+        'Dự báo tháng tới': metrics['Forecast'],
+        'Phân loại': metrics['Class'],
+    })
+    return compact_frame(df[[col for col in DoanhsoService.OUTPUT_COLUMNS if col in df.columns]])
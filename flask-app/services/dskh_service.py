@@ -1,49 +1,113 @@
 import pandas as pd
-from utils import df_to_dict
+from search_index import SearchIndex, intersect_rows
+from mask_cache import MaskCache
+from filter_catalog import FilterCatalog
+from aggregation import Aggregator, empty_result
+from compaction import freeze_frame, memory_report
+from utils import paginate, paged_response, SortCache
 from analytics import Analytics
+from instrumentation import timed
 
 class DSKHService:
     """Handle all DSKH operations"""
     
-    def __init__(self, df):
-        self.df = df
+    def __init__(self, df, indexes=None):
+        self.memory = memory_report(df)
+        self.df = freeze_frame(df)
+        self.sort_cache = SortCache(df) if df is not None else None
+        self.search_index = SearchIndex(df, indexes=indexes) if df is not None else None
+        self.mask_cache = MaskCache(df, indexes=indexes) if df is not None else None
+        self.filters = self._build_filters(df) if df is not None else {}
+        self.filter_catalog = FilterCatalog(self.filters, self.mask_cache) if df is not None else None
+        self.aggregator = Aggregator(df) if df is not None else None
     
-    def get_data(self):
-        """Get DSKH data with filter options"""
-        if self.df is None:
-            return {'data': [], 'columns': [], 'filters': {}, 'total_rows': 0}
-        
-        df = self.df.copy()
-        
+    @staticmethod
+    def _build_filters(df):
+        """Filter options: columns with at most 100 distinct values"""
         filters = {}
         for col in df.columns:
             unique = df[col].dropna().unique()
             if len(unique) <= 100:
                 filters[col] = [str(v) for v in unique]
+        return filters
+    
+    def get_data(self, page=None):
+        """Get DSKH data with filter options"""
+        if self.df is None:
+            return {'data': [], 'columns': [], 'filters': {}, 'total_rows': 0}
         
-        return {
-            'data': df_to_dict(df),
+        df = self.df
+        filters = self.filters
+        
+        page_df, total = paginate(df, page, sort_cache=self.sort_cache)
+        result = {
+            'data': page_df,
             'columns': list(df.columns),
             'filters': filters,
-            'total_rows': len(df)
+            'total_rows': total
         }
+        if page:
+            result.update({'offset': page['offset'], 'limit': page['limit']})
+        return result
     
-    def filter(self, filters_dict):
-        """Filter DSKH data"""
-        if self.df is None:
-            return []
+    def active_filters(self, filters_dict):
+        """(column, value) pairs that actually filter, in a canonical order"""
+        return tuple(sorted(
+            (key, value) for key, value in (filters_dict or {}).items()
+            if value and value != 'all' and key in self.df.columns
+        ))
+    
+    def filter_mask(self, filters_dict, exact=False):
+        """Boolean row mask for the given column filters (substring or exact), computed once per filter set"""
+        active = self.active_filters(filters_dict)
+        return self.mask_cache.filter_mask((active, exact), lambda: self._compute_mask(active, exact))
+    
+    def _compute_mask(self, active, exact):
+        if exact:
+            return self.mask_cache.match_all(active)
+        
+        rows = None
         
-        df = self.df.copy()
+        for key, value in active:
+            matched = self.search_index.contains(key, value, lower_pattern=False)
+            rows = intersect_rows(rows, matched)
         
-        for key, value in filters_dict.items():
-            if value and value != 'all' and key in df.columns:
-                df = df[df[key].astype(str).str.contains(str(value), case=False, na=False)]
+        return self.search_index.mask(rows)
+    
+    @timed('filter')
+    def filter(self, filters_dict, page=None, exact=False):
+        """Filter DSKH data"""
+        if self.df is None:
+            return paged_response(None, 0, page)
         
-        return df_to_dict(df)
+        mask = self.filter_mask(filters_dict, exact)
+        df, total = paginate(self.df, page, mask=mask, sort_cache=self.sort_cache)
+        return paged_response(df, total, page)
+    
+    def filter_options(self, filters_dict=None, exact=False):
+        """Filter options with counts, cascading on the given filters"""
+        if self.df is None:
+            return {}
+        active = dict(self.active_filters(filters_dict))
+        return self.filter_catalog.get(active, lambda f: self.filter_mask(f, exact))
+    
+    def aggregate(self, spec, filters_dict=None, exact=False):
+        """Group-by measures over the rows matching the filters"""
+        if self.df is None:
+            return empty_result(spec)
+        active = self.active_filters(filters_dict)
+        return self.aggregator.run(spec, (active, exact), lambda: self.filter_mask(dict(active), exact) if active else None)
+    
+    def memory_usage(self):
+        """Bytes held by the loaded frame, per column (measured once at load)"""
+        return self.memory
     
-    def get_analytics(self):
-        """Get analytics for DSKH"""
+    @timed('compute')
+    def get_analytics(self, filters_dict=None, exact=False):
+        """Get analytics for DSKH, over the rows matching the filters if given"""
         if self.df is None:
             return {'channel': {}, 'district': {}, 'total': 0}
         
-        return Analytics.get_dskh_analytics(self.df)
\ No newline at end of file
+        active = self.active_filters(filters_dict)
+        mask = self.filter_mask(dict(active), exact) if active else None
+        return Analytics.get_dskh_analytics(self.df, mask)
\ No newline at end of file
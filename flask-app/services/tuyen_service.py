@@ -1,16 +1,43 @@
 import pandas as pd
-from utils import df_to_dict
+from search_index import SearchIndex, intersect_rows
+from mask_cache import MaskCache
+from filter_catalog import FilterCatalog
+from aggregation import Aggregator, empty_result
+from compaction import freeze_frame, memory_report
+from utils import paginate, paged_response, SortCache
+from instrumentation import timed
 
 class TuyenService:
     """Handle all Tuyen va Nhan vien operations"""
     
-    def __init__(self, df):
-        self.df = df
+    def __init__(self, df, indexes=None):
+        self.memory = memory_report(df)
+        self.df = freeze_frame(df)
+        self.sort_cache = SortCache(df) if df is not None else None
+        self.search_index = SearchIndex(df, indexes=indexes) if df is not None else None
+        self.mask_cache = MaskCache(df, indexes=indexes) if df is not None else None
+        self.filters = self._build_filters(df) if df is not None else {}
+        self.filter_catalog = FilterCatalog(self.filters, self.mask_cache) if df is not None else None
+        self.aggregator = Aggregator(df) if df is not None else None
         print(f"TuyenService initialized with {len(df) if df is not None else 0} rows")
         if df is not None:
             print(f"Columns: {list(df.columns)}")
     
-    def get_data(self):
+    @staticmethod
+    def _build_filters(df):
+        """Filter options: text columns with at most 200 distinct values"""
+        filters = {}
+        try:
+            for col in df.columns:
+                if df[col].dtype == 'object' or isinstance(df[col].dtype, pd.CategoricalDtype):  # Only text columns
+                    unique = df[col].dropna().unique()
+                    if len(unique) <= 200:
+                        filters[col] = sorted([str(v) for v in unique if v])  # Filter out empty strings
+        except Exception as e:
+            print(f"Error building filters: {e}")
+        return filters
+    
+    def get_data(self, page=None):
         """Get Tuyen data with filter options"""
         if self.df is None or len(self.df) == 0:
             return {
@@ -20,56 +47,86 @@ class TuyenService:
                 'total_rows': 0
             }
         
-        df = self.df.copy()
+        df = self.df
+        filters = self.filters
         
-        # Get unique values for filters
-        filters = {}
-        try:
-            for col in df.columns:
-                if df[col].dtype == 'object':  # Only text columns
-                    unique = df[col].dropna().unique()
-                    if len(unique) <= 200:
-                        filters[col] = sorted([str(v) for v in unique if v])  # Filter out empty strings
-        except Exception as e:
-            print(f"Error building filters: {e}")
-        
-        return {
-            'data': df_to_dict(df),
+        page_df, total = paginate(df, page, sort_cache=self.sort_cache)
+        result = {
+            'data': page_df,
             'columns': list(df.columns),
             'filters': filters,
-            'total_rows': len(df)
+            'total_rows': total
         }
+        if page:
+            result.update({'offset': page['offset'], 'limit': page['limit']})
+        return result
     
-    def filter(self, filters_dict):
-        """Filter Tuyen data"""
-        if self.df is None or len(self.df) == 0:
-            return []
+    def active_filters(self, filters_dict):
+        """(column, value) pairs that actually filter, in a canonical order"""
+        # Skip if value is empty, 'all', or key doesn't exist
+        return tuple(sorted(
+            (key, value) for key, value in (filters_dict or {}).items()
+            if value and value != 'all' and key in self.df.columns
+        ))
+    
+    def filter_mask(self, filters_dict, exact=False):
+        """Boolean row mask for the given column filters (substring or exact), computed once per filter set"""
+        active = self.active_filters(filters_dict)
+        return self.mask_cache.filter_mask((active, exact), lambda: self._compute_mask(active, exact))
+    
+    def _compute_mask(self, active, exact):
+        if exact:
+            return self.mask_cache.match_all(active)
         
-        df = self.df.copy()
+        rows = None
         
         # Apply filters
-        for key, value in filters_dict.items():
-            # Skip if value is empty, 'all', or key doesn't exist
-            if not value or value == 'all' or key not in df.columns:
-                continue
-            
+        for key, value in active:
             try:
-                # Convert column to string and filter
-                mask = df[key].astype(str).str.lower().str.contains(str(value).lower(), case=False, na=False)
-                df = df[mask]
-                print(f"✓ Filtered {key}={value}, remaining rows: {len(df)}")
+                # Case-insensitive substring match via the search index
+                rows = intersect_rows(rows, self.search_index.contains(key, value))
+                print(f"✓ Filtered {key}={value}, remaining rows: {len(rows)}")
             except Exception as e:
                 print(f"✗ Error filtering column {key}: {e}")
         
-        return df_to_dict(df)
+        return self.search_index.mask(rows)
+    
+    @timed('filter')
+    def filter(self, filters_dict, page=None, exact=False):
+        """Filter Tuyen data"""
+        if self.df is None or len(self.df) == 0:
+            return paged_response(None, 0, page)
+        
+        mask = self.filter_mask(filters_dict, exact)
+        df, total = paginate(self.df, page, mask=mask, sort_cache=self.sort_cache)
+        return paged_response(df, total, page)
+    
+    def filter_options(self, filters_dict=None, exact=False):
+        """Filter options with counts, cascading on the given filters"""
+        if self.df is None or len(self.df) == 0:
+            return {}
+        active = dict(self.active_filters(filters_dict))
+        return self.filter_catalog.get(active, lambda f: self.filter_mask(f, exact))
+    
+    def aggregate(self, spec, filters_dict=None, exact=False):
+        """Group-by measures over the rows matching the filters"""
+        if self.df is None or len(self.df) == 0:
+            return empty_result(spec)
+        active = self.active_filters(filters_dict)
+        return self.aggregator.run(spec, (active, exact), lambda: self.filter_mask(dict(active), exact) if active else None)
+    
+    def memory_usage(self):
+        """Bytes held by the loaded frame, per column (measured once at load)"""
+        return self.memory
     
+    @timed('compute')
     def get_analytics(self):
         """Get Tuyen analytics"""
         if self.df is None or len(self.df) == 0:
             return {}
         
         try:
-            df = self.df.copy()
+            df = self.df
             analytics = {
                 'total_rows': len(df),
                 'total_columns': len(df.columns)
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import warnings
+import numpy as np
+import pandas as pd
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - save() reports the missing dependency
+    pa = feather = None
+from config import SNAPSHOT_FOLDER, SNAPSHOT_MAX_BYTES, SNAPSHOT_MAX_AGE_DAYS
+
+MANIFEST = 'manifest.json'
+# Bump when the cached frame layout changes (e.g. compaction) to invalidate old snapshots
+SNAPSHOT_FORMAT = 5
+# Feather schema metadata key describing columns split by _split_mixed
+MIXED_KEY = b'smartbi.mixed'
+
+os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+
+def file_hash(filepath, chunk_size=1024 * 1024):
+    """SHA-256 of file contents"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def snapshot_dir(digest):
+    return os.path.join(SNAPSHOT_FOLDER, digest)
+
+def _is_mixed(values):
+    """True for object values Arrow cannot hold in one typed column"""
+    return len({type(value) for value in values}) > 1
+
+def _split_mixed(df):
+    """Arrow columns hold one type: store mixed object columns as a type tag + one column per type.
+    
+    Excel leaves such columns behind (numbers and '' blanks in one column). Categorical
+    columns with mixed categories keep their codes; the categories go in the layout.
+    -> (frame Arrow can write, {column: layout} for _join_mixed)
+    """
+    layout = {}
+    columns = {}
+    for position, (col, series) in enumerate(df.items()):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+            if categories.dtype == object and _is_mixed(categories):
+                name = f'__mixed_{position}_codes'
+                columns[name] = series.cat.codes
+                layout[col] = {'position': position, 'codes': name, 'categories': categories.tolist()}
+                continue
+        elif series.dtype == object and _is_mixed(series):
+            values = series.to_numpy()
+            types = list(dict.fromkeys(type(value) for value in values))
+            tags = np.fromiter((types.index(type(value)) for value in values), dtype=np.int8, count=len(values))
+            parts = []
+            for i, kind in enumerate(types):
+                # Rows of other types repeat this type's first value: no nulls, ints stay ints
+                part = np.full(len(values), values[tags == i][0], dtype=object)
+                part[tags == i] = values[tags == i]
+                name = f'__mixed_{position}_{i}'
+                columns[name] = pd.Series(part, index=series.index).infer_objects()
+                parts.append(name)
+            columns[f'__mixed_{position}_tag'] = tags
+            layout[col] = {'position': position, 'tag': f'__mixed_{position}_tag', 'parts': parts}
+            continue
+        columns[col] = series
+    return pd.DataFrame(columns, index=df.index), layout
+
+def _join_mixed(table, layout):
+    """Inverse of _split_mixed: Arrow table -> frame with the original mixed columns"""
+    names = [name for spec in layout.values() for name in spec.get('parts', []) + [spec.get('tag', spec.get('codes'))]]
+    df = table.drop_columns(names).to_pandas(split_blocks=True)
+    with warnings.catch_warnings():
+        # insert() adds one block per column; consolidating would copy the mapped ones
+        warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+        for col, spec in sorted(layout.items(), key=lambda item: item[1]['position']):
+            if 'codes' in spec:
+                codes = table.column(spec['codes']).to_numpy()
+                values = pd.Categorical.from_codes(codes, categories=pd.Index(spec['categories'], dtype=object))
+            else:
+                tags = table.column(spec['tag']).to_numpy()
+                values = np.empty(len(tags), dtype=object)
+                for i, name in enumerate(spec['parts']):
+                    part = table.column(name).to_pandas().to_numpy(dtype=object)
+                    values[tags == i] = part[tags == i]
+            df.insert(spec['position'], col, values)
+    return df
+
+def _write_frame(df, path_base):
+    """Write frame as uncompressed Feather, so readers can memory-map it"""
+    df, layout = _split_mixed(df.reset_index(drop=True))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if layout:
+        table = table.replace_schema_metadata({**table.schema.metadata, MIXED_KEY: json.dumps(layout).encode()})
+    feather.write_feather(table, path_base + '.feather', compression='uncompressed')
+    return os.path.basename(path_base) + '.feather'
+
+def _read_frame(path):
+    """Read a snapshot frame, memory-mapped.
+    
+    Numeric columns without nulls and the codes of categorical (low-cardinality text)
+    columns stay backed by the mapped file, so every worker process reading the same
+    snapshot shares those pages through the OS page cache. High-cardinality text columns
+    (names, addresses, codes) are still materialized as Python strings per process.
+    """
+    table = feather.read_table(path, memory_map=True)
+    layout = (table.schema.metadata or {}).get(MIXED_KEY)
+    if layout is None:
+        return table.to_pandas(split_blocks=True)
+    return _join_mixed(table, json.loads(layout))
+
+def load(digest):
+    """Load cached frames for a workbook hash, None on miss"""
+    folder = snapshot_dir(digest)
+    manifest_path = os.path.join(folder, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != SNAPSHOT_FORMAT:
+            print(f"✓ Snapshot {digest[:12]} has old format, re-parsing")
+            shutil.rmtree(folder, ignore_errors=True)
+            return None
+        frames = {
+            key: _read_frame(os.path.join(folder, filename))
+            for key, filename in manifest['frames'].items()
+        }
+        # Touch manifest: eviction by age uses last access time
+        os.utime(manifest_path, None)
+        print(f"✓ Snapshot hit {digest[:12]}: {list(frames)}")
+        return frames
+    except Exception as e:
+        print(f"✗ Snapshot {digest[:12]} unreadable, ignoring: {e}")
+        shutil.rmtree(folder, ignore_errors=True)
+        return None
+
+def save(digest, frames, keep=()):
+    """Persist parsed frames for a workbook hash; snapshots in keep are never evicted"""
+    folder = snapshot_dir(digest)
+    tmp_folder = f"{folder}.tmp-{uuid.uuid4().hex}"
+    try:
+        os.makedirs(tmp_folder)
+        manifest = {'format': SNAPSHOT_FORMAT, 'created': time.time(), 'frames': {}}
+        for key, df in frames.items():
+            manifest['frames'][key] = _write_frame(df, os.path.join(tmp_folder, key))
+        with open(os.path.join(tmp_folder, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        
+        # Publish atomically; another upload of the same file may have won
+        if os.path.exists(folder):
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+        else:
+            os.rename(tmp_folder, folder)
+        print(f"✓ Snapshot saved {digest[:12]}")
+    except Exception as e:
+        print(f"✗ Snapshot save error: {e}")
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+    
+    evict(keep=keep)
+
+def _folder_size(folder):
+    """Bytes of a snapshot folder, including its persisted indexes"""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(folder) for name in names
+    )
+
+def evict(max_bytes=SNAPSHOT_MAX_BYTES, max_age_days=SNAPSHOT_MAX_AGE_DAYS, keep=()):
+    """Drop snapshots unused for max_age_days, then least recently used over max_bytes.
+    
+    Snapshots in keep (the ones published datasets point at) are never dropped:
+    they are what a restart restores from.
+    """
+    entries = []
+    now = time.time()
+    for name in os.listdir(SNAPSHOT_FOLDER):
+        folder = os.path.join(SNAPSHOT_FOLDER, name)
+        manifest_path = os.path.join(folder, MANIFEST)
+        if not os.path.isdir(folder) or not os.path.exists(manifest_path) or name in keep:
+            continue
+        last_used = os.path.getmtime(manifest_path)
+        if now - last_used > max_age_days * 86400:
+            shutil.rmtree(folder, ignore_errors=True)
+            print(f"✓ Snapshot evicted (age): {name[:12]}")
+            continue
+        entries.append((last_used, _folder_size(folder), folder))
+    
+    total = sum(size for _, size, _ in entries)
+    for last_used, size, folder in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(folder, ignore_errors=True)
+        total -= size
+        print(f"✓ Snapshot evicted (size): {os.path.basename(folder)[:12]}")
@@ -0,0 +1,61 @@
+import os
+import sys
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+# config's folders (uploads/, data/) are relative to flask-app/, like when running app.py
+os.chdir(APP_DIR)
+
+from flask import Flask
+import datasets
+import loader
+import routes
+from benchmarks.generate_workbook import generate_workbook
+from datasets import Dataset, DatasetRegistry
+from response_cache import ResponseCache
+
+# Customers in the synthetic test workbook
+WORKBOOK_ROWS = 400
+
+@pytest.fixture(scope='session')
+def workbook(tmp_path_factory):
+    return generate_workbook(str(tmp_path_factory.mktemp('workbook') / 'synthetic.xlsx'), WORKBOOK_ROWS)
+
+@pytest.fixture(scope='session')
+def frames(workbook):
+    """Parsed sheets of the synthetic workbook (parsed serially, once per test run)"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(loader, 'INGEST_WORKERS', 1)
+        return loader.parse_workbook(workbook)
+
+@pytest.fixture
+def services(frames):
+    """Fresh services (empty caches) over the parsed frames"""
+    return loader.build_services(frames)
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """Empty registry (and response cache) behind the API; pointer files go to tmp_path"""
+    monkeypatch.setattr(datasets, 'DATASET_FOLDER', str(tmp_path))
+    registry = DatasetRegistry()
+    monkeypatch.setattr(routes, 'registry', registry)
+    monkeypatch.setattr(routes, 'response_cache', ResponseCache())
+    return registry
+
+@pytest.fixture
+def publish(registry):
+    """publish(services, digest) -> Dataset served as the default dataset"""
+    def publish(services, digest='0' * 64):
+        sheets = [sheet for sheet, key in loader.SHEET_KEYS.items() if services.get(key) is not None]
+        dataset = Dataset('default', digest, '', services, sheets)
+        registry.put(dataset)
+        return dataset
+    return publish
+
+@pytest.fixture
+def client(registry):
+    app = Flask(__name__)
+    app.register_blueprint(routes.api)
+    return app.test_client()
@@ -0,0 +1,78 @@
+import math
+import pandas as pd
+import pytest
+
+# sheet: (group_by columns, numeric column, text column, substring filter args)
+CASES = {
+    'doanhso': (['Phân loại'], 'T', 'CustCode', {'custcode': '0001'}),
+    'dskh': (['Kênh khách hàng'], 'Doanh số trung bình', 'Tên phường xã', {'Kênh khách hàng': 'GT'}),
+    'tuyen': (['Trạng thái', 'Giám sát'], 'Số Calls', 'Tên tuyến', {}),
+    'chitiet': (['KenhPhanPhoi', 'TanSuatGoiYValue'], 'DoanhSoTB', 'MaKhachHang', {'KenhPhanPhoi': 'o'}),
+}
+
+def _main_frame(key, service):
+    return getattr(service, {'doanhso': 'enriched_df', 'chitiet': 'processed_df'}.get(key, 'df'))
+
+def _pandas_rows(key, df, filters):
+    mask = pd.Series(True, index=df.index)
+    for arg, value in filters.items():
+        column = 'CustCode' if arg == 'custcode' else arg
+        mask &= df[column].astype(str).str.lower().str.contains(value.lower(), regex=False)
+    return df[mask]
+
+def _pandas_groupby(rows, group_by, numeric, text):
+    frame = rows[group_by].astype(object).assign(
+        _n=pd.to_numeric(rows[numeric].astype(object), errors='coerce'),
+        _t=rows[text],
+    )
+    grouped = frame.groupby(group_by, dropna=False, sort=False)
+    result = pd.DataFrame({
+        'count': grouped.size(),
+        f'sum({numeric})': grouped['_n'].sum(),
+        f'mean({numeric})': grouped['_n'].mean(),
+        f'nunique({text})': grouped['_t'].nunique(),
+    }).reset_index()
+    return {
+        tuple(str(row[col]) for col in group_by): {label: row[label] for label in result.columns if label not in group_by}
+        for _, row in result.iterrows()
+    }
+
+def _close(value, expected):
+    """JSON measure vs pandas value (null = NaN, e.g. the mean of no numbers)"""
+    value = math.nan if value is None else value
+    return (math.isnan(value) and math.isnan(expected)) or math.isclose(value, expected, rel_tol=1e-9)
+
+@pytest.mark.parametrize('key', list(CASES))
+@pytest.mark.parametrize('filtered', [False, True])
+def test_aggregate_matches_pandas_groupby(services, publish, client, key, filtered):
+    publish(services)
+    group_by, numeric, text, filters = CASES[key]
+    filters = filters if filtered else {}
+    query = dict(filters, group_by=','.join(group_by),
+                 measures=f'count,sum({numeric}),mean({numeric}),nunique({text})')
+    
+    response = client.get(f'/api/aggregate/{key}', query_string=query)
+    assert response.status_code == 200
+    body = response.get_json()
+    
+    rows = _pandas_rows(key, _main_frame(key, services[key]), filters)
+    expected = _pandas_groupby(rows, group_by, numeric, text)
+    assert 0 < len(rows)
+    assert body['matched_rows'] == len(rows)
+    assert body['total_groups'] == len(expected) == len(body['data'])
+    for row in body['data']:
+        group = tuple(str(row[col]) for col in group_by)
+        for label, value in expected[group].items():
+            assert _close(row[label], float(value)), (group, label)
+
+def test_aggregate_top_sorted_by_measure(services, publish, client):
+    publish(services)
+    df = services['dskh'].df
+    response = client.get('/api/aggregate/dskh', query_string={
+        'group_by': 'Tên phường xã', 'measures': 'sum(Doanh số trung bình)', 'top': 3, 'order': 'desc'
+    })
+    data = response.get_json()['data']
+    
+    sums = pd.to_numeric(df['Doanh số trung bình'].astype(object), errors='coerce').groupby(
+        df['Tên phường xã'].astype(object)).sum()
+    assert [row['sum(Doanh số trung bình)'] for row in data] == pytest.approx(sums.nlargest(3).tolist())
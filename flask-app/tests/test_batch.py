@@ -0,0 +1,78 @@
+import re
+import pytest
+from flask import Flask
+import routes
+from instrumentation import BACKGROUND, init_app, metrics
+
+@pytest.fixture
+def timed_client(registry):
+    """Client of an app with the timing middleware, like app.py builds it"""
+    app = Flask(__name__)
+    init_app(app)
+    app.register_blueprint(routes.api)
+    return app.test_client()
+
+def _stage_counts(endpoint):
+    """{stage: observations} of smartbi_stage_duration_seconds for one endpoint"""
+    pattern = re.compile(r'smartbi_stage_duration_seconds_count\{endpoint="([^"]*)",stage="([^"]*)"\} (\d+)')
+    return {
+        stage: int(count)
+        for name, stage, count in pattern.findall(metrics.render()) if name == endpoint
+    }
+
+def test_batch_sub_query_stages_are_labelled_with_the_endpoint(services, publish, timed_client):
+    publish(services)
+    queries = [
+        {'type': 'filter', 'sheet': 'dskh', 'params': {'Kênh khách hàng': 'GT', 'limit': 5}},
+        {'type': 'analytics', 'sheet': 'dskh', 'params': {'Kênh khách hàng': 'GT'}},
+        {'type': 'filter', 'sheet': 'chitiet', 'params': {'KenhPhanPhoi': 'OTC'}},
+    ]
+    background = _stage_counts(BACKGROUND)
+    batch = _stage_counts('api.batch')
+    
+    assert timed_client.post('/api/batch', json={'queries': queries}).status_code == 200
+    
+    assert _stage_counts(BACKGROUND) == background
+    after = _stage_counts('api.batch')
+    # Sub-queries add their own filter/compute stages on top of run_batch's two
+    assert after.get('filter', 0) - batch.get('filter', 0) > 1
+    assert after.get('compute', 0) - batch.get('compute', 0) > 1
+
+# Text column of each synthetic sheet (the doanhso routes filter on custcode), and a numeric one
+COLUMNS = {
+    'doanhso': ('custcode', 'CustCode', 'T'),
+    'dskh': ('Kênh khách hàng', 'Kênh khách hàng', 'Doanh số trung bình'),
+    'tuyen': ('Tên tuyến', 'Tên tuyến', 'Số Calls'),
+    'chitiet': ('KenhPhanPhoi', 'KenhPhanPhoi', 'DoanhSoTB'),
+}
+
+def _sub_queries(sheet):
+    arg, column, numeric = COLUMNS[sheet]
+    value = 'OTC' if sheet == 'chitiet' else ('GT' if sheet == 'dskh' else '1')
+    queries = [
+        ('data', {}),
+        ('data', {'limit': 7, 'offset': 3, 'sort': numeric, 'order': 'asc'}),
+        ('filter', {arg: value}),
+        ('filter', {arg: value, 'limit': 5, 'sort': numeric}),
+        ('filters', {arg: value}),
+        ('aggregate', {arg: value, 'group_by': column, 'measures': f'count,sum({numeric})', 'top': 3}),
+        ('aggregate', {'group_by': 'nope'}),
+    ]
+    if sheet != 'tuyen':
+        queries.append(('analytics', {arg: value}))
+    return [{'id': f'{sheet}-{i}', 'type': kind, 'sheet': sheet, 'params': params}
+            for i, (kind, params) in enumerate(queries)]
+
+def test_batch_results_match_individual_requests(services, publish, client):
+    publish(services)
+    queries = [query for sheet in COLUMNS for query in _sub_queries(sheet)]
+    
+    response = client.post('/api/batch', json={'queries': queries})
+    assert response.status_code == 200
+    results = {result['id']: result for result in response.get_json()['results']}
+    assert list(results) == [query['id'] for query in queries]
+    
+    for query in queries:
+        single = client.get(f"/api/{query['type']}/{query['sheet']}", query_string=query['params'])
+        assert results[query['id']]['status'] == single.status_code, query
+        assert results[query['id']]['body'] == single.get_json(), query
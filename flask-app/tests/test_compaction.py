@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from compaction import compact_frame, freeze_frame, memory_report
+
+def test_only_flag_columns_become_uint8():
+    df = pd.DataFrame({
+        'T2_LoTrinhDMS': [0, 1, 1, 0],
+        'W1_TanSuatDMS': pd.Series([1, 0, 0, 1], dtype=object),
+        'MaKhachHang': [1, 0, 1, 1],
+        'DoanhSoTB': [0.5, 1.0, 0.0, 1.0],
+    })
+    compacted = compact_frame(df)
+    
+    assert compacted['T2_LoTrinhDMS'].dtype == np.uint8
+    assert compacted['W1_TanSuatDMS'].dtype == np.uint8
+    assert compacted['MaKhachHang'].dtype == np.int8
+    assert compacted['DoanhSoTB'].dtype == np.float64
+    assert compacted.astype(object).values.tolist() == df.astype(object).values.tolist()
+
+def test_memory_report_matches_pandas_deep_usage():
+    df = compact_frame(pd.DataFrame({
+        'name': [f'Khách hàng {i}' for i in range(100)],
+        'channel': ['GT', 'OTC'] * 50,
+        'sales': np.arange(100, dtype=float),
+    }))
+    expected = df.memory_usage(deep=True, index=False)
+    
+    report = memory_report(freeze_frame(df))
+    assert report['bytes'] == expected.sum()
+    assert {col: info['bytes'] for col, info in report['columns'].items()} == expected.to_dict()
@@ -0,0 +1,53 @@
+import threading
+import datasets
+from datasets import Dataset, DatasetRegistry
+
+def _dataset(digest):
+    return Dataset('default', digest, '', {}, [])
+
+def _join_sync_threads():
+    for thread in threading.enumerate():
+        if thread.name.startswith('dataset-sync-'):
+            thread.join(5)
+
+def test_sync_serves_old_dataset_until_new_one_is_attached(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, 'DATASET_FOLDER', str(tmp_path))
+    loading = threading.Event()
+    release = threading.Event()
+    
+    def reload(known):
+        loading.set()
+        release.wait(5)
+        return _dataset(known.digest)
+    monkeypatch.setattr(DatasetRegistry, '_reload', staticmethod(reload))
+    
+    # Two workers sharing the pointer folder
+    reader = DatasetRegistry(sync_interval=0)
+    writer = DatasetRegistry(sync_interval=0)
+    old = _dataset('a' * 64)
+    reader.put(old)
+    writer.put(_dataset('b' * 64))
+    
+    assert reader.get('default') is old
+    assert loading.wait(5)
+    # Still loading in the background: readers don't block and keep the old snapshot
+    assert reader.get('default') is old
+    
+    release.set()
+    _join_sync_threads()
+    assert reader.get('default').digest == 'b' * 64
+    assert reader.version('default') == 'b' * 16
+
+def test_sync_keeps_old_dataset_if_new_one_fails_to_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, 'DATASET_FOLDER', str(tmp_path))
+    monkeypatch.setattr(DatasetRegistry, '_reload', staticmethod(lambda known: None))
+    
+    reader = DatasetRegistry(sync_interval=0)
+    old = _dataset('a' * 64)
+    reader.put(old)
+    DatasetRegistry(sync_interval=0).put(_dataset('b' * 64))
+    
+    reader.get('default')
+    _join_sync_threads()
+    assert reader.get('default') is old
+    assert reader.version('default') == old.version
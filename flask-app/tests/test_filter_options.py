@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+def _main_frame(service):
+    return service.processed_df if hasattr(service, 'processed_df') else service.df
+
+def _pandas_filter(df, filters, exact):
+    """Rows the old pandas filters kept: substring (case-insensitive) or stripped exact match"""
+    mask = pd.Series(True, index=df.index)
+    for column, value in filters.items():
+        text = df[column].astype(str)
+        if exact:
+            mask &= text.str.strip() == value
+        else:
+            mask &= text.str.lower().str.contains(value.lower(), case=False, na=False)
+    return df[mask]
+
+def _expected_options(service, df, active, exact):
+    """Per option column: value counts over rows matching every active filter but its own"""
+    expected = {}
+    for column, values in service.filter_catalog.options.items():
+        rows = _pandas_filter(df, {k: v for k, v in active.items() if k != column}, exact)
+        counts = rows[column].astype(str).str.strip().value_counts()
+        # Only values the dropdown offers (Tuyến leaves out blanks)
+        expected[column] = {value: count for value, count in counts.items() if value in {v.strip() for v in values}}
+    return expected
+
+def _counts(options):
+    return {column: {entry['value'].strip(): entry['count'] for entry in entries} for column, entries in options.items()}
+
+@pytest.mark.parametrize('key', ['dskh', 'tuyen', 'chitiet'])
+@pytest.mark.parametrize('exact', [False, True])
+def test_cascading_options_match_pandas(services, publish, client, key, exact):
+    publish(services)
+    service = services[key]
+    df = _main_frame(service)
+    columns = [col for col, values in service.filter_catalog.options.items() if len(values) > 1][:2]
+    assert len(columns) == 2
+    
+    first = df[columns[0]].astype(str).str.strip().iloc[0]
+    second = df[columns[1]].astype(str).str.strip().iloc[-1]
+    cases = [{columns[0]: first}, {columns[0]: first, columns[1]: second}]
+    if not exact:
+        cases.append({columns[0]: first[:2]})
+    
+    for active in cases:
+        query = dict(active, match='exact') if exact else active
+        response = client.get(f'/api/filters/{key}', query_string=query)
+        assert response.status_code == 200
+        assert _counts(response.get_json()['options']) == _expected_options(service, df, active, exact), active
+
+def test_unfiltered_options_are_column_uniques(services, publish, client):
+    publish(services)
+    for key in ('dskh', 'tuyen', 'chitiet'):
+        df = _main_frame(services[key])
+        options = client.get(f'/api/filters/{key}').get_json()['options']
+        for column, entries in options.items():
+            uniques = df[column].dropna().unique()
+            # Tuyến leaves blank values out of its dropdowns
+            expected = {str(v) for v in uniques if v or key != 'tuyen'}
+            assert {entry['value'] for entry in entries} == expected, column
+
+def test_doanhso_classification_options_follow_custcode(services, publish, client):
+    publish(services)
+    df = services['doanhso'].enriched_df
+    custcode = str(df['CustCode'].iloc[0])[:4]
+    
+    options = client.get('/api/filters/doanhso', query_string={'custcode': custcode}).get_json()['options']
+    rows = df[df['CustCode'].astype(str).str.contains(custcode, case=False)]
+    assert _counts(options) == {'Phân loại': rows['Phân loại'].astype(str).value_counts().to_dict()}
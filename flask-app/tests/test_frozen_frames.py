@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+from aggregation import parse_aggregate
+from loader import SHEET_KEYS
+
+def _service_frames(services):
+    """Every DataFrame a service holds, by (sheet, attribute)"""
+    return {
+        (key, name): value
+        for key, service in services.items() if service is not None
+        for name, value in vars(service).items() if isinstance(value, pd.DataFrame)
+    }
+
+def _fingerprint(df):
+    return (
+        [str(col) for col in df.columns],
+        [str(dtype) for dtype in df.dtypes],
+        pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes(),
+    )
+
+def _fingerprints(services):
+    return {name: _fingerprint(df) for name, df in _service_frames(services).items()}
+
+def _main_frame(key, service):
+    return getattr(service, {'doanhso': 'enriched_df', 'chitiet': 'processed_df'}.get(key, 'df'))
+
+def _probe(key, df):
+    """(text column, a value in it, numeric column) to build filters, sorts and measures from"""
+    text = next(
+        col for col in df.columns
+        if (df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype))
+        and (df[col].astype(str) != '').any()
+    )
+    if key == 'doanhso':
+        text = 'CustCode'
+    value = str(df[text][df[text].astype(str) != ''].iloc[0])
+    numeric = next(col for col in df.columns if isinstance(df[col].dtype, np.dtype) and df[col].dtype.kind in 'iuf')
+    return text, value, numeric
+
+def _filters(key, text, value):
+    return {'custcode': value} if key == 'doanhso' else {text: value}
+
+def _call_public_methods(key, service):
+    text, value, numeric = _probe(key, _main_frame(key, service))
+    page = {'offset': 5, 'limit': 20, 'sort': text, 'ascending': False}
+    contains = _filters(key, text, value[:3])
+    exact = _filters(key, text, value)
+    spec = parse_aggregate({'group_by': text, 'measures': f'count,sum({numeric})', 'top': '5'})
+    
+    service.get_data()
+    service.get_data(page=page)
+    if key == 'doanhso':
+        service.filter(value[:3], 'VIP', page=page)
+        service.filter(value, '', exact=True)
+        service.filter_mask(value[:3], 'High')
+    else:
+        service.filter(contains, page=page)
+        service.filter(exact, exact=True)
+        service.filter_mask(contains)
+        service.active_filters(contains)
+    service.filter_options()
+    service.filter_options(contains)
+    service.filter_options(exact, exact=True)
+    service.aggregate(spec)
+    service.aggregate(spec, contains)
+    service.aggregate(spec, exact, exact=True)
+    service.memory_usage()
+    if key == 'tuyen':
+        service.get_analytics()
+    else:
+        service.get_analytics()
+        service.get_analytics(contains)
+        service.get_analytics(exact, exact=True)
+
+def _request_paths(key, service):
+    text, value, numeric = _probe(key, _main_frame(key, service))
+    arg = 'custcode' if key == 'doanhso' else text
+    paths = [
+        f'/api/data/{key}',
+        f'/api/data/{key}?limit=10&offset=3&sort={text}&order=desc',
+        f'/api/filter/{key}?{arg}={value[:3]}',
+        f'/api/filter/{key}?{arg}={value}&match=exact&limit=10&sort={numeric}',
+        f'/api/filter/{key}?{arg}={value[:3]}&stream=1',
+        f'/api/filters/{key}',
+        f'/api/filters/{key}?{arg}={value[:3]}',
+        f'/api/aggregate/{key}?group_by={text}&measures=count,sum({numeric}),mean({numeric}),nunique({text})&top=5',
+        f'/api/aggregate/{key}?group_by={text}&{arg}={value}&match=exact',
+    ]
+    if key != 'tuyen':
+        paths += [f'/api/analytics/{key}', f'/api/analytics/{key}?{arg}={value[:3]}']
+    return paths
+
+def test_public_methods_leave_frames_unchanged(services):
+    before = _fingerprints(services)
+    assert len(before) >= len(SHEET_KEYS)
+    for key, service in services.items():
+        _call_public_methods(key, service)
+        assert _fingerprints(services) == before, key
+
+@pytest.mark.parametrize('accept', [
+    'application/json', 'application/vnd.smartbi.columnar+json', 'application/vnd.apache.arrow.stream'
+])
+def test_requests_leave_frames_unchanged(services, publish, client, accept):
+    publish(services)
+    before = _fingerprints(services)
+    
+    for key, service in services.items():
+        for path in _request_paths(key, service):
+            response = client.get(path, headers={'Accept': accept})
+            assert response.status_code == 200, path
+            assert _fingerprints(services) == before, path
+    
+    queries = [
+        {'type': 'filter', 'sheet': key, 'params': {'limit': 5}} for key in SHEET_KEYS.values()
+    ]
+    assert client.post('/api/batch', json={'queries': queries}).status_code == 200
+    assert client.get('/api/memory').status_code == 200
+    assert _fingerprints(services) == before
+
+def test_service_frames_are_read_only(services):
+    for (key, name), df in _service_frames(services).items():
+        for col in df.columns:
+            values = df[col].array
+            values = values.codes if isinstance(values, pd.Categorical) else df[col].to_numpy(copy=False)
+            with pytest.raises(ValueError):
+                values[0] = values[0]
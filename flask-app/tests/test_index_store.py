@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+import datasets
+import index_store
+import loader
+import search_index
+import snapshot_cache
+from datasets import Dataset, DatasetRegistry
+
+DIGEST = 'c' * 64
+
+def _text_columns(df, count=3):
+    """A few text columns with a non-blank value each -> {column: value}"""
+    columns = {}
+    for col in df.columns:
+        if df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype):
+            values = df[col].astype(str).str.strip()
+            values = values[values != '']
+            if len(values):
+                columns[col] = values.iloc[0]
+        if len(columns) == count:
+            break
+    return columns
+
+def _query(service):
+    """Substring rows and exact-match bitmaps over a few columns of a service's frame"""
+    results = {}
+    for col, value in _text_columns(service.search_index.df).items():
+        results[col] = (
+            service.search_index.contains(col, value[:3]).tolist(),
+            service.mask_cache.bitmap(col, value).tobytes(),
+        )
+    return results
+
+def test_restore_reads_persisted_indexes(frames, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_cache, 'SNAPSHOT_FOLDER', str(tmp_path / 'snapshots'))
+    monkeypatch.setattr(datasets, 'DATASET_FOLDER', str(tmp_path))
+    (tmp_path / 'snapshots').mkdir()
+    
+    # First run: parse, build (and use) the indexes, then persist them with the snapshot
+    services = loader.build_services(frames)
+    expected = {key: _query(service) for key, service in services.items() if service is not None}
+    snapshot_cache.save(DIGEST, frames)
+    index_store.save(DIGEST, services)
+    sheets = [sheet for sheet, key in loader.SHEET_KEYS.items() if services.get(key) is not None]
+    DatasetRegistry().put(Dataset('default', DIGEST, '', services, sheets))
+    
+    # Restart: nothing may be rebuilt, every index comes from the store
+    def rebuild(self, series):
+        raise AssertionError(f'search index for {series.name!r} rebuilt')
+    monkeypatch.setattr(search_index.ColumnIndex, '__init__', rebuild)
+    monkeypatch.setattr(pd, 'factorize', lambda *args, **kwargs: pytest.fail('filter codes rebuilt'))
+    
+    registry = DatasetRegistry()
+    registry.restore().join(30)
+    dataset = registry.get('default')
+    assert dataset is not None and dataset.digest == DIGEST
+    
+    for key, service in dataset.services.items():
+        if service is None:
+            continue
+        assert _query(service) == expected[key], key
+        assert set(expected[key]) <= set(service.search_index.built()), key
+        for col, index in service.search_index.built().items():
+            assert all(isinstance(getattr(index, name), np.memmap) for name in index.ARRAYS), (key, col)
+        for col, (codes, lookup) in service.mask_cache.built_codes().items():
+            assert isinstance(codes, np.memmap), (key, col)
@@ -0,0 +1,21 @@
+import threading
+from jobs import JobManager
+
+def test_history_trim_keeps_unfinished_jobs():
+    release = threading.Event()
+    manager = JobManager(max_workers=1, max_history=2)
+    try:
+        running = manager.submit('running.xlsx', lambda job: release.wait(5))
+        queued = manager.submit('queued.xlsx', lambda job: None)
+        finished = []
+        for i in range(3):
+            job = manager.submit(f'{i}.xlsx', lambda job: None)
+            job.status = 'done'
+            finished.append(job)
+        
+        assert manager.get(running.id) is running
+        assert manager.get(queued.id) is queued
+        assert [manager.get(job.id) for job in finished] == [None, None, finished[-1]]
+    finally:
+        release.set()
+        manager.executor.shutdown(wait=True)
@@ -0,0 +1,17 @@
+import pandas as pd
+import loader
+
+def test_parallel_parse_matches_serial(workbook, frames, monkeypatch):
+    monkeypatch.setattr(loader, 'INGEST_WORKERS', 2)
+    monkeypatch.setattr(loader, '_pool', None)
+    try:
+        parallel = loader.parse_workbook(workbook)
+        # Parsed in the pool, not the serial fallback
+        assert loader._pool is not None
+    finally:
+        if loader._pool is not None:
+            loader._pool.shutdown()
+    
+    assert list(parallel) == list(frames)
+    for key, df in frames.items():
+        pd.testing.assert_frame_equal(parallel[key], df, obj=key)
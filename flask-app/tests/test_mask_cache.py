@@ -0,0 +1,49 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from mask_cache import MaskCache
+
+def _pandas_mask(df, filters):
+    mask = pd.Series(True, index=df.index)
+    for column, value in filters:
+        mask &= df[column].astype(str).str.strip() == str(value).strip()
+    return mask.to_numpy()
+
+def _filter_cases(df, columns=3, values=3):
+    """Exact-match filter sets over the frame's low-cardinality columns, single and paired"""
+    candidates = [col for col in df.columns if 1 < df[col].astype(str).nunique() <= 50][:columns]
+    singles = [
+        [(col, value)] for col in candidates
+        for value in list(df[col].astype(str).str.strip().unique()[:values]) + ['no such value']
+    ]
+    pairs = [a + b for a, b in itertools.combinations(singles, 2) if a[0][0] != b[0][0]]
+    return singles + pairs[:20]
+
+@pytest.mark.parametrize('key', ['doanhso', 'dskh', 'tuyen', 'chitiet'])
+@pytest.mark.parametrize('max_entries', [1, 256])
+def test_match_all_equals_pandas_filter(frames, key, max_entries):
+    df = frames[key]
+    cache = MaskCache(df, max_entries=max_entries)
+    cases = _filter_cases(df)
+    assert cases
+    
+    # Twice: the second pass is served from cached (or, with max_entries=1, evicted) bitmaps
+    for filters in cases + cases:
+        np.testing.assert_array_equal(cache.match_all(filters), _pandas_mask(df, filters), err_msg=str(filters))
+
+def test_filter_mask_cached_per_filter_set(frames):
+    df = frames['dskh']
+    cache = MaskCache(df, max_filter_sets=2)
+    calls = []
+    
+    def mask_of(filters):
+        def compute():
+            calls.append(filters)
+            return cache.match_all(filters)
+        return cache.filter_mask(tuple(filters), compute)
+    
+    cases = _filter_cases(df)[:3]
+    for filters in cases + cases[-1:]:
+        np.testing.assert_array_equal(mask_of(filters), _pandas_mask(df, filters))
+    assert calls == cases
@@ -0,0 +1,76 @@
+import io
+import pytest
+import routes
+from jobs import Job
+
+def test_same_named_uploads_get_their_own_file(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(routes, 'UPLOAD_FOLDER', str(tmp_path))
+    submitted = []
+    
+    def submit(filename, fn, filepath, dataset_id):
+        submitted.append(filepath)
+        return Job(filename)
+    monkeypatch.setattr(routes.job_manager, 'submit', submit)
+    
+    for content in (b'first', b'second'):
+        response = client.post('/api/upload', data={'file': (io.BytesIO(content), 'report.xlsx')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 202
+    
+    assert len(set(submitted)) == 2
+    assert [open(path, 'rb').read() for path in submitted] == [b'first', b'second']
+
+@pytest.mark.parametrize('sheet', ['doanhso', 'dskh', 'chitiet'])
+def test_analytics_invalid_request_is_400(services, publish, client, monkeypatch, sheet):
+    def get_analytics(filters_dict=None, exact=False):
+        raise ValueError(f'Bad filter: {filters_dict}')
+    monkeypatch.setattr(services[sheet], 'get_analytics', get_analytics)
+    publish(services)
+    
+    response = client.get(f'/api/analytics/{sheet}?x=1')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': "Bad filter: {'x': '1'}"}
+
+@pytest.mark.parametrize('sheet', ['doanhso', 'dskh', 'chitiet'])
+def test_analytics_filtered(services, publish, client, sheet):
+    publish(services)
+    everything = client.get(f'/api/analytics/{sheet}')
+    nothing = client.get(f'/api/analytics/{sheet}', query_string={'custcode' if sheet == 'doanhso' else 'STT': 'no such value'})
+    assert everything.status_code == nothing.status_code == 200
+    assert everything.get_json() != nothing.get_json()
+
+def test_metrics_report_response_cache(services, publish, client):
+    publish(services)
+    for _ in range(3):
+        assert client.get('/api/data/tuyen').status_code == 200
+    
+    lines = client.get('/api/metrics').get_data(as_text=True).splitlines()
+    assert 'smartbi_response_cache_entries 1' in lines
+    assert 'smartbi_response_cache_hits_total 2' in lines
+    assert 'smartbi_response_cache_misses_total 1' in lines
+    assert any(line.startswith('smartbi_response_cache_bytes ') for line in lines)
+
+def test_uploads_of_same_workbook_share_one_file(tmp_path):
+    stored = set()
+    for name in ('a_report.xlsx', 'b_report.xlsx'):
+        path = tmp_path / name
+        path.write_bytes(b'workbook')
+        stored.add(routes.store_upload(str(path), 'f' * 64))
+    
+    assert stored == {str(tmp_path / f"{'f' * 64}.xlsx")}
+    assert [p.name for p in tmp_path.iterdir()] == [f"{'f' * 64}.xlsx"]
+
+# Text column of each synthetic sheet, and the query arg filtering it
+SEARCH_ARGS = {'doanhso': 'custcode', 'dskh': 'Tên phường xã', 'tuyen': 'Tên tuyến', 'chitiet': 'KenhPhanPhoi'}
+
+@pytest.mark.parametrize('sheet', list(SEARCH_ARGS))
+def test_invalid_regex_filter_matches_literally(services, publish, client, sheet):
+    publish(services)
+    # '(' is not a valid regex: no cell contains it, so nothing matches
+    response = client.get(f'/api/filter/{sheet}', query_string={SEARCH_ARGS[sheet]: '(', 'limit': 5})
+    assert response.status_code == 200
+    assert response.get_json()['total_rows'] == 0
+    
+    assert client.get(f'/api/filters/{sheet}', query_string={SEARCH_ARGS[sheet]: '('}).status_code == 200
+    if sheet != 'tuyen':
+        assert client.get(f'/api/analytics/{sheet}', query_string={SEARCH_ARGS[sheet]: '('}).status_code == 200
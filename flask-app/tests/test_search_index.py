@@ -0,0 +1,9 @@
+import pandas as pd
+from search_index import ColumnIndex
+
+def test_invalid_regex_matches_as_substring():
+    index = ColumnIndex(pd.Series(['Nhà thuốc (A)', 'nhà thuốc B', '(a', 'x[1']))
+    assert index.matching_codes('(a') == [0, 2]
+    assert index.matching_codes('X[') == [3]
+    # Valid regexes keep str.contains semantics
+    assert index.matching_codes('b$') == [1]
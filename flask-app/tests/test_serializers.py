@@ -0,0 +1,77 @@
+import json
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+import serializers
+from serializers import (
+    dumps, df_to_dict, frame_json, result_json, columnar_json, columnar_result, iter_ndjson
+)
+from services.dskh_service import DSKHService
+
+def _jsonify(obj):
+    """What flask.jsonify wrote for the same payload"""
+    return json.loads(Flask(__name__).json.dumps(obj))
+
+@pytest.fixture
+def dated_frame():
+    return pd.DataFrame({
+        'Mã KH': ['C1', 'C2', 'C3'],
+        'Ngày tạo': pd.to_datetime(['2025-11-03 00:00:00', None, '2024-01-01 08:30:00']),
+        # Excel readers leave dates mixed with text in object columns
+        'Ngày cập nhật': [pd.Timestamp('2025-11-03'), '', datetime(2024, 2, 29, 23, 59, 59)],
+        'Ngày': [date(2025, 1, 1), None, pd.NaT],
+        'Doanh số': [1.5, float('nan'), 3.0],
+    })
+
+def test_dates_encode_like_jsonify(dated_frame):
+    rows = json.loads(frame_json(dated_frame))
+    assert rows == _jsonify(df_to_dict(dated_frame))
+    assert rows[0]['Ngày tạo'] == 'Mon, 03 Nov 2025 00:00:00 GMT'
+    assert rows[1]['Ngày tạo'] is None
+    assert rows[2]['Ngày cập nhật'] == 'Thu, 29 Feb 2024 23:59:59 GMT'
+
+def test_dates_in_every_format(dated_frame):
+    expected = _jsonify(df_to_dict(dated_frame))
+    result = {'data': dated_frame, 'updated': pd.Timestamp('2025-11-03'), 'total_rows': 3}
+    
+    assert json.loads(result_json(result))['data'] == expected
+    assert json.loads(result_json(result))['updated'] == 'Mon, 03 Nov 2025 00:00:00 GMT'
+    assert json.loads(columnar_json(result)) == json.loads(dumps(columnar_result(result)))
+    
+    lines = b''.join(iter_ndjson(result, chunk_size=2)).splitlines()
+    assert [json.loads(line) for line in lines[1:]] == expected
+
+def test_scalars_encode_like_jsonify():
+    values = [pd.Timestamp('2025-11-03 10:00'), datetime(2025, 11, 3), date(2025, 11, 3), pd.NaT, None]
+    assert json.loads(dumps(values)) == _jsonify([None if v is pd.NaT else v for v in values])
+
+def test_dskh_routes_with_date_cell(frames, publish, client):
+    df = frames['dskh'].copy()
+    df['Ngày tạo'] = pd.Timestamp('2025-11-03')
+    df.loc[df.index[1], 'Ngày tạo'] = pd.NaT
+    publish({'dskh': DSKHService(df)})
+    
+    for url in ('/api/data/dskh', '/api/filter/dskh', '/api/data/dskh?limit=5',
+                '/api/filter/dskh?stream=1'):
+        response = client.get(url)
+        assert response.status_code == 200, url
+        assert b'Mon, 03 Nov 2025 00:00:00 GMT' in response.data
+    
+    rows = client.get('/api/data/dskh').get_json()['data']
+    assert rows[0]['Ngày tạo'] == 'Mon, 03 Nov 2025 00:00:00 GMT'
+    assert rows[1]['Ngày tạo'] is None
+
+@pytest.mark.parametrize('fast', [True, False])
+def test_nan_and_infinity_encode_as_null(monkeypatch, fast):
+    if not fast:
+        monkeypatch.setattr(serializers, 'orjson', None)
+    payload = {
+        'stats': {'avg': float('nan'), 'max': float('inf'), 'min': -np.inf, 'n': np.float32('nan'), 'ok': 1.5},
+        'rows': [(1, float('nan')), [np.float64('-inf'), 2]],
+    }
+    assert json.loads(dumps(payload)) == {
+        'stats': {'avg': None, 'max': None, 'min': None, 'n': None, 'ok': 1.5},
+        'rows': [[1, None], [None, 2]],
+    }
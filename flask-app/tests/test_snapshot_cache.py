@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+import snapshot_cache
+
+@pytest.fixture
+def snapshot_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_cache, 'SNAPSHOT_FOLDER', str(tmp_path))
+    return tmp_path
+
+def test_snapshot_hit_returns_parsed_frames(frames, snapshot_folder):
+    digest = 'a' * 64
+    assert snapshot_cache.load(digest) is None
+    snapshot_cache.save(digest, frames)
+    
+    cached = snapshot_cache.load(digest)
+    assert list(cached) == list(frames)
+    for key, df in frames.items():
+        pd.testing.assert_frame_equal(cached[key], df.reset_index(drop=True), obj=key)
+
+def test_snapshot_keeps_mixed_type_columns_exact(snapshot_folder):
+    # Excel leaves numbers and '' blanks in one column (e.g. ID numbers, ward codes)
+    df = pd.DataFrame({
+        'id': pd.Series([123456789012, '', 3.5, 'x', np.nan], dtype=object),
+        'ward': pd.Categorical([1.0, '', 2.0, '', 1.0]),
+        'name': ['a', 'b', 'c', 'd', 'e'],
+    })
+    digest = 'b' * 64
+    snapshot_cache.save(digest, {'dskh': df})
+    
+    assert [path.name for path in (snapshot_folder / digest).glob('dskh.*')] == ['dskh.feather']
+    cached = snapshot_cache.load(digest)['dskh']
+    pd.testing.assert_frame_equal(cached, df)
+    assert [type(value) for value in cached['id']] == [type(value) for value in df['id']]
+    assert cached['ward'].cat.categories.tolist() == df['ward'].cat.categories.tolist()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils import SortCache, calculate_metrics, calculate_metrics_frame, paginate
+
+def test_sort_cache_is_bounded_lru():
+    df = pd.DataFrame({f'c{i}': np.arange(10)[::-1] + i for i in range(5)})
+    cache = SortCache(df, max_entries=3)
+    
+    first = cache.permutation('c0')
+    for column in ('c1', 'c2'):
+        cache.permutation(column)
+    assert cache.permutation('c0') is first  # hit, now most recent
+    cache.permutation('c3')
+    cache.permutation('c4', ascending=False)
+    
+    assert len(cache._permutations) == 3
+    assert ('c0', True) in cache._permutations
+    assert ('c1', True) not in cache._permutations
+
+def test_paginate_sorted_after_eviction():
+    df = pd.DataFrame({'a': [3, 1, 2], 'b': ['z', 'x', 'y']})
+    cache = SortCache(df, max_entries=1)
+    page = {'offset': 0, 'limit': 2, 'sort': 'a', 'ascending': True}
+    
+    for sort in ('a', 'b', 'a'):
+        rows, total = paginate(df, dict(page, sort=sort), sort_cache=cache)
+        assert total == 3
+        assert rows[sort].tolist() == sorted(df[sort])[:2]
+
+MIXED_ROWS = {
+    'T-3': [1_000_000, '2500000', '', np.nan, 0, 'abc', None, -300, 40_000_000, '0'],
+    'T-2': [2_000_000, '3500000.5', 100, 7, 0, 1, 2, 600, 0, ' 12 '],
+    'T-1': [3_000_000, 4_000_000, 200, 8, 0, 1, 2, 900, 0, np.nan],
+    'T': [5_000_000, '', 300, 9, 50, 1, 2, 1_200, 0, '7'],
+}
+
+@pytest.mark.parametrize('columns', [list(MIXED_ROWS), ['T-3', 'T-2', 'T-1']])
+@pytest.mark.parametrize('numeric', [False, True])
+def test_calculate_metrics_frame_matches_row_wise(columns, numeric):
+    df = pd.DataFrame({col: pd.Series(MIXED_ROWS[col], dtype=object) for col in columns})
+    if numeric:
+        # Sheets read by pandas: float columns where blanks/text became NaN
+        df = df.apply(pd.to_numeric, errors='coerce')
+    expected = pd.DataFrame([calculate_metrics(row) for _, row in df.iterrows()], index=df.index)
+    
+    result = calculate_metrics_frame(df)
+    
+    assert result['TB'].tolist() == expected['TB'].astype(float).tolist()
+    assert result['Forecast'].tolist() == expected['Forecast'].astype(float).tolist()
+    assert result['Class'].tolist() == expected['Class'].tolist()
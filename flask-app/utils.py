@@ -1,5 +1,13 @@
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
-from config import CLASSIFICATION_THRESHOLDS
+from config import CLASSIFICATION_THRESHOLDS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SORT_CACHE_SIZE
+
+# Thresholds sorted once (ascending) for vectorized classification
+_SORTED_THRESHOLDS = sorted(CLASSIFICATION_THRESHOLDS.items(), key=lambda x: x[1], reverse=True)[::-1]
+_CLASS_NAMES = np.array([cls for cls, _ in _SORTED_THRESHOLDS], dtype=object)
+_CLASS_BOUNDS = np.array([threshold for _, threshold in _SORTED_THRESHOLDS], dtype=float)
 
 def calculate_metrics(row):
     """Calculate TB Doanh số, Dự báo, Phân loại"""
@@ -29,10 +37,157 @@ def calculate_metrics(row):
         print(f"Error calculating metrics: {e}")
         return {'TB': 0, 'Forecast': 0, 'Class': 'Low'}
 
-def df_to_dict(df):
-    """Convert DataFrame to dict with filled NaN"""
-    df = df.where(pd.notna(df), None)
-    return df.to_dict('records')
+def _column_as_float(df, column):
+    """Convert column to float array, returning (values, invalid_mask)"""
+    if column not in df.columns:
+        return np.zeros(len(df)), np.zeros(len(df), dtype=bool)
+    
+    series = df[column]
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=float, na_value=np.nan), np.zeros(len(df), dtype=bool)
+    
+    # Object column: float(x) fails on text/None, but keeps float NaN as NaN
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    failed = np.isnan(values)
+    if failed.any():
+        original = series.to_numpy(dtype=object)
+        is_float_nan = np.fromiter(
+            (isinstance(v, float) and v != v for v in original[failed]), dtype=bool
+        )
+        failed[np.flatnonzero(failed)[is_float_nan]] = False
+    return values, failed
+
+def calculate_metrics_frame(df):
+    """Vectorized calculate_metrics: TB, Forecast, Class for the whole frame"""
+    t3, bad_t3 = _column_as_float(df, 'T-3')
+    t2, bad_t2 = _column_as_float(df, 'T-2')
+    t1, bad_t1 = _column_as_float(df, 'T-1')
+    t, bad_t = _column_as_float(df, 'T')
+    invalid = bad_t3 | bad_t2 | bad_t1 | bad_t
+    
+    with np.errstate(invalid='ignore'):
+        total = t3 + t2 + t1
+        tb = np.where(total > 0, total / 3, 0.0)
+        trend = np.where(t3 > 0, (t - t3) / 3, 0.0)
+        forecast = t + trend
+        forecast = np.where(forecast > 0, forecast, 0.0)
+    
+    idx = np.searchsorted(_CLASS_BOUNDS, tb, side='right') - 1
+    classification = np.where(idx >= 0, _CLASS_NAMES[np.clip(idx, 0, None)], 'Low')
+    
+    # Rows calculate_metrics would reject fall back to its defaults
+    tb[invalid] = 0
+    forecast[invalid] = 0
+    classification[invalid] = 'Low'
+    
+    return pd.DataFrame({
+        'TB': np.round(tb, 0),
+        'Forecast': np.round(forecast, 0),
+        'Class': classification.astype(object)
+    }, index=df.index)
+
+# Query params used for paging/sorting/format/aggregation, never treated as column filters
+PAGINATION_PARAMS = {'offset', 'limit', 'sort', 'order'}
+AGGREGATE_PARAMS = {'group_by', 'measures', 'top'}
+RESERVED_PARAMS = PAGINATION_PARAMS | AGGREGATE_PARAMS | {'stream', 'match'}
+
+def parse_pagination(args):
+    """Parse offset/limit/sort/order query args, None if paging not requested"""
+    if not any(key in args for key in PAGINATION_PARAMS):
+        return None
+    
+    try:
+        offset = int(args.get('offset') or 0)
+        limit = int(args.get('limit') or DEFAULT_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise ValueError('offset and limit must be integers')
+    if offset < 0 or limit <= 0:
+        raise ValueError('offset must be >= 0 and limit must be > 0')
+    
+    order = (args.get('order') or 'asc').lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be 'asc' or 'desc'")
+    
+    return {
+        'offset': offset,
+        'limit': min(limit, MAX_PAGE_SIZE),
+        'sort': args.get('sort') or None,
+        'ascending': order == 'asc'
+    }
+
+def exact_match(args):
+    """?match=exact selects exact (cached bitmap) filtering instead of substring"""
+    return (args.get('match') or '').lower() == 'exact'
+
+def filter_params(args):
+    """Query args minus the paging/sorting/format params"""
+    return {key: args.get(key) for key in args if key not in RESERVED_PARAMS}
+
+class SortCache:
+    """LRU cache of sort permutations of one frame, computed once per (column, order)"""
+    
+    def __init__(self, df, max_entries=SORT_CACHE_SIZE):
+        self.df = df
+        self.max_entries = max_entries
+        self._permutations = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def permutation(self, column, ascending=True):
+        """Row positions of the frame in sorted order"""
+        if column not in self.df.columns:
+            raise ValueError(f'Unknown sort column: {column}')
+        
+        key = (column, ascending)
+        with self._lock:
+            perm = self._permutations.get(key)
+            if perm is not None:
+                self._permutations.move_to_end(key)
+                return perm
+        
+        series = self.df[column].reset_index(drop=True)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Sort by value, not by category order
+            series = series.astype(series.cat.categories.dtype)
+        try:
+            ordered = series.sort_values(ascending=ascending, kind='stable', na_position='last')
+        except TypeError:
+            # Mixed numbers/text: fall back to string ordering
+            ordered = series.astype(str).sort_values(ascending=ascending, kind='stable')
+        perm = ordered.index.to_numpy()
+        with self._lock:
+            self._permutations[key] = perm
+            while len(self._permutations) > self.max_entries:
+                self._permutations.popitem(last=False)
+        return perm
+
+def paginate(df, page, mask=None, sort_cache=None):
+    """Apply filter mask, sort and offset/limit; returns (page_df, total_rows)"""
+    if page and page['sort']:
+        cache = sort_cache if sort_cache is not None else SortCache(df)
+        rows = cache.permutation(page['sort'], page['ascending'])
+        if mask is not None:
+            rows = rows[mask[rows]]
+    elif mask is not None:
+        rows = np.flatnonzero(mask)
+    else:
+        rows = None
+    
+    total = len(df) if rows is None else len(rows)
+    if page:
+        start = page['offset']
+        end = start + page['limit']
+        rows = np.arange(start, min(end, total)) if rows is None else rows[start:end]
+    
+    if rows is None:
+        return df, total
+    return df.iloc[rows], total
+
+def paged_response(data, total, page=None):
+    """Envelope for filter results: rows, total_rows and paging info"""
+    result = {'data': data, 'total_rows': total}
+    if page:
+        result.update({'offset': page['offset'], 'limit': page['limit']})
+    return result
 
 def get_column_unique_values(df, column, limit=100):
     """Get unique values from column"""
@@ -23,7 +23,14 @@ export default function App() {
 
     try {
       setUploadStatus({ type: 'loading', message: 'Đang upload...' });
-      const result = await api.upload(file);
+      const result = await api.upload(file, (job) => {
+        const done = Object.values(job.sheets || {}).filter(s => s.status !== 'parsing').length;
+        const total = Object.keys(job.sheets || {}).length;
+        setUploadStatus({
+          type: 'loading',
+          message: total ? `Đang xử lý... (${done}/${total} sheet)` : 'Đang xử lý...'
+        });
+      });
       
       if (result?.success) {
         setUploadStatus({ type: 'success', message: `✅ Upload thành công! ${result.sheets.join(', ')}` });
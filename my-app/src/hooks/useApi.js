@@ -39,7 +39,12 @@ export const useApi = () => {
   }, []);
 
   // ============ Upload APIs ============
-  const upload = useCallback(async (file) => {
+  /**
+   * Upload chạy nền trên server:
+   * - POST /upload trả về job_id ngay
+   * - Poll /jobs/<id> cho tới khi xong, onProgress(job) nhận tiến độ từng sheet
+   */
+  const upload = useCallback(async (file, onProgress = () => {}) => {
     return executeAsync(async () => {
       const form = new FormData();
       form.append('file', file);
@@ -58,7 +63,26 @@ export const useApi = () => {
       if (!data.success) {
         throw new Error(data.error || 'Upload failed');
       }
-      return data;
+      if (!data.job_id) {
+        return data;
+      }
+
+      while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const jobRes = await fetch(`${API}/jobs/${data.job_id}`);
+        if (!jobRes.ok) {
+          throw new Error(`Job status failed (${jobRes.status})`);
+        }
+
+        const job = await jobRes.json();
+        onProgress(job);
+        if (job.status === 'done') {
+          return job.result;
+        }
+        if (job.status === 'error') {
+          throw new Error(job.error || 'Upload failed');
+        }
+      }
     }, 'Upload thất bại');
   }, [executeAsync]);
 
@@ -247,6 +271,97 @@ export const useApi = () => {
     }, 'Không thể tải phân tích Chi tiết tuyến');
   }, [executeAsync]);
 
+  // ============ Streaming (NDJSON) ============
+  /**
+   * Đọc dữ liệu dạng NDJSON theo từng chunk
+   * - Dòng đầu: metadata (columns, filters, total_rows...)
+   * - Các dòng sau: mỗi dòng 1 row
+   * - onRows(rows, meta) được gọi mỗi khi nhận thêm rows → render sớm
+   */
+  const streamRows = useCallback(async (path, params = {}, onRows = () => {}) => {
+    return executeAsync(async () => {
+      const url = new URL(`${API}${path}`);
+      Object.entries(params).forEach(([k, v]) => {
+        if (v && v !== 'all') {
+          url.searchParams.set(k, v);
+        }
+      });
+
+      const res = await fetch(url, { headers: { Accept: 'application/x-ndjson' } });
+
+      if (!res.ok) {
+        throw new Error(`Stream failed (${res.status})`);
+      }
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let meta = null;
+      const allRows = [];
+
+      const handleLines = (lines) => {
+        const rows = [];
+        lines.forEach(line => {
+          if (!line.trim()) return;
+          const obj = JSON.parse(line);
+          if (meta === null) {
+            meta = obj;
+          } else {
+            rows.push(obj);
+          }
+        });
+        if (rows.length) {
+          allRows.push(...rows);
+          onRows(rows, meta);
+        }
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        handleLines(lines);
+      }
+      handleLines([buffer]);
+
+      return { ...(meta || {}), data: allRows };
+    }, 'Không thể tải dữ liệu');
+  }, [executeAsync]);
+
+  // ============ Batch ============
+  /**
+   * Gửi nhiều truy vấn trong 1 request (cùng 1 phiên bản dữ liệu)
+   * - queries: [{ id, type: 'data' | 'filter' | 'filters' | 'analytics' | 'aggregate', sheet, params }]
+   * - Trả về { [id]: body } và lỗi của từng truy vấn (nếu có) trong errors
+   */
+  const fetchBatch = useCallback(async (queries) => {
+    return executeAsync(async () => {
+      const res = await fetch(`${API}/batch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ queries }),
+      });
+
+      if (!res.ok) {
+        throw new Error(`Batch failed (${res.status})`);
+      }
+
+      const { version, results } = await res.json();
+      const bodies = {};
+      const errors = {};
+      results.forEach(({ id, status, body }) => {
+        if (status === 200) {
+          bodies[id] = body;
+        } else {
+          errors[id] = body?.error || `HTTP ${status}`;
+        }
+      });
+      return { version, results: bodies, errors };
+    }, 'Không thể tải dữ liệu');
+  }, [executeAsync]);
+
   const clearError = useCallback(() => {
     setError(null);
   }, []);
@@ -279,5 +394,11 @@ export const useApi = () => {
     fetchChiTietData,
     filterChiTiet,
     fetchChiTietAnalytics,
+
+    // Streaming
+    streamRows,
+
+    // Batch
+    fetchBatch,
   };
 };
\ No newline at end of file
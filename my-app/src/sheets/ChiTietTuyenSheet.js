@@ -33,10 +33,16 @@ export const ChiTietTuyenSheet = () => {
     const loadData = async () => {
       try {
         console.log('Loading Chi tiết tuyến data...');
-        const [dataRes, analyticsRes] = await Promise.all([
-          api.fetchChiTietData(),
-          api.fetchChiTietAnalytics()
+        // Dữ liệu + phân tích trong 1 request, cùng 1 phiên bản dữ liệu
+        const { results, errors } = await api.fetchBatch([
+          { id: 'data', type: 'data', sheet: 'chitiet' },
+          { id: 'analytics', type: 'analytics', sheet: 'chitiet' }
         ]);
+        if (Object.keys(errors).length) {
+          throw new Error(Object.values(errors).join('; '));
+        }
+        const dataRes = results.data;
+        const analyticsRes = results.analytics;
         
         if (!isMounted) return;
 
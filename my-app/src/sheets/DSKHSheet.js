@@ -30,23 +30,39 @@ export const DSKHSheet = () => {
     loadData();
   }, []);
 
+  const applyMeta = (meta) => {
+    const allColumns = meta.columns || [];
+    setColumns(allColumns);
+    setFilterOptions(meta.filters || {});
+
+    // Mặc định hiển thị tất cả cột
+    const visibility = {};
+    allColumns.forEach(col => {
+      visibility[col] = true;
+    });
+    setColumnVisibility(visibility);
+  };
+
   const loadData = async () => {
     try {
-      const res = await api.fetchDskhData();
+      // NDJSON: hiển thị các dòng đầu tiên trong khi phần còn lại đang tải
+      let received = [];
+      let metaApplied = false;
+      const res = await api.streamRows('/data/dskh', {}, (rows, meta) => {
+        if (!metaApplied) {
+          metaApplied = true;
+          applyMeta(meta || {});
+        }
+        received = received.concat(rows);
+        setData(received);
+      });
       const dskhData = res.data || [];
-      const allColumns = res.columns || [];
 
+      if (!metaApplied) {
+        applyMeta(res);
+      }
       setAllData(dskhData);
       setData(dskhData);
-      setColumns(allColumns);
-      setFilterOptions(res.filters || {});
-
-      // Mặc định hiển thị tất cả cột
-      const visibility = {};
-      allColumns.forEach(col => {
-        visibility[col] = true;
-      });
-      setColumnVisibility(visibility);
 
       // Calculate analytics
       calculateAnalytics(dskhData);
@@ -25,10 +25,16 @@ export const DoanhsoSheet = () => {
 
   const loadData = async () => {
     try {
-      const [dataRes, analyticsRes] = await Promise.all([
-        api.fetchDoanhsoData(),
-        api.fetchDoanhsoAnalytics()
+      // Dữ liệu + phân tích trong 1 request, cùng 1 phiên bản dữ liệu
+      const { results, errors } = await api.fetchBatch([
+        { id: 'data', type: 'data', sheet: 'doanhso' },
+        { id: 'analytics', type: 'analytics', sheet: 'doanhso' }
       ]);
+      if (Object.keys(errors).length) {
+        throw new Error(Object.values(errors).join('; '));
+      }
+      const dataRes = results.data;
+      const analyticsRes = results.analytics;
 
       const doanhsoData = dataRes.data || [];
       setData(doanhsoData);